@@ -0,0 +1,65 @@
+"""
+Память на один наблюдаемый контрол.
+
+Создает ObserverDevice и ObserverControl без подключения к брокеру
+(подписки только регистрируются в клиенте) и выводит прирост памяти
+по tracemalloc в пересчете на контрол.
+
+Запуск:
+    PYTHONPATH=. python benchmarks/memory_controls.py --controls 100000
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import ObserverDevice
+
+
+def measure(controls: int, controls_per_device: int) -> dict:
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    devices = []
+    observed = []
+
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+
+    with client.batch():
+        for index in range(controls):
+            if index % controls_per_device == 0:
+                device = ObserverDevice.create(client, f'device_{len(devices)}')
+                devices.append(device)
+            observed.append(ControlManager.connect_control(device, f'control_{index}'))
+
+    gc.collect()
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'controls': controls,
+        'devices': len(devices),
+        'total_mb': (total - start) / 2**20,
+        'bytes_per_control': (total - start) / controls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--controls', type=int, default=100_000)
+    parser.add_argument('--controls-per-device', type=int, default=10)
+    args = parser.parse_args()
+
+    result = measure(args.controls, args.controls_per_device)
+    print(  # noqa: T201
+        f'{result["controls"]} controls on {result["devices"]} devices: '
+        f'{result["total_mb"]:.1f} MiB, '
+        f'{result["bytes_per_control"]:.0f} bytes per control '
+        '(including subscriptions)'
+    )
+
+
+if __name__ == '__main__':
+    main()
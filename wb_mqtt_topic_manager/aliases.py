@@ -0,0 +1,113 @@
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from wb_mqtt_topic_manager.constance import TopicKind
+from wb_mqtt_topic_manager.topics import classify_topic
+
+
+class TopicAliases:
+    """
+    Topic alias-ы MQTT v5 исходящих публикаций одного подключения.
+
+    Alias назначается часто публикуемым топикам (по умолчанию - значениям
+    контролов) после min_uses публикаций, пока не исчерпан Topic Alias Maximum
+    брокера. Первые публикации передают топик вместе с alias-ом, и только после
+    подтверждения такой публикации топик перестает передаваться, поэтому порядок
+    пакетов между потоками не важен. Назначенный alias не переназначается
+    до переподключения.
+    """
+
+    def __init__(self, kinds: Tuple[str, ...] = (TopicKind.VALUE,), min_uses: int = 2):
+        """
+        Инициализация.
+
+        Args:
+            kinds: Классы топиков, которым назначаются alias-ы
+            min_uses: Номер публикации топика, с которой назначается alias
+        """
+        self.kinds = kinds
+        self.min_uses = min_uses
+        self.maximum = 0
+
+        self._lock = threading.Lock()
+        self._aliases: Dict[str, int] = {}
+        self._established: Set[str] = set()
+        self._uses: Dict[str, int] = {}
+        # Неподтвержденные публикации с alias-ом: mid -> топик
+        self._pending: Dict[int, str] = {}
+
+        # Счетчики
+        self.hits = 0
+
+    def reset(self, maximum: int) -> Dict[int, str]:
+        """
+        Сброс alias-ов при новом подключении.
+
+        Args:
+            maximum: Topic Alias Maximum из CONNACK
+
+        Returns:
+            dict: Неподтвержденные публикации с alias-ом (mid -> топик), которые
+                необходимо повторить с полным топиком
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self.maximum = maximum
+            self._aliases.clear()
+            self._established.clear()
+            self._uses.clear()
+        return pending
+
+    def resolve(self, topic: str) -> Tuple[str, Optional[int]]:
+        """
+        Топик и alias для публикации.
+
+        Returns:
+            tuple: (топик для отправки, пустой если достаточно alias-а; alias или None)
+        """
+        if not self.maximum:
+            return topic, None
+
+        with self._lock:
+            alias = self._aliases.get(topic)
+            if alias is not None:
+                if topic in self._established:
+                    self.hits += 1
+                    return '', alias
+                return topic, alias
+
+            if len(self._aliases) >= self.maximum:
+                return topic, None
+            if classify_topic(topic) not in self.kinds:
+                return topic, None
+
+            uses = self._uses.get(topic, 0) + 1
+            if uses < self.min_uses:
+                self._uses[topic] = uses
+                return topic, None
+
+            self._uses.pop(topic, None)
+            alias = self._aliases[topic] = len(self._aliases) + 1
+            return topic, alias
+
+    def on_sent(self, mid: int, topic: str):
+        """Регистрация переданной в paho публикации с alias-ом"""
+        with self._lock:
+            self._pending[mid] = topic
+
+    def on_published(self, mid: int):
+        """Подтверждение публикации, после первого подтверждения топик не передается"""
+        with self._lock:
+            topic = self._pending.pop(mid, None)
+            if topic is not None and topic in self._aliases:
+                self._established.add(topic)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'maximum': self.maximum,
+                'assigned': len(self._aliases),
+                'established': len(self._established),
+                'hits': self.hits,
+            }
@@ -0,0 +1,481 @@
+import asyncio
+import functools
+import inspect
+import threading
+from typing import Any, Callable, Optional, Set, Union
+
+import paho.mqtt.client as mqtt
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import QosType
+from wb_mqtt_topic_manager.delivery import PublishHandle
+
+
+class MessageStream:
+    """Асинхронный итератор сообщений подписки"""
+
+    def __init__(
+        self,
+        client: 'AsyncMQTTClient',
+        topic: str,
+        qos: int = QosType.QOS_ZERO,
+        maxsize: int = 1000,
+        raw: bool = False,
+    ):
+        """
+        Инициализация потока сообщений.
+
+        Args:
+            client: Асинхронный клиент
+            topic: Фильтр топика (допускаются + и #)
+            qos: Качество обслуживания
+            maxsize: Размер буфера, при переполнении отбрасываются старые сообщения
+            raw: Отдавать объекты Payload вместо строк
+        """
+        self.client = client
+        self.topic = topic
+        self.qos = qos
+        self.dropped = 0
+
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._closed = False
+
+        client.subscribe(topic, self._on_message, qos=qos, raw=raw)
+
+    def _on_message(self, topic: str, payload: Any):
+        self.client.call_in_loop(self._put, (topic, payload))
+
+    def _put(self, item: tuple):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(item)
+
+    def _wakeup(self):
+        # Ожидающий итератор есть только при пустой очереди
+        if self._queue.empty():
+            self._queue.put_nowait(None)
+
+    def close(self):
+        """Отписка и завершение итерации"""
+        if self._closed:
+            return
+
+        self._closed = True
+        self.client.unsubscribe(self.topic, self._on_message)
+        self.client.call_in_loop(self._wakeup)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> tuple:
+        if self._closed and self._queue.empty():
+            raise StopAsyncIteration
+
+        item = await self._queue.get()
+        if item is None:
+            raise StopAsyncIteration
+
+        return item
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AsyncMQTTClient(MQTTClient):
+    """
+    Асинхронный MQTT клиент.
+
+    Сокет paho обслуживается событийным циклом asyncio (add_reader/add_writer),
+    отдельный сетевой поток не создается. Совместим с Device и контролами:
+    publish возвращает future, который завершается по PUBACK, а callback-и
+    могут быть корутинами.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._misc_task: Optional[asyncio.Task] = None
+        self._connect_future: Optional[asyncio.Future] = None
+        self._disconnect_future: Optional[asyncio.Future] = None
+        self._publish_futures: Set[asyncio.Future] = set()
+        self._publish_lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._reconnect_task: Optional[asyncio.Task] = None
+
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_socket_open = self._on_socket_open
+        self.client.on_socket_close = self._on_socket_close
+        self.client.on_socket_register_write = self._on_socket_register_write
+        self.client.on_socket_unregister_write = self._on_socket_unregister_write
+
+    def call_in_loop(self, func: Callable, *args):
+        """Вызов функции в потоке событийного цикла"""
+        if threading.get_ident() == self._loop_thread_id:
+            func(*args)
+        elif self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(func, *args)
+
+    # Интеграция сокета paho с событийным циклом
+
+    def _on_socket_open(self, client, userdata, sock):
+        self.call_in_loop(self._loop.add_reader, sock, client.loop_read)
+        self.call_in_loop(self._start_misc_loop)
+
+    def _on_socket_close(self, client, userdata, sock):
+        self.call_in_loop(self._loop.remove_reader, sock)
+        self.call_in_loop(self._stop_misc_loop)
+
+    def _on_socket_register_write(self, client, userdata, sock):
+        self.call_in_loop(self._loop.add_writer, sock, client.loop_write)
+
+    def _on_socket_unregister_write(self, client, userdata, sock):
+        self.call_in_loop(self._loop.remove_writer, sock)
+
+    def _start_misc_loop(self):
+        if self._misc_task is None:
+            self._misc_task = self._loop.create_task(self._misc_loop())
+
+    def _stop_misc_loop(self):
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+            self._misc_task = None
+
+    async def _misc_loop(self):
+        """Обслуживание keepalive и повторных отправок"""
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                break
+
+    # Жизненный цикл подключения
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        super()._on_connect(client, userdata, flags, reason_code, properties)
+        self.call_in_loop(self._set_future, self._connect_future, self.is_connected)
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        self._reset_connection_state()
+        self.call_in_loop(self._set_future, self._disconnect_future, True)
+        # Неподтвержденные публикации paho повторит после переподключения,
+        # handle-ы завершаются с ошибкой только при disconnect()
+
+        # Соединение потеряно не по запросу пользователя
+        if not self._stopping:
+            self.call_in_loop(self._start_reconnect)
+
+    @staticmethod
+    def _set_future(future: Optional[asyncio.Future], result: Any):
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    async def connect(self) -> bool:
+        """
+        Подключение к MQTT брокеру.
+
+        Returns:
+            bool: True если подключение успешно, False в противном случае
+        """
+        if self.is_connected:
+            return True
+
+        self._bind_loop()
+        self._stopping = False
+        self._connect_future = self._loop.create_future()
+
+        try:
+            # Разрешение имени и TCP-подключение блокирующие, выполняются в executor
+            await self._loop.run_in_executor(
+                None, functools.partial(self.client.connect, **self._connect_kwargs())
+            )
+        except Exception:
+            return False
+
+        if self._dispatcher is not None:
+            self._dispatcher.start()
+        if self._outbound is not None:
+            self._outbound.start()
+
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(self._connect_future), self.connect_timeout
+            )
+        except asyncio.TimeoutError:
+            self._stopping = True
+            self.client.disconnect()
+            return False
+
+    def _in_network_thread(self) -> bool:
+        """Сокет обслуживается событийным циклом, блокировать его нельзя"""
+        return threading.get_ident() == self._loop_thread_id
+
+    def _bind_loop(self):
+        """Привязка клиента к текущему событийному циклу"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+
+    async def disconnect(self):
+        """Отключение от MQTT брокера"""
+        self._stopping = True
+        self._stop_reconnect()
+
+        # Отложенные политиками значения публикуются до отключения
+        self.suspend_policies()
+        if not self.is_connected:
+            # Переподключение отменено, paho сообщения уже не отправит
+            self._delivery.fail_all()
+            self._publish_started.clear()
+            self.scheduler.stop()
+            return
+
+        self._disconnect_future = self._loop.create_future()
+
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.flush()
+            self._deferred.flush()
+            if self._coalescer is not None:
+                self._coalescer.flush()
+            if self._outbound is not None:
+                # Ожидание опустошения очереди не блокирует событийный цикл
+                await self._loop.run_in_executor(
+                    None, self._outbound.wait_empty, self.connect_timeout
+                )
+            self.client.disconnect()
+            await asyncio.wait_for(
+                asyncio.shield(self._disconnect_future), self.connect_timeout
+            )
+        except Exception:
+            pass
+
+        self.is_connected = False
+        self._delivery.fail_all()
+        self._publish_started.clear()
+        if self._outbound is not None:
+            self._outbound.stop()
+
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
+
+        self.scheduler.stop()
+
+    async def reconnect(self, timeout: Optional[float] = None) -> bool:
+        """
+        Переподключение к брокеру.
+
+        Переподключение выполняется в фоновой задаче с экспоненциальной
+        задержкой и джиттером, как в MQTTClient, метод только ожидает
+        его результат.
+
+        Args:
+            timeout: Максимальное ожидание подключения в секундах
+                (если None, используется connect_timeout)
+
+        Returns:
+            bool: True если подключение восстановлено за время ожидания
+        """
+        if timeout is None:
+            timeout = self.connect_timeout
+
+        if self.is_connected:
+            await self.disconnect()
+
+        self._bind_loop()
+        self._stopping = False
+        task = self._start_reconnect(immediate=True)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def _start_reconnect(self, immediate: bool = False) -> asyncio.Task:
+        """Запуск фонового переподключения в событийном цикле"""
+        task = self._reconnect_task
+        if task is None or task.done():
+            task = self._loop.create_task(self._reconnect_loop(immediate))
+            self._reconnect_task = task
+        return task
+
+    def _stop_reconnect(self):
+        """Остановка фонового переподключения"""
+        task, self._reconnect_task = self._reconnect_task, None
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+    async def _reconnect_loop(self, immediate: bool) -> bool:
+        """Попытки переподключения с экспоненциальной задержкой и джиттером"""
+        attempt = 0
+
+        while (
+            self.max_reconnect_attempts is None or attempt < self.max_reconnect_attempts
+        ):
+            if attempt or not immediate:
+                await asyncio.sleep(self._reconnect_backoff(attempt))
+            attempt += 1
+
+            if await self.connect():
+                return True
+
+        return False
+
+    def __enter__(self):
+        raise TypeError('Use "async with" for AsyncMQTTClient')
+
+    async def __aenter__(self):
+        """Поддержка открытия асинхронного контекстного менеджера"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Поддержка закрытия асинхронного контекстного менеджера"""
+        await self.disconnect()
+
+    # Публикация
+
+    def publish(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int = QosType.QOS_ZERO,
+        retain: bool = False,
+    ) -> Union[asyncio.Future, bool]:
+        """
+        Публикация сообщения в топик.
+
+        Сообщение отправляется так же, как в MQTTClient.publish (исходящая
+        очередь, схлопывание retained публикаций), поэтому результат можно не
+        ожидать. Для QoS 1/2 future завершается по PUBACK/PUBCOMP, для QoS 0 -
+        после записи в сокет.
+
+        Args:
+            topic: MQTT топик
+            payload: Данные для отправки (строка, bytes или JSON-сериализуемый объект)
+            qos: Качество обслуживания (0, 1, 2)
+            retain: Сохранять сообщение для новых подписчиков
+
+        Вне событийного цикла (таймеры политик и ограничения частоты, пул
+        обработки callback-ов) future создать негде, поэтому публикация
+        выполняется как в MQTTClient.publish и возвращается bool.
+
+        Returns:
+            asyncio.Future: Результат доставки (True если сообщение доставлено)
+        """
+        if self._loop is not None and threading.get_ident() == self._loop_thread_id:
+            loop = self._loop
+        else:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return super().publish(topic, payload, qos, retain)
+        future = loop.create_future()
+
+        with self._publish_lock:
+            self._publish_futures.add(future)
+        future.add_done_callback(self._forget_future)
+
+        # Публикация идет тем же путем, что и в MQTTClient (исходящая очередь,
+        # схлопывание), handle завершает future по подтверждению брокера
+        handle = PublishHandle(topic, self._delivery)
+        handle.add_done_callback(lambda done: self._resolve_future(future, done.result))
+        if not self._publish(topic, payload, qos, retain, handle):
+            self._delivery.complete(handle, False)
+
+        return future
+
+    @classmethod
+    def _resolve_future(cls, future: asyncio.Future, result: bool):
+        """Завершение future в его событийном цикле из любого потока"""
+        loop = future.get_loop()
+        if not loop.is_closed():
+            loop.call_soon_threadsafe(cls._set_future, future, result)
+
+    def _forget_future(self, future: asyncio.Future):
+        with self._publish_lock:
+            self._publish_futures.discard(future)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание подтверждения всех публикаций без блокировки событийного цикла.
+
+        Returns:
+            bool: True если все публикации подтверждены
+        """
+        with self._publish_lock:
+            futures = list(self._publish_futures)
+        if not futures:
+            return True
+
+        _, pending = await asyncio.wait(futures, timeout=timeout)
+        return not pending
+
+    # Подписки
+
+    async def wait_subscribed(
+        self,
+        topic: str,
+        timeout: Optional[float] = None,
+        share_group: Optional[str] = None,
+    ) -> bool:
+        """Вариант MQTTClient.wait_subscribed, не блокирующий событийный цикл"""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        # SUBACK обрабатывается в этом же цикле, поэтому состояние проверяется
+        # между итерациями цикла
+        while not self.is_subscribed(topic, share_group):
+            if deadline is not None and loop.time() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        return True
+
+    def messages(
+        self,
+        topic: str,
+        qos: int = QosType.QOS_ZERO,
+        maxsize: int = 1000,
+        raw: bool = False,
+    ) -> MessageStream:
+        """
+        Подписка в виде асинхронного итератора.
+
+        Args:
+            topic: Фильтр топика (допускаются + и #)
+            qos: Качество обслуживания
+            maxsize: Размер буфера сообщений
+            raw: Отдавать объекты Payload вместо строк
+
+        Returns:
+            MessageStream: Итератор пар (topic, payload)
+        """
+        return MessageStream(self, topic, qos=qos, maxsize=maxsize, raw=raw)
+
+    def run_callback(self, callback: Callable, *args) -> Any:
+        """
+        Вызов callback-а, корутины планируются в событийном цикле.
+
+        Профилировщик учитывает только синхронную часть вызова корутины.
+        """
+        result = self._call(callback, args)
+
+        if inspect.isawaitable(result):
+            self.call_in_loop(self._schedule, result)
+
+        return result
+
+    def _schedule(self, awaitable):
+        task = asyncio.ensure_future(awaitable)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # Исключения callback-ов не прерывают обработку, как и в MQTTClient
+            if task.exception() is not None:
+                self.metrics.inc('callback_errors_total')
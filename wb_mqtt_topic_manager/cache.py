@@ -0,0 +1,277 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+from wb_mqtt_topic_manager.constance import QosType, TopicKind
+from wb_mqtt_topic_manager.scheduler import TimerHandle
+from wb_mqtt_topic_manager.serializer import json_dumps, json_loads
+from wb_mqtt_topic_manager.snapshot import (
+    DEVICES_FILTER,
+    DevicesSnapshot,
+    wait_settled,
+    wait_settled_async,
+)
+from wb_mqtt_topic_manager.topics import parse_topic
+
+
+class WarmStartCache:
+    """
+    Сохраняемый на диске снимок retained состояния дерева /devices/.
+
+    При создании снимок читается из файла, и ObserverDevice, ObserverControl
+    и DeviceRegistry, созданные с cache.snapshot, заполнены сразу, не дожидаясь
+    retained сообщений брокера. После attach снимок обновляется сообщениями
+    брокера, изменения дописываются в файл общим планировщиком клиента,
+    а reconcile удаляет из снимка состояние, которого больше нет в брокере.
+
+    Файл - журнал строк JSON [топик, данные] в порядке прихода, пустые данные
+    означают удаление retained сообщения. Когда записей в журнале становится
+    в compact_ratio раз больше, чем топиков, журнал перезаписывается текущим
+    состоянием. Оборванная последняя строка (после аварийного завершения)
+    пропускается при чтении.
+
+    Пример:
+        cache = WarmStartCache('/var/lib/app/devices.cache')
+        cache.attach(client)
+        device = ObserverDevice.create(client, 'wb-msw', snapshot=cache.snapshot)
+        ...
+        stale = cache.reconcile()
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 1.0,
+        compact_ratio: float = 4.0,
+    ):
+        """
+        Инициализация и чтение снимка из файла.
+
+        Args:
+            path: Путь к файлу кеша
+            flush_interval: Интервал записи изменений в файл в секундах
+            compact_ratio: Отношение записей журнала к количеству топиков,
+                при котором журнал перезаписывается
+        """
+        if compact_ratio <= 1:
+            raise ValueError('compact_ratio must be greater than 1')
+
+        self.path = os.fspath(path)
+        self.flush_interval = flush_interval
+        self.compact_ratio = compact_ratio
+        self.snapshot = DevicesSnapshot()
+
+        self._lock = threading.Lock()
+        # Порядок записи в файл, берется до self._lock
+        self._io_lock = threading.Lock()
+        # Топик -> данные последнего retained сообщения
+        self._state: Dict[str, str] = {}
+        # Записи, ожидающие записи в файл
+        self._buffer: List[bytes] = []
+        # Количество записей в файле журнала
+        self._records = 0
+        # Топики, полученные от брокера после attach
+        self._seen: Set[str] = set()
+        self._changed = threading.Event()
+        self._client = None
+        self._timer: Optional[TimerHandle] = None
+
+        self._load()
+
+    @staticmethod
+    def _is_cached(topic: str) -> bool:
+        """Сохраняется ли топик в кеше"""
+        parsed = parse_topic(topic)
+        return parsed is not None and parsed[2] != TopicKind.ON
+
+    def _load(self):
+        """Чтение журнала и заполнение снимка"""
+        try:
+            with open(self.path, 'rb') as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return
+
+        for line in lines:
+            try:
+                topic, text = json_loads(line)
+            except Exception:
+                continue
+            if not isinstance(topic, str) or not isinstance(text, str):
+                continue
+            if not self._is_cached(topic):
+                continue
+
+            self._records += 1
+            if text:
+                self._state[topic] = text
+            else:
+                self._state.pop(topic, None)
+
+        for topic, text in self._state.items():
+            self.snapshot.apply(topic, text)
+
+        if self._needs_compaction():
+            self.compact()
+
+    def attach(self, client):
+        """
+        Подписка на дерево /devices/ для обновления кеша.
+
+        Args:
+            client: MQTT клиент (подписка восстанавливается после
+                переподключения)
+        """
+        self._client = client
+        client.subscribe(
+            DEVICES_FILTER, self._on_message, qos=QosType.QOS_ONE, raw=True
+        )
+
+    def _on_message(self, topic, payload):
+        if not self._is_cached(topic):
+            return
+
+        try:
+            text = payload.text
+        except UnicodeDecodeError:
+            return
+
+        with self._lock:
+            self._seen.add(topic)
+            changed = self._state.get(topic, '') != text
+            if changed:
+                if text:
+                    self._state[topic] = text
+                else:
+                    del self._state[topic]
+                self._buffer.append(json_dumps([topic, text]) + b'\n')
+                self._schedule()
+
+        # Совпадающие с кешем retained сообщения не разбираются повторно
+        if changed:
+            if text:
+                self.snapshot.apply(topic, text)
+            else:
+                self.snapshot.discard(topic)
+        self._changed.set()
+
+    def _schedule(self):
+        """Планирование записи в файл (под блокировкой)"""
+        # Задача отменяется и при остановке планировщика
+        timer = self._timer
+        if (timer is None or timer.cancelled) and self._client is not None:
+            self._timer = self._client.scheduler.call_later(
+                self.flush_interval, self.flush
+            )
+
+    def _needs_compaction(self) -> bool:
+        """Превышен ли размер журнала (под блокировкой или при чтении)"""
+        return self._records > max(64, self.compact_ratio * len(self._state))
+
+    def flush(self):
+        """Запись накопленных изменений в файл"""
+        # Файл пишется вне self._lock, чтобы не задерживать сетевой поток
+        with self._io_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                buffer, self._buffer = self._buffer, []
+
+            if buffer:
+                with open(self.path, 'ab') as file:
+                    file.writelines(buffer)
+
+            with self._lock:
+                self._records += len(buffer)
+                compact = self._needs_compaction()
+
+        if compact:
+            self.compact()
+
+    def compact(self):
+        """Перезапись журнала текущим состоянием"""
+        with self._io_lock:
+            with self._lock:
+                # Накопленные изменения уже в состоянии
+                state = list(self._state.items())
+                self._buffer.clear()
+
+            temporary = f'{self.path}.tmp'
+            with open(temporary, 'wb') as file:
+                file.writelines(
+                    json_dumps([topic, text]) + b'\n' for topic, text in state
+                )
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.path)
+
+            with self._lock:
+                self._records = len(state)
+
+    def _prune(self) -> List[str]:
+        """Удаление топиков, не полученных от брокера после attach"""
+        with self._lock:
+            # Без сообщений брокера (нет подключения) кеш не сбрасывается
+            if not self._seen:
+                return []
+            stale = [topic for topic in self._state if topic not in self._seen]
+            for topic in stale:
+                del self._state[topic]
+
+        for topic in stale:
+            self.snapshot.discard(topic)
+        if stale:
+            self.compact()
+        return stale
+
+    def reconcile(self, settle_time: float = 0.5, timeout: float = 10) -> List[str]:
+        """
+        Сверка кеша с retained сообщениями брокера.
+
+        Ожидает подтверждения подписки и окончания потока retained сообщений
+        (как bootstrap) и удаляет из кеша и снимка топики, по которым брокер
+        ничего не прислал: такие устройства и контролы удалены, пока
+        наблюдатель не работал.
+
+        Args:
+            settle_time: Пауза без сообщений, после которой поток retained
+                сообщений считается завершенным, в секундах
+            timeout: Максимальное время ожидания в секундах
+
+        Если подписка не подтверждена за timeout или брокер не прислал
+        ни одного сообщения, кеш не изменяется.
+
+        Returns:
+            list: Удаленные топики
+        """
+        deadline = time.monotonic() + timeout
+        client = self._client
+        if client is None or not client.wait_subscribed(DEVICES_FILTER, timeout):
+            return []
+        wait_settled(self._changed, settle_time, deadline - time.monotonic())
+        return self._prune()
+
+    async def reconcile_async(
+        self, settle_time: float = 0.5, timeout: float = 10
+    ) -> List[str]:
+        """Вариант reconcile для AsyncMQTTClient, не блокирующий событийный цикл"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        client = self._client
+        if client is None or not await client.wait_subscribed(DEVICES_FILTER, timeout):
+            return []
+        await wait_settled_async(self._changed, settle_time, deadline - loop.time())
+        return self._prune()
+
+    def close(self):
+        """Отписка и запись накопленных изменений"""
+        if self._client is not None:
+            self._client.unsubscribe(DEVICES_FILTER, self._on_message)
+            self._client = None
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self._state)
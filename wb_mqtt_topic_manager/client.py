@@ -1,10 +1,244 @@
+import random
+import sys
 import threading
 import time
-from typing import Any, Callable, Dict, Optional
+import weakref
+from contextlib import contextmanager
+from functools import partial
+from types import MappingProxyType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import paho.mqtt.client as mqtt
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
 
-from wb_mqtt_topic_manager.constance import QosType
+from wb_mqtt_topic_manager.aliases import TopicAliases
+from wb_mqtt_topic_manager.coalescer import PublishCoalescer
+from wb_mqtt_topic_manager.constance import (
+    LegacyTopicsPolicy,
+    OverflowPolicy,
+    QosType,
+    ThrottlePolicy,
+)
+from wb_mqtt_topic_manager.deferred import DeferredPublisher
+from wb_mqtt_topic_manager.delivery import DeliveryTracker, PublishHandle
+from wb_mqtt_topic_manager.dispatcher import CallbackDispatcher
+from wb_mqtt_topic_manager.events import DEFAULT_KINDS, EventStream
+from wb_mqtt_topic_manager.metrics import MetricsRegistry
+from wb_mqtt_topic_manager.outbound import OutboundMessage, OutboundQueue
+from wb_mqtt_topic_manager.payload import Payload
+from wb_mqtt_topic_manager.profiler import CallbackProfiler
+from wb_mqtt_topic_manager.ratelimit import RateLimiter
+from wb_mqtt_topic_manager.scheduler import Scheduler
+from wb_mqtt_topic_manager.serializer import json_dumps
+from wb_mqtt_topic_manager.topics import (
+    classify_topic,
+    shared_filter,
+    split_shared_filter,
+)
+
+# Топик и вложенность текущего вызова callback-а в потоке, общие для всех
+# клиентов: callback устройства шарда может выполняться через другой клиент
+_trace = threading.local()
+
+
+# Общий пустой словарь листьев дерева, словарь узла создается с первым потомком
+_NO_CHILDREN: Mapping[str, '_TopicNode'] = MappingProxyType({})
+
+
+class _TopicNode:
+    """Узел дерева подписок"""
+
+    __slots__ = ('children', 'callbacks', 'keys')
+
+    def __init__(self):
+        self.children: Mapping[str, '_TopicNode'] = _NO_CHILDREN
+        # Callback-и всех записей узла, заменяются целиком
+        self.callbacks: tuple = ()
+        # Ключи записей, фильтр которых заканчивается в узле
+        self.keys: tuple = ()
+
+
+class TopicTrie:
+    """
+    Дерево фильтров подписок с поддержкой wildcard-ов MQTT (+ и #).
+
+    Поиск подписчиков входящего топика выполняется за O(глубина топика),
+    независимо от количества зарегистрированных фильтров. Чтение не требует
+    блокировки: кортежи callback-ов заменяются целиком при изменении, поэтому
+    сетевой поток всегда видит согласованное состояние.
+
+    Записи различаются ключом (по умолчанию - сам фильтр), поэтому общая
+    подписка $share/<group>/<filter> и обычная подписка на тот же фильтр
+    хранятся и удаляются независимо.
+    """
+
+    def __init__(self):
+        self._root = _TopicNode()
+        # Ключ записи -> (фильтр, узел)
+        self._filters: Dict[str, Tuple[str, _TopicNode]] = {}
+        # Ключ записи -> пары (callback, raw)
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        topic_filter: str,
+        callback: Optional[Callable] = None,
+        raw: bool = False,
+        key: Optional[str] = None,
+    ):
+        """
+        Регистрация фильтра и callback-а.
+
+        Args:
+            topic_filter: Фильтр топика (допускаются + и #)
+            callback: Функция обратного вызова (если None, регистрируется только фильтр)
+            raw: Callback получает Payload вместо декодированной строки
+            key: Ключ записи (если None, используется фильтр)
+        """
+        if key is None:
+            key = topic_filter
+
+        with self._lock:
+            entry = self._filters.get(key)
+            if entry is None:
+                node = self._root
+                for level in topic_filter.split('/'):
+                    child = node.children.get(level)
+                    if child is None:
+                        if node.children is _NO_CHILDREN:
+                            node.children = {}
+                        child = _TopicNode()
+                        # Уровни (meta, error, on, ...) повторяются во всех ветвях
+                        node.children[sys.intern(level)] = child
+                    node = child
+                node.keys = (*node.keys, key)
+                self._filters[key] = (topic_filter, node)
+            else:
+                node = entry[1]
+
+            if callback is not None:
+                self._entries[key] = (*self._entries.get(key, ()), (callback, raw))
+                self._refresh(node)
+
+    def remove(self, key: str, callback: Optional[Callable] = None) -> bool:
+        """
+        Удаление callback-а или всей записи.
+
+        Args:
+            key: Ключ записи (фильтр, если ключ не задавался)
+            callback: Конкретный callback для удаления (если None, удаляется запись)
+
+        Returns:
+            bool: True если запись удалена полностью
+        """
+        with self._lock:
+            entry = self._filters.get(key)
+            if entry is None:
+                return False
+            topic_filter, node = entry
+
+            if callback is not None:
+                callbacks = self._entries.get(key, ())
+                remaining = tuple(item for item in callbacks if item[0] != callback)
+                if len(remaining) == len(callbacks):
+                    return False
+                if remaining:
+                    self._entries[key] = remaining
+                    self._refresh(node)
+                    return False
+
+            self._entries.pop(key, None)
+            del self._filters[key]
+            node.keys = tuple(item for item in node.keys if item != key)
+            self._refresh(node)
+            if not node.keys:
+                self._prune(topic_filter.split('/'))
+            return True
+
+    def _refresh(self, node: _TopicNode):
+        """Пересборка callback-ов узла (под блокировкой)"""
+        node.callbacks = tuple(
+            item for key in node.keys for item in self._entries.get(key, ())
+        )
+
+    def _prune(self, levels: List[str]):
+        """Удаление пустых ветвей дерева"""
+        path = [self._root]
+        for level in levels:
+            path.append(path[-1].children[level])
+
+        for index in range(len(levels), 0, -1):
+            node = path[index]
+            if node.children or node.keys:
+                break
+            del path[index - 1].children[levels[index - 1]]
+
+    def callbacks(self, key: str) -> tuple:
+        """Callback-и записи (фильтра, если ключ не задавался)"""
+        return tuple(callback for callback, _ in self._entries.get(key, ()))
+
+    def match(self, topic: str) -> List[tuple]:
+        """
+        Поиск callback-ов всех фильтров, под которые попадает топик.
+
+        Args:
+            topic: Топик входящего сообщения (без wildcard-ов)
+
+        Returns:
+            list: Пары (callback, raw) всех совпавших фильтров
+        """
+        result: List[tuple] = []
+        levels = topic.split('/')
+        last = len(levels)
+        # Топики, начинающиеся с $, не попадают под wildcard на первом уровне
+        system_topic = topic.startswith('$')
+
+        stack = [(self._root, 0)]
+        while stack:
+            node, depth = stack.pop()
+
+            if not (system_topic and depth == 0):
+                multi = node.children.get('#')
+                if multi is not None:
+                    result.extend(multi.callbacks)
+
+            if depth == last:
+                if node.keys:
+                    result.extend(node.callbacks)
+                continue
+
+            child = node.children.get(levels[depth])
+            if child is not None:
+                stack.append((child, depth + 1))
+
+            if not (system_topic and depth == 0):
+                single = node.children.get('+')
+                if single is not None:
+                    stack.append((single, depth + 1))
+
+        return result
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._filters
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._filters))
+
+    def __len__(self) -> int:
+        return len(self._filters)
 
 
 class MQTTClient:
@@ -19,6 +253,26 @@ class MQTTClient:
         password: Optional[str] = None,
         keepalive: int = 60,
         clean_session: bool = True,
+        protocol: int = mqtt.MQTTv311,
+        topic_aliases: bool = True,
+        dispatch_workers: int = 0,
+        dispatch_queue_size: int = 1000,
+        dispatch_overflow: str = OverflowPolicy.BLOCK,
+        dispatch_block_timeout: Optional[float] = 1.0,
+        coalesce_interval: Optional[float] = None,
+        outbound_queue_size: Optional[int] = None,
+        outbound_max_inflight: int = 20,
+        outbound_overflow: str = OverflowPolicy.BLOCK,
+        outbound_block_timeout: Optional[float] = None,
+        serializer: Optional[Callable[[Any], Union[str, bytes]]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        profiler: Optional[CallbackProfiler] = None,
+        legacy_topics: str = LegacyTopicsPolicy.FULL,
+        rate_limit: Optional[float] = None,
+        rate_burst: Optional[float] = None,
+        global_rate_limit: Optional[float] = None,
+        global_rate_burst: Optional[float] = None,
+        throttle_policy: str = ThrottlePolicy.DELAY,
     ):
         """
         Инициализация MQTT клиента.
@@ -31,6 +285,43 @@ class MQTTClient:
             password: Пароль для аутентификации
             keepalive: Интервал keepalive в секундах
             clean_session: Очищать сессию при переподключении
+                (для MQTT v5 - clean start)
+            protocol: Версия протокола (mqtt.MQTTv311 или mqtt.MQTTv5)
+            topic_aliases: Использовать topic alias-ы для часто публикуемых
+                топиков значений (только MQTT v5, в пределах Topic Alias Maximum
+                брокера)
+            dispatch_workers: Количество потоков для выполнения callback-ов
+                (если 0, callback-и выполняются в сетевом потоке paho)
+            dispatch_queue_size: Размер очереди одного потока обработки
+            dispatch_overflow: Поведение при переполнении очереди обработки
+            dispatch_block_timeout: Максимальное ожидание места в очереди
+                обработки для политики BLOCK в секундах. Ожидание блокирует
+                сетевой поток paho, поэтому по истечении сообщение отбрасывается
+                (если None, ожидание не ограничено и keepalive может не успеть)
+            coalesce_interval: Интервал схлопывания публикаций в retained топики
+                в секундах (если None, публикации отправляются сразу)
+            outbound_queue_size: Размер исходящей очереди (если None, сообщения
+                передаются в paho сразу, без ограничения)
+            outbound_max_inflight: Максимальное количество неподтвержденных
+                QoS 1/2 сообщений при включенной исходящей очереди
+            outbound_overflow: Поведение при переполнении исходящей очереди
+            outbound_block_timeout: Максимальное ожидание места в исходящей
+                очереди для политики BLOCK
+            serializer: Функция сериализации payload, не являющихся str или bytes
+                (если None, используется JSON через orjson или json)
+            metrics: Реестр метрик (если None, создается собственный)
+            profiler: Профилировщик callback-ов (если None, не используется)
+            legacy_topics: Публикация топиков устаревшей конвенции устройствами
+                и контролами драйвера (LegacyTopicsPolicy), может быть
+                переопределена для устройства
+            rate_limit: Публикаций значений и ошибок в секунду для каждого
+                устройства драйвера (если None, без ограничения, может быть
+                задано для устройства)
+            rate_burst: Допустимая пачка публикаций устройства
+            global_rate_limit: Публикаций значений и ошибок в секунду для всех
+                устройств подключения
+            global_rate_burst: Допустимая пачка публикаций всех устройств
+            throttle_policy: Поведение при превышении ограничения (ThrottlePolicy)
         """
         self.broker_host = broker_host
         self.broker_port = broker_port
@@ -38,17 +329,29 @@ class MQTTClient:
         self.password = password
         self.keepalive = keepalive
         self.clean_session = clean_session
+        self.protocol = protocol
+        self.serializer = serializer or json_dumps
+
+        if legacy_topics not in LegacyTopicsPolicy.POLICIES:
+            raise ValueError(f'Unknown legacy topics policy: {legacy_topics}')
+        self.legacy_topics = legacy_topics
 
         self.client = mqtt.Client(
             client_id=client_id,
-            clean_session=clean_session,
-            protocol=mqtt.MQTTv311,
+            # В MQTT v5 сессия задается при подключении (clean_start)
+            clean_session=None if protocol == mqtt.MQTTv5 else clean_session,
+            protocol=protocol,
             callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+            # Переподключение выполняется в _reconnect_loop
+            reconnect_on_failure=False,
         )
 
         # Настройка callback-ов
         self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
         self.client.on_message = self._on_message
+        self.client.on_publish = self._on_publish
+        self.client.on_subscribe = self._on_subscribe
 
         # Настройка аутентификации
         if username and password:
@@ -57,20 +360,259 @@ class MQTTClient:
         # Состояние
         self.is_connected = False
         self._connection_lock = threading.Lock()
-        self._message_callbacks: Dict[str, list] = {}
+        self._message_callbacks = TopicTrie()
+        self._subscriptions: Dict[str, int] = {}
+
+        # Подписки, подтвержденные брокером (SUBACK) в текущем подключении
+        self._suback = threading.Condition()
+        self._suback_pending: Dict[int, List[str]] = {}
+        self._subscribed: Set[str] = set()
+
+        # Пакетная подписка
+        self._batch_lock = threading.Lock()
+        self._batch_depth = 0
+        self._batch_subscribe: Dict[str, int] = {}
+        self._batch_unsubscribe: Dict[str, None] = {}
+        self._batch_new: Set[str] = set()
+
+        # Жизненный цикл подключения
+        self._connect_event = threading.Event()
+        self._disconnect_event = threading.Event()
+        self._stopping = False
+        self._reconnect_lock = threading.Lock()
+        self._reconnect_stop = threading.Event()
+        self._reconnect_thread: Optional[threading.Thread] = None
+
+        # Пул потоков для callback-ов
+        self._dispatcher: Optional[CallbackDispatcher] = None
+        if dispatch_workers > 0:
+            self._dispatcher = CallbackDispatcher(
+                deliver=self._deliver,
+                workers=dispatch_workers,
+                queue_size=dispatch_queue_size,
+                overflow_policy=dispatch_overflow,
+                block_timeout=dispatch_block_timeout,
+            )
+
+        # Общий таймер для отложенных задач
+        self.scheduler = Scheduler()
+        # Политики публикации контролов, таймеры которых останавливаются
+        # при отключении
+        self._policy_publishers = weakref.WeakSet()
+
+        # Отслеживаемые публикации (publish(..., track=True))
+        self._delivery = DeliveryTracker()
+
+        # Исходящая очередь
+        self._outbound: Optional[OutboundQueue] = None
+        if outbound_queue_size is not None:
+            self._outbound = OutboundQueue(
+                send=self._send,
+                ready=lambda: self.is_connected,
+                max_size=outbound_queue_size,
+                max_inflight=outbound_max_inflight,
+                overflow_policy=outbound_overflow,
+                block_timeout=outbound_block_timeout,
+            )
+            # Количество сообщений в полете ограничивает очередь
+            self.client.max_inflight_messages_set(0)
+
+        # Схлопывание публикаций в retained топики
+        self._coalescer: Optional[PublishCoalescer] = None
+        if coalesce_interval is not None:
+            self._coalescer = PublishCoalescer(
+                send=self._submit,
+                scheduler=self.scheduler,
+                interval=coalesce_interval,
+                track=self._delivery.register_many,
+            )
+
+        # Ограничение частоты публикаций устройств
+        self._rate_limiter_kwargs = {
+            'rate': rate_limit,
+            'burst': rate_burst,
+            'global_rate': global_rate_limit,
+            'global_burst': global_rate_burst,
+            'overflow': throttle_policy,
+        }
+        self.rate_limiter: Optional[RateLimiter] = None
+        if rate_limit is not None or global_rate_limit is not None:
+            self._create_rate_limiter()
+        elif throttle_policy not in ThrottlePolicy.POLICIES:
+            raise ValueError(f'Unknown throttle policy: {throttle_policy}')
+
+        # Фоновые низкоприоритетные публикации
+        self._deferred = DeferredPublisher(
+            send=lambda *args: MQTTClient.publish(self, *args),
+            ready=lambda: self.is_connected,
+            scheduler=self.scheduler,
+        )
+
+        # Метрики
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self._publish_started: Dict[int, tuple] = {}
+        self._register_gauges()
+
+        # Ожидание подтверждения публикаций (flush)
+        self._acked = threading.Condition()
+
+        # Topic alias-ы MQTT v5
+        self._aliases: Optional[TopicAliases] = None
+        self._alias_lock = threading.Lock()
+        # Без доступа к очереди paho alias-ы нельзя безопасно сбросить
+        if protocol == mqtt.MQTTv5 and topic_aliases and self._paho_out_queue():
+            self._aliases = TopicAliases()
+
+        # Профилирование callback-ов
+        self.profiler = profiler
 
         # Таймауты
         self.connect_timeout = 10  # секунд
-        self.reconnect_delay = 5  # секунд
-        self.max_reconnect_attempts = 5
+        self.reconnect_delay = 1  # секунд, начальная задержка
+        self.reconnect_max_delay = 60  # секунд
+        self.max_reconnect_attempts: Optional[int] = None  # None - без ограничения
+        self.subscribe_batch_size = 100  # фильтров в одном SUBSCRIBE
+
+    def _create_rate_limiter(self) -> RateLimiter:
+        """Создание ограничителя частоты публикаций"""
+        self.rate_limiter = RateLimiter(
+            publish=lambda *args: MQTTClient.publish(self, *args),
+            scheduler=self.scheduler,
+            **self._rate_limiter_kwargs,
+        )
+        return self.rate_limiter
+
+    def _register_gauges(self):
+        """Регистрация gauge-метрик очередей клиента"""
+        metrics = self.metrics
+        metrics.gauge('connected', lambda: int(self.is_connected))
+        metrics.gauge('subscriptions', lambda: len(self._subscriptions))
+        if self._dispatcher is not None:
+            metrics.gauge('dispatch_queue_depth', self._dispatcher.queue_depth)
+        if self._outbound is not None:
+            metrics.gauge('outbound_queue_depth', lambda: self._outbound.depth)
+            metrics.gauge('outbound_inflight', lambda: self._outbound.stats['inflight'])
+        if self._coalescer is not None:
+            metrics.gauge('coalesce_pending', lambda: self._coalescer.stats['pending'])
 
     def _on_connect(self, client, userdata, flags, reason_code, properties):
         """Обработчик подключения для API версии 2"""
         if reason_code == 0:
             self.is_connected = True
+            # Время подтверждений прошлой сессии не измерить
+            self._publish_started.clear()
+            if self._aliases is not None:
+                self._reset_aliases(properties)
+            self.resume_policies()
+            # Подтверждения прошлой сессии уже не придут
+            if self._coalescer is not None:
+                self._coalescer.reset()
+            if self._outbound is not None:
+                self._outbound.reset_inflight()
+            with self._suback:
+                self._suback_pending.clear()
+                self._subscribed.clear()
+                # Брокер сохранил подписки сессии
+                if flags.session_present:
+                    self._subscribed.update(self._subscriptions)
+                self._suback.notify_all()
+            # Брокер не сохранил подписки, восстанавливаем их
+            if not flags.session_present:
+                self._resubscribe()
         else:
             self.is_connected = False
 
+        self._connect_event.set()
+
+    def _reset_aliases(self, properties: Optional[Properties]):
+        """Сброс topic alias-ов нового подключения"""
+        maximum = getattr(properties, 'TopicAliasMaximum', 0) if properties else 0
+
+        with self._alias_lock:
+            pending = self._aliases.reset(maximum)
+
+        # Alias-ы прошлого подключения недействительны, неподтвержденные
+        # сообщения paho повторит после on_connect с полным топиком
+        self._unalias_queued(pending)
+
+    def _paho_out_queue(self) -> Optional[tuple]:
+        """
+        Очередь неподтвержденных исходящих сообщений paho и ее блокировка.
+
+        Публичного доступа к очереди в paho нет, это единственное место,
+        обращающееся к внутренним атрибутам Client. Проверено с версией paho-mqtt,
+        зафиксированной в pyproject.toml.
+
+        Returns:
+            tuple: (OrderedDict mid -> MQTTMessage, блокировка) или None,
+                если в установленной версии paho атрибутов нет
+        """
+        messages = getattr(self.client, '_out_messages', None)
+        mutex = getattr(self.client, '_out_message_mutex', None)
+        if messages is None or mutex is None:
+            return None
+        return messages, mutex
+
+    def _unalias_queued(self, pending: Dict[int, str]):
+        """Замена alias-а полным топиком в сообщениях очереди paho"""
+        queue = self._paho_out_queue()
+        if queue is None or not pending:
+            return
+
+        messages, mutex = queue
+        with mutex:
+            for mid, topic in pending.items():
+                message = messages.get(mid)
+                if message is not None:
+                    message.topic = topic.encode('utf-8')
+                    message.properties = None
+
+    def _connect_kwargs(self) -> Dict[str, Any]:
+        """Параметры подключения paho"""
+        kwargs = {
+            'host': self.broker_host,
+            'port': self.broker_port,
+            'keepalive': self.keepalive,
+        }
+        if self.protocol == mqtt.MQTTv5:
+            kwargs['clean_start'] = self.clean_session
+            if not self.clean_session:
+                # Сессия сохраняется после отключения, как в MQTT 3.1.1
+                properties = Properties(PacketTypes.CONNECT)
+                properties.SessionExpiryInterval = 0xFFFFFFFF
+                kwargs['properties'] = properties
+        return kwargs
+
+    def _on_disconnect(self, client, userdata, flags, reason_code, properties):
+        """Обработчик отключения для API версии 2"""
+        self._reset_connection_state()
+
+        # Соединение потеряно не по запросу пользователя
+        if not self._stopping:
+            self._start_reconnect()
+
+    def _reset_connection_state(self):
+        """Сброс состояния подключения при отключении"""
+        self.is_connected = False
+        self._disconnect_event.set()
+        # Подписки подтверждаются заново после подключения
+        with self._suback:
+            self._subscribed.clear()
+            self._suback_pending.clear()
+            self._suback.notify_all()
+
+    def _start_network(self):
+        """Запуск сетевого цикла и пула обработки"""
+        # Пул должен работать до прихода первых сообщений
+        if self._dispatcher is not None:
+            self._dispatcher.start()
+
+        if self._outbound is not None:
+            self._outbound.start()
+
+        # Запуск сетевого цикла в отдельном потоке
+        self.client.loop_start()
+
     def connect(self) -> bool:
         """
         Подключение к MQTT брокеру.
@@ -82,72 +624,190 @@ class MQTTClient:
             if self.is_connected:
                 return True
 
-            try:
-                # Подключение с таймаутом
-                self.client.connect(
-                    host=self.broker_host,
-                    port=self.broker_port,
-                    keepalive=self.keepalive,
-                )
-
-                # Запуск сетевого цикла в отдельном потоке
-                self.client.loop_start()
-
-                # Ожидание подключения
-                for _ in range(self.connect_timeout):
-                    if self.is_connected:
-                        return True
-                    time.sleep(1)
-
-                # Таймаут подключения
-                self.client.loop_stop()
-                return False
+            self._stopping = False
+            self._connect_event.clear()
 
+            try:
+                self.client.connect(**self._connect_kwargs())
+                self._start_network()
             except Exception:
                 return False
 
+            # Ожидание CONNACK
+            if self._connect_event.wait(self.connect_timeout) and self.is_connected:
+                return True
+
+            # Таймаут подключения или отказ брокера
+            self._stopping = True
+            self._stop_reconnect()
+            self.client.loop_stop()
+            return False
+
     def disconnect(self):
         """Отключение от MQTT брокера"""
         with self._connection_lock:
-            if not self.is_connected:
+            reconnecting = self._reconnect_thread is not None
+            if not self.is_connected and not reconnecting:
                 return
 
+            self._stopping = True
+            self._stop_reconnect()
+
+            # Отправка накопленных публикаций до отключения
+            self.suspend_policies()
+            if self.is_connected:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.flush()
+                self._deferred.flush()
+            if self._coalescer is not None:
+                self._coalescer.flush()
+            if self._outbound is not None and self.is_connected:
+                self._outbound.wait_empty(self.connect_timeout)
+
             try:
+                if self.is_connected:
+                    self._disconnect_event.clear()
+                    self.client.disconnect()
+
+                    # Ожидание отправки DISCONNECT сетевым потоком
+                    self._disconnect_event.wait(self.connect_timeout)
+
                 # Остановка сетевого цикла
                 self.client.loop_stop()
 
-                # Отключение
-                self.client.disconnect()
+                self.is_connected = False
+                # Неподтвержденные публикации paho уже не отправит
+                self._delivery.fail_all()
+                self._publish_started.clear()
 
-                # Ожидание завершения отключения
-                time.sleep(1)
+                if self._outbound is not None:
+                    self._outbound.stop()
 
-                self.is_connected = False
+                # Обработка уже полученных сообщений и остановка пула
+                if self._dispatcher is not None:
+                    self._dispatcher.stop()
 
             except Exception:
                 pass
 
-    def reconnect(self) -> bool:
+            self.scheduler.stop()
+
+    def register_policy(self, publisher):
+        """
+        Регистрация PolicyPublisher контрола.
+
+        Таймеры зарегистрированных политик останавливаются при disconnect
+        и запускаются снова после подключения.
+        """
+        self._policy_publishers.add(publisher)
+
+    def suspend_policies(self):
+        """Публикация отложенных политиками значений и остановка их таймеров"""
+        for publisher in list(self._policy_publishers):
+            publisher.suspend()
+
+    def resume_policies(self):
+        """Запуск таймеров политик публикации"""
+        for publisher in list(self._policy_publishers):
+            publisher.resume()
+
+    def reconnect(self, timeout: Optional[float] = None) -> bool:
         """
         Переподключение к брокеру.
 
+        Переподключение выполняется в фоновом потоке, метод только ожидает
+        его результат.
+
+        Args:
+            timeout: Максимальное ожидание подключения в секундах
+                (если None, используется connect_timeout)
+
         Returns:
-            bool: True если переподключение успешно, False в противном случае
+            bool: True если подключение восстановлено за время ожидания
         """
+        if timeout is None:
+            timeout = self.connect_timeout
+
         # Если подключен, сначала отключаемся
         if self.is_connected:
             self.disconnect()
 
-        # Попытки переподключения
-        for attempt in range(1, self.max_reconnect_attempts + 1):
-            if self.connect():
-                return True
+        # Клиент еще ни разу не подключался
+        if not self.client.host:
+            return self.connect()
 
-            if attempt < self.max_reconnect_attempts:
-                delay = self.reconnect_delay * attempt
-                time.sleep(delay)
+        with self._connection_lock:
+            self._stopping = False
+            self._connect_event.clear()
+            self._start_reconnect(immediate=True)
 
-        return False
+        return self._connect_event.wait(timeout) and self.is_connected
+
+    def _reconnect_backoff(self, attempt: int) -> float:
+        """Задержка перед попыткой переподключения с джиттером"""
+        delay = min(self.reconnect_max_delay, self.reconnect_delay * 2**attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _start_reconnect(self, immediate: bool = False):
+        """Запуск фонового переподключения"""
+        with self._reconnect_lock:
+            if self._reconnect_thread is not None:
+                return
+
+            self._reconnect_stop.clear()
+            self._reconnect_thread = threading.Thread(
+                target=self._reconnect_loop,
+                args=(immediate,),
+                name='mqtt-reconnect',
+                daemon=True,
+            )
+            self._reconnect_thread.start()
+
+    def _stop_reconnect(self):
+        """Остановка фонового переподключения"""
+        with self._reconnect_lock:
+            thread, self._reconnect_thread = self._reconnect_thread, None
+            self._reconnect_stop.set()
+            # Прерывание ожидания CONNACK
+            self._connect_event.set()
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _reconnect_loop(self, immediate: bool):
+        """Попытки переподключения с экспоненциальной задержкой и джиттером"""
+        attempt = 0
+
+        try:
+            while not self._reconnect_stop.is_set():
+                if self.max_reconnect_attempts is not None:
+                    if attempt >= self.max_reconnect_attempts:
+                        break
+
+                if attempt or not immediate:
+                    if self._reconnect_stop.wait(self._reconnect_backoff(attempt)):
+                        break
+                attempt += 1
+
+                # Сетевой поток завершается сам после потери соединения
+                self.client.loop_stop()
+
+                self._connect_event.clear()
+                try:
+                    self.client.reconnect()
+                    self._start_network()
+                except Exception:
+                    continue
+
+                self._connect_event.wait(self.connect_timeout)
+                if self.is_connected or self._reconnect_stop.is_set():
+                    break
+        finally:
+            with self._reconnect_lock:
+                if self._reconnect_thread is threading.current_thread():
+                    self._reconnect_thread = None
+            # Пробуждение ожидающих, если попытки исчерпаны
+            self._connect_event.set()
 
     def __enter__(self):
         """Поддержка открытия контекстного менеджера"""
@@ -158,6 +818,51 @@ class MQTTClient:
         """Поддержка закрытия контекстного менеджера"""
         self.disconnect()
 
+    @property
+    def dispatch_stats(self) -> Dict[str, int]:
+        """Счетчики пула обработки callback-ов (пусто, если пул не используется)"""
+        if self._dispatcher is None:
+            return {}
+        return self._dispatcher.stats
+
+    @property
+    def deferred_stats(self) -> Dict[str, int]:
+        """Счетчики фоновых публикаций"""
+        return self._deferred.stats
+
+    @property
+    def delivery_stats(self) -> Dict[str, int]:
+        """Счетчики отслеживаемых публикаций"""
+        return self._delivery.stats
+
+    @property
+    def throttle_stats(self) -> Dict[str, Dict[str, int]]:
+        """Счетчики ограничения частоты по устройствам (пусто без ограничения)"""
+        if self.rate_limiter is None:
+            return {}
+        return self.rate_limiter.stats
+
+    @property
+    def coalesce_stats(self) -> Dict[str, int]:
+        """Счетчики схлопывания публикаций (пусто, если схлопывание отключено)"""
+        if self._coalescer is None:
+            return {}
+        return self._coalescer.stats
+
+    @property
+    def outbound_stats(self) -> Dict[str, Any]:
+        """Счетчики исходящей очереди (пусто, если очередь не используется)"""
+        if self._outbound is None:
+            return {}
+        return self._outbound.stats
+
+    @property
+    def alias_stats(self) -> Dict[str, int]:
+        """Счетчики topic alias-ов (пусто, если alias-ы не используются)"""
+        if self._aliases is None:
+            return {}
+        return self._aliases.stats
+
     @property
     def connection_info(self) -> Dict[str, Any]:
         """Информация о подключении"""
@@ -176,89 +881,538 @@ class MQTTClient:
         payload: Any,
         qos: int = QosType.QOS_ZERO,
         retain: bool = False,
-    ) -> bool:
+        track: bool = False,
+    ) -> Union[bool, PublishHandle]:
         """
         Публикация сообщения в топик.
 
+        Если включено схлопывание, публикации в retained топики откладываются
+        на coalesce_interval, и из нескольких значений одного топика
+        отправляется только последнее.
+
+        Если включена исходящая очередь, при ее переполнении вызов блокируется
+        или возвращает False в зависимости от outbound_overflow.
+
+        С track=True возвращается PublishHandle, который завершается по
+        подтверждению брокера. Подтверждения тысяч публикаций можно ожидать
+        одним вызовом delivery.wait_all.
+
         Args:
             topic: MQTT топик
             payload: Данные для отправки (строка, bytes или JSON-сериализуемый объект)
             qos: Качество обслуживания (0, 1, 2)
             retain: Сохранять сообщение для новых подписчиков
+            track: Вернуть PublishHandle для отслеживания доставки
 
         Returns:
             bool: True если публикация инициирована успешно
+            PublishHandle: Handle публикации, если track=True
         """
+        if not track:
+            return self._publish(topic, payload, qos, retain, None)
+
+        handle = PublishHandle(topic, self._delivery)
+        if not self._publish(topic, payload, qos, retain, handle):
+            self._delivery.complete(handle, False)
+        return handle
+
+    def _publish(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int,
+        retain: bool,
+        handle: Optional[PublishHandle],
+    ) -> bool:
+        """Публикация с необязательным отслеживанием доставки"""
         if not self.is_connected:
             return False
 
         try:
             # Преобразование payload
             if not isinstance(payload, (str, bytes)):
-                import json
-
-                payload = json.dumps(payload)
+                payload = self.serializer(payload)
 
-            # Публикация
-            result = self.client.publish(topic, payload, qos=qos, retain=retain)
+            if retain and self._coalescer is not None:
+                self._coalescer.add(topic, payload, qos, handle)
+                return True
 
-            return result.rc == mqtt.MQTT_ERR_SUCCESS
+            on_sent = None
+            if handle is not None:
+                on_sent = partial(self._delivery.register, handle)
+            return self._submit(topic, payload, qos, retain, on_sent)
 
         except Exception:
+            self.metrics.inc('publish_errors_total', classify_topic(topic))
             return False
 
+    def publish_limited(
+        self,
+        device_id: str,
+        topic: str,
+        payload: Any,
+        qos: int = QosType.QOS_ZERO,
+        retain: bool = False,
+    ) -> Any:
+        """
+        Публикация устройства с учетом ограничения частоты.
+
+        Публикации сверх ограничения откладываются или схлопываются согласно
+        throttle_policy. Без ограничения равносильна publish.
+
+        Returns:
+            Результат publish или True, если публикация отложена
+        """
+        if self.rate_limiter is None:
+            return self.publish(topic, payload, qos=qos, retain=retain)
+        return self.rate_limiter.submit(device_id, topic, payload, qos, retain)
+
+    def set_rate_limit(
+        self, device_id: str, rate: Optional[float], burst: Optional[float] = None
+    ):
+        """
+        Ограничение частоты публикаций устройства.
+
+        Args:
+            device_id: Идентификатор устройства
+            rate: Публикаций в секунду (если None, только общее ограничение)
+            burst: Допустимая пачка публикаций (по умолчанию rate)
+        """
+        limiter = self.rate_limiter or self._create_rate_limiter()
+        limiter.set_limit(device_id, rate, burst)
+
+    def publish_deferred(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int = QosType.QOS_ZERO,
+        retain: bool = False,
+    ):
+        """
+        Фоновая публикация с низким приоритетом.
+
+        Сообщение отправляется позже, порциями вместе с другими фоновыми
+        публикациями, или при отключении клиента.
+
+        Args:
+            topic: MQTT топик
+            payload: Данные для отправки (строка, bytes или JSON-сериализуемый объект)
+            qos: Качество обслуживания (0, 1, 2)
+            retain: Сохранять сообщение для новых подписчиков
+        """
+        self._deferred.add(topic, payload, qos, retain)
+
+    def _submit(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int,
+        retain: bool,
+        on_sent: Optional[Callable] = None,
+    ) -> bool:
+        """
+        Передача сообщения в исходящую очередь или сразу в paho.
+
+        Args:
+            on_sent: Функция, вызываемая с MQTTMessageInfo (или None)
+                после передачи сообщения в paho
+
+        Returns:
+            bool: True если сообщение принято
+        """
+        if self._outbound is not None:
+            message = OutboundMessage(topic, payload, qos, retain, on_sent)
+            return self._outbound.put(message, can_block=not self._in_network_thread())
+
+        info = self._send(topic, payload, qos, retain)
+        if on_sent is not None:
+            on_sent(info)
+        return info is not None
+
+    def _in_network_thread(self) -> bool:
+        """Выполняется ли код в сетевом потоке paho"""
+        return threading.current_thread() is self.client._thread
+
+    def _send(
+        self, topic: str, payload: Any, qos: int, retain: bool
+    ) -> Optional[mqtt.MQTTMessageInfo]:
+        """
+        Передача сообщения в paho.
+
+        Returns:
+            MQTTMessageInfo: Информация о сообщении или None при ошибке
+        """
+        kind = classify_topic(topic)
+
+        try:
+            if self._aliases is None:
+                result = self.client.publish(topic, payload, qos=qos, retain=retain)
+            else:
+                result = self._publish_aliased(topic, payload, qos, retain)
+        except Exception:
+            result = None
+
+        if result is None or result.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.metrics.inc('publish_errors_total', kind)
+            return None
+
+        self.metrics.inc('messages_published_total', kind)
+        self._publish_started[result.mid] = (time.perf_counter(), kind)
+        # on_publish мог сработать до регистрации времени отправки
+        if result.is_published():
+            self._publish_started.pop(result.mid, None)
+
+        return result
+
+    def _publish_aliased(
+        self, topic: str, payload: Any, qos: int, retain: bool
+    ) -> mqtt.MQTTMessageInfo:
+        """Публикация с topic alias-ом MQTT v5"""
+        # Сброс alias-ов при переподключении не должен попасть между
+        # выбором alias-а и передачей сообщения в paho
+        with self._alias_lock:
+            wire_topic, alias = self._aliases.resolve(topic)
+            if alias is None:
+                return self.client.publish(topic, payload, qos=qos, retain=retain)
+
+            properties = Properties(PacketTypes.PUBLISH)
+            properties.TopicAlias = alias
+            result = self.client.publish(
+                wire_topic, payload, qos=qos, retain=retain, properties=properties
+            )
+            # Без подключения paho ставит QoS 1/2 сообщение в очередь
+            if result.rc in (mqtt.MQTT_ERR_SUCCESS, mqtt.MQTT_ERR_NO_CONN):
+                self._aliases.on_sent(result.mid, topic)
+
+        # on_publish мог сработать до регистрации публикации
+        if result.is_published():
+            self._aliases.on_published(result.mid)
+
+        return result
+
+    def _on_publish(self, client, userdata, mid, reason_code, properties):
+        """Обработчик подтверждения публикации для API версии 2"""
+        self._delivery.on_published(mid, not reason_code.is_failure)
+        if self._aliases is not None:
+            self._aliases.on_published(mid)
+        started = self._publish_started.pop(mid, None)
+        if started is not None:
+            sent_at, kind = started
+            self.metrics.observe(
+                'publish_ack_seconds', time.perf_counter() - sent_at, kind
+            )
+
+        if self._outbound is not None:
+            self._outbound.on_published(mid)
+        if self._coalescer is not None:
+            self._coalescer.on_published(mid)
+
+        if not self._publish_started:
+            with self._acked:
+                self._acked.notify_all()
+
+    def _has_unacked(self) -> bool:
+        """Есть ли неотправленные или неподтвержденные публикации"""
+        if self._publish_started:
+            return True
+        if self._outbound is not None and self._outbound.depth:
+            return True
+        if self._coalescer is not None:
+            stats = self._coalescer.stats
+            return bool(stats['pending'] or stats['inflight'])
+        return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание подтверждения всех публикаций.
+
+        Ожидаются сообщения исходящей очереди и схлопывания, а также переданные
+        в paho и еще не подтвержденные (PUBACK/PUBCOMP, для QoS 0 - запись
+        в сокет). Фоновые публикации (publish_deferred) не ожидаются.
+        Без подключения подтверждений не будет, поэтому при неподтвержденных
+        публикациях сразу возвращается False.
+
+        Args:
+            timeout: Максимальное время ожидания в секундах
+                (если None, без ограничения)
+
+        Returns:
+            bool: True если все публикации подтверждены
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._acked:
+            while self._has_unacked():
+                if not self.is_connected:
+                    return False
+                wait = 0.1
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                # Очереди не сообщают об отправке, поэтому ожидание ограничено
+                self._acked.wait(wait)
+
+        return True
+
     def subscribe(
         self,
         topic: str,
         callback: Callable[[str, Any], None] = None,
         qos: int = QosType.QOS_ZERO,
+        raw: bool = False,
+        share_group: Optional[str] = None,
     ):
         """
         Подписка на топик.
 
+        Подписка сохраняется и восстанавливается после переподключения.
+        Если клиент не подключен, SUBSCRIBE будет отправлен при подключении.
+
+        Общая подписка ($share/<group>/<filter>) распределяет сообщения между
+        клиентами группы, callback вызывается по топику сообщения без префикса.
+        Retained сообщения по общей подписке брокер не присылает.
+        Общая и обычная подписки на один фильтр хранятся и отменяются
+        независимо. Брокер присылает отдельную копию сообщения по каждой из
+        них, а без идентификаторов подписок копии не различить, поэтому
+        каждая копия передается callback-ам обеих подписок.
+
         Args:
-            topic: MQTT топик для подписки
+            topic: MQTT топик для подписки (допускается форма $share/<group>/...)
             callback: Функция обратного вызова (topic, payload)
             qos: Качество обслуживания
+            raw: Передавать в callback объект Payload без декодирования,
+                иначе payload передается строкой
+            share_group: Группа общей подписки
         """
+        topic, wire_topic = self._split_subscription(topic, share_group)
+
+        # Сохранение callback, общая и обычная подписки на один фильтр
+        # хранятся отдельно
+        self._message_callbacks.add(topic, callback, raw, key=wire_topic)
+        is_new = wire_topic not in self._subscriptions
+        self._subscriptions[wire_topic] = max(
+            qos, self._subscriptions.get(wire_topic, qos)
+        )
+
+        # До SUBACK нового SUBSCRIBE подписка считается неподтвержденной
+        with self._suback:
+            self._subscribed.discard(wire_topic)
+
+        with self._batch_lock:
+            if self._batch_depth:
+                if is_new:
+                    self._batch_new.add(wire_topic)
+                self._batch_unsubscribe.pop(wire_topic, None)
+                self._batch_subscribe[wire_topic] = max(
+                    qos, self._batch_subscribe.get(wire_topic, qos)
+                )
+                return
+
         if not self.is_connected:
             return
 
-        try:
+        try:  # noqa: SIM105
             # Подписка
-            result = self.client.subscribe(topic, qos=qos)
+            self._track_suback(self.client.subscribe(wire_topic, qos=qos), [wire_topic])
+        except Exception:
+            pass
 
-            if result[0] == mqtt.MQTT_ERR_SUCCESS:
-                # Сохранение callback
-                if topic not in self._message_callbacks:
-                    self._message_callbacks[topic] = []
+    @staticmethod
+    def _split_subscription(
+        topic: str, share_group: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """
+        Фильтр для сопоставления сообщений и фильтр для отправки брокеру.
 
-                if callback:
-                    self._message_callbacks[topic].append(callback)
+        Returns:
+            tuple: (фильтр без $share/<group>/, фильтр подписки)
+        """
+        group, topic = split_shared_filter(topic)
+        group = share_group or group
+        if group is None:
+            return topic, topic
+        return topic, shared_filter(topic, group)
 
-        except Exception:
-            pass
+    def _resubscribe(self):
+        """Восстановление всех подписок"""
+        self._send_subscribe(list(self._subscriptions.items()))
+
+    def _send_subscribe(self, subscriptions: List[tuple]):
+        """Отправка пакетов SUBSCRIBE с несколькими фильтрами"""
+        for index in range(0, len(subscriptions), self.subscribe_batch_size):
+            chunk = subscriptions[index : index + self.subscribe_batch_size]
+            try:
+                result = self.client.subscribe(chunk)
+            except Exception:
+                self.metrics.inc('subscribe_errors_total')
+                continue
+            self._track_suback(result, [topic for topic, _ in chunk])
+            self.metrics.inc('subscribe_packets_total')
+            self.metrics.inc('subscribe_filters_total', value=len(chunk))
+
+    def _track_suback(self, result: tuple, topics: List[str]):
+        """Ожидание SUBACK отправленного SUBSCRIBE"""
+        rc, mid = result
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            return
+        with self._suback:
+            self._suback_pending[mid] = topics
+
+    def _on_subscribe(self, client, userdata, mid, reason_code_list, properties):
+        """Обработчик SUBACK для API версии 2"""
+        with self._suback:
+            topics = self._suback_pending.pop(mid, ())
+            for topic, reason_code in zip(topics, reason_code_list, strict=False):
+                if not reason_code.is_failure:
+                    self._subscribed.add(topic)
+            self._suback.notify_all()
+
+    def is_subscribed(self, topic: str, share_group: Optional[str] = None) -> bool:
+        """
+        Подтверждена ли брокером (SUBACK) последняя подписка на топик.
+
+        Args:
+            topic: MQTT топик подписки
+            share_group: Группа общей подписки, указанная при подписке
+        """
+        _, wire_topic = self._split_subscription(topic, share_group)
+        return wire_topic in self._subscribed
+
+    def wait_subscribed(
+        self,
+        topic: str,
+        timeout: Optional[float] = None,
+        share_group: Optional[str] = None,
+    ) -> bool:
+        """
+        Ожидание SUBACK подписки на топик.
+
+        Если клиент не подключен, ожидание включает подключение. Внутри
+        batch SUBSCRIBE отправляется только при выходе из блока.
+
+        Args:
+            topic: MQTT топик подписки
+            timeout: Максимальное время ожидания в секундах
+            share_group: Группа общей подписки, указанная при подписке
+
+        Returns:
+            bool: True если подписка подтверждена
+        """
+        _, wire_topic = self._split_subscription(topic, share_group)
+        with self._suback:
+            return self._suback.wait_for(
+                lambda: wire_topic in self._subscribed, timeout
+            )
+
+    def _send_unsubscribe(self, topics: List[str]):
+        """Отправка пакетов UNSUBSCRIBE с несколькими фильтрами"""
+        for index in range(0, len(topics), self.subscribe_batch_size):
+            try:  # noqa: SIM105
+                self.client.unsubscribe(
+                    topics[index : index + self.subscribe_batch_size]
+                )
+            except Exception:
+                pass
+
+    def events(
+        self,
+        device_id: Optional[str] = None,
+        kinds: Tuple[str, ...] = DEFAULT_KINDS,
+        maxsize: int = 10000,
+    ) -> EventStream:
+        """
+        Поток изменений устройств (значения, meta, meta/error).
+
+        Args:
+            device_id: Только события устройства (если None, всех устройств)
+            kinds: Классы топиков событий (TopicKind)
+            maxsize: Размер кольцевого буфера событий
 
-    def unsubscribe(self, topic: str, callback: Callable = None):
+        Returns:
+            EventStream: Поток событий ChangeEvent
+        """
+        return EventStream(self, device_id=device_id, kinds=kinds, maxsize=maxsize)
+
+    @contextmanager
+    def batch(self) -> Iterator['MQTTClient']:
+        """
+        Пакетная подписка и отписка.
+
+        Внутри блока callback-и регистрируются сразу, а SUBSCRIBE и UNSUBSCRIBE
+        копятся и при выходе из внешнего блока отправляются пакетами с несколькими
+        фильтрами. Блок действует на весь клиент, включая подписки из других
+        потоков.
+
+        Пример:
+            with client.batch():
+                for control_id in control_ids:
+                    ControlManager.connect_control(device, control_id)
+        """
+        with self._batch_lock:
+            self._batch_depth += 1
+
+        try:
+            yield self
+        finally:
+            self._end_batch()
+
+    def _end_batch(self):
+        """Выход из блока batch, отправка накопленного при выходе из внешнего"""
+        with self._batch_lock:
+            self._batch_depth -= 1
+            if self._batch_depth:
+                return
+
+            subscriptions = list(self._batch_subscribe.items())
+            unsubscriptions = list(self._batch_unsubscribe)
+            self._batch_subscribe.clear()
+            self._batch_unsubscribe.clear()
+            self._batch_new.clear()
+
+        if self.is_connected:
+            self._send_unsubscribe(unsubscriptions)
+            self._send_subscribe(subscriptions)
+
+    def unsubscribe(
+        self,
+        topic: str,
+        callback: Callable = None,
+        share_group: Optional[str] = None,
+    ):
         """
         Отписка от топика.
 
         Args:
             topic: MQTT топик для отписки
             callback: Конкретный callback для удаления (если None, удаляются все)
+            share_group: Группа общей подписки, указанная при подписке
         """
-        if topic in self._message_callbacks:
-            if callback:
-                if callback in self._message_callbacks[topic]:
-                    self._message_callbacks[topic].remove(callback)
-            else:
-                # Удаляем все callback-и для топика
-                self._message_callbacks.pop(topic, None)
+        _, wire_topic = self._split_subscription(topic, share_group)
+
+        if wire_topic in self._message_callbacks:
+            # Если callback не указан, удаляются все callback-и для топика
+            removed = self._message_callbacks.remove(wire_topic, callback)
 
             # Если больше нет callback-ов для топика, отписываемся от него
-            if topic not in self._message_callbacks:
+            if removed:
+                self._subscriptions.pop(wire_topic, None)
+                with self._suback:
+                    self._subscribed.discard(wire_topic)
+
+                with self._batch_lock:
+                    if self._batch_depth:
+                        self._batch_subscribe.pop(wire_topic, None)
+                        # SUBSCRIBE для нового фильтра еще не отправлялся
+                        if wire_topic in self._batch_new:
+                            self._batch_new.discard(wire_topic)
+                        else:
+                            self._batch_unsubscribe[wire_topic] = None
+                        return
+
                 try:  # noqa: SIM105
-                    self.client.unsubscribe(topic)
+                    self.client.unsubscribe(wire_topic)
                 except Exception:
                     pass
 
@@ -266,15 +1420,73 @@ class MQTTClient:
         """Обработчик входящих сообщений для API версии 2"""
         try:
             topic = message.topic
-            payload = message.payload.decode('utf-8')
 
-            # Вызов зарегистрированных callback-ов
-            if topic in self._message_callbacks:
-                for callback in self._message_callbacks[topic]:
-                    try:  # noqa: SIM105
-                        callback(topic, payload)
-                    except Exception:
-                        pass
+            # Поиск callback-ов всех совпавших фильтров, включая wildcard-ы.
+            # Без подписчиков сообщение не декодируется
+            callbacks = self._message_callbacks.match(topic)
+            if not callbacks:
+                self.metrics.inc('messages_unmatched_total')
+                return
+
+            self.metrics.inc('messages_received_total', classify_topic(topic))
+
+            payload = Payload(message.payload)
+
+            if self._dispatcher is not None:
+                self._dispatcher.submit(callbacks, topic, payload)
+                return
+
+            self._deliver(callbacks, topic, payload)
 
         except Exception:
-            pass
+            self.metrics.inc('dispatch_errors_total')
+
+    def _deliver(self, callbacks: List[tuple], topic: str, payload: Payload):
+        """Вызов callback-ов сообщения, строка декодируется один раз по требованию"""
+        for callback, raw in callbacks:
+            try:
+                value = payload if raw else payload.text
+            except Exception:
+                self.metrics.inc('decode_errors_total', classify_topic(topic))
+                continue
+            self._invoke(callback, topic, value)
+
+    def run_callback(self, callback: Callable, *args) -> Any:
+        """Вызов пользовательского callback-а устройства или контрола"""
+        return self._call(callback, args)
+
+    def _call(self, callback: Callable, args: tuple) -> Any:
+        """
+        Вызов callback-а с замером профилировщиком.
+
+        Вложенный вызов (callback контрола из обработчика подписки) помечает
+        внешний, и замер записывается только для самого внутреннего callback-а.
+        """
+        profiler = self.profiler
+        if profiler is None:
+            return callback(*args)
+
+        trace = _trace
+        trace.nested = False
+        started = time.perf_counter()
+        try:
+            return callback(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            if not trace.nested:
+                profiler.record(callback, getattr(trace, 'topic', None), elapsed)
+            trace.nested = True
+
+    def _invoke(self, callback: Callable, topic: str, payload: Any):
+        """Вызов одного callback-а с учетом времени выполнения и исключений"""
+        kind = classify_topic(topic)
+        trace = _trace
+        trace.topic = topic
+        started = time.perf_counter()
+        try:
+            self.run_callback(callback, topic, payload)
+        except Exception:
+            self.metrics.inc('callback_errors_total', kind)
+        finally:
+            trace.topic = None
+        self.metrics.observe('callback_seconds', time.perf_counter() - started, kind)
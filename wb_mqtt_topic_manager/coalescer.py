@@ -0,0 +1,154 @@
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from wb_mqtt_topic_manager.scheduler import Scheduler, TimerHandle
+
+
+class PublishCoalescer:
+    """
+    Схлопывание публикаций в retained топики.
+
+    Для retained топика важно только последнее значение, поэтому публикации
+    копятся в течение интервала, и в брокер уходит только самое новое значение
+    каждого топика. Пока предыдущая публикация топика не подтверждена (PUBACK),
+    новые значения продолжают схлопываться.
+
+    Handle-ы отслеживаемых публикаций схлопнутых значений завершаются вместе
+    с публикацией значения, заменившего их.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Any, int, bool, Callable], bool],
+        scheduler: Scheduler,
+        interval: float,
+        track: Optional[Callable[[List, Any], None]] = None,
+    ):
+        """
+        Инициализация.
+
+        Args:
+            send: Функция отправки (topic, payload, qos, retain, on_sent),
+                on_sent вызывается с MQTTMessageInfo (или None) после передачи в paho
+            scheduler: Планировщик клиента
+            interval: Интервал сброса накопленных публикаций в секундах
+            track: Функция, вызываемая со списком handle-ов и MQTTMessageInfo
+                (или None) после передачи публикации в paho
+        """
+        self.interval = interval
+
+        self._send = send
+        self._track = track
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._pending: Dict[str, tuple] = {}
+        self._inflight: Dict[str, Optional[int]] = {}
+        self._inflight_topics: Dict[int, str] = {}
+        self._handles: Dict[str, List] = {}
+        self._timer: Optional[TimerHandle] = None
+
+        # Счетчики
+        self.coalesced = 0
+        self.flushed = 0
+
+    def add(self, topic: str, payload: Any, qos: int, handle: Any = None):
+        """
+        Постановка публикации в очередь.
+
+        Args:
+            topic: MQTT топик
+            payload: Данные для отправки
+            qos: Качество обслуживания
+            handle: PublishHandle отслеживаемой публикации
+        """
+        with self._lock:
+            if topic in self._pending:
+                self.coalesced += 1
+            self._pending[topic] = (payload, qos)
+            if handle is not None:
+                self._handles.setdefault(topic, []).append(handle)
+            self._schedule(self.interval)
+
+    def _schedule(self, delay: float):
+        """Планирование сброса (вызывается под блокировкой)"""
+        # Задача отменяется и при остановке планировщика
+        if self._timer is None or self._timer.cancelled:
+            self._timer = self._scheduler.call_later(delay, self.flush)
+
+    def flush(self):
+        """Отправка накопленных публикаций, топики в полете остаются в очереди"""
+        with self._lock:
+            self._timer = None
+            ready = [
+                (topic, payload, qos, self._handles.pop(topic, None))
+                for topic, (payload, qos) in self._pending.items()
+                if topic not in self._inflight
+            ]
+            for topic, _, _, _ in ready:
+                del self._pending[topic]
+
+            # До передачи в paho топик считается в полете
+            for topic, _, _, _ in ready:
+                self._inflight[topic] = None
+
+        for topic, payload, qos, handles in ready:
+            on_sent = partial(self._on_sent, topic, handles)
+            if not self._send(topic, payload, qos, True, on_sent):
+                self._release(topic)
+                if handles:
+                    self._track(handles, None)
+
+    def _on_sent(self, topic: str, handles: Optional[List], info: Any):
+        """Регистрация переданной в paho публикации"""
+        if handles:
+            self._track(handles, info)
+
+        if info is None:
+            self._release(topic)
+            return
+
+        self.flushed += 1
+        with self._lock:
+            self._inflight[topic] = info.mid
+            self._inflight_topics[info.mid] = topic
+
+        # Подтверждение могло прийти до регистрации
+        if info.is_published():
+            self.on_published(info.mid)
+
+    def _release(self, topic: str):
+        """Снятие топика из полета без подтверждения"""
+        with self._lock:
+            self._inflight.pop(topic, None)
+            if topic in self._pending:
+                self._schedule(self.interval)
+
+    def on_published(self, mid: int):
+        """Обработка подтверждения публикации"""
+        with self._lock:
+            topic = self._inflight_topics.pop(mid, None)
+            if topic is None:
+                return
+
+            self._inflight.pop(topic, None)
+            if topic in self._pending:
+                self._schedule(0)
+
+    def reset(self):
+        """Сброс публикаций в полете (после переподключения)"""
+        with self._lock:
+            self._inflight.clear()
+            self._inflight_topics.clear()
+            if self._pending:
+                self._schedule(0)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Счетчики схлопывания"""
+        return {
+            'pending': len(self._pending),
+            'inflight': len(self._inflight),
+            'coalesced': self.coalesced,
+            'flushed': self.flushed,
+        }
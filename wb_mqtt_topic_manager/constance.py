@@ -14,3 +14,61 @@ class ErrorType:
     PERIOD = 'p'
 
     ERRORS = (READ, WRITE, PERIOD)
+
+
+class OverflowPolicy:
+    """Политики поведения при переполнении очереди"""
+
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    REJECT = 'reject'
+
+    POLICIES = (BLOCK, DROP_OLDEST, REJECT)
+
+
+class TopicKind:
+    """Классы топиков согласно конвенции Wiren Board"""
+
+    VALUE = 'value'
+    ON = 'on'
+    META = 'meta'
+    META_ERROR = 'meta_error'
+    OTHER = 'other'
+
+    KINDS = (VALUE, ON, META, META_ERROR, OTHER)
+
+
+class LegacyTopicsPolicy:
+    """Публикация топиков устаревшей конвенции (meta/type, meta/order, meta/name)"""
+
+    # Публикуются вместе с JSON meta
+    FULL = 'full'
+    # Не публикуются, только JSON meta
+    JSON_ONLY = 'json_only'
+    # Публикуются в фоне после JSON meta
+    LAZY = 'lazy'
+
+    POLICIES = (FULL, JSON_ONLY, LAZY)
+
+
+class ThrottlePolicy:
+    """Поведение при превышении ограничения частоты публикаций"""
+
+    # Публикации откладываются и отправляются по порядку
+    DELAY = 'delay'
+    # Из отложенных публикаций топика отправляется только последняя
+    COALESCE = 'coalesce'
+
+    POLICIES = (DELAY, COALESCE)
+
+
+class HistoryAggregate:
+    """Агрегирование значений истории при прореживании"""
+
+    MEAN = 'mean'
+    MIN = 'min'
+    MAX = 'max'
+    # Последнее значение интервала
+    LAST = 'last'
+
+    AGGREGATES = (MEAN, MIN, MAX, LAST)
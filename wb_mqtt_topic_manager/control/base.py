@@ -1,7 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, Dict, Optional, Union
 
+from wb_mqtt_topic_manager.serializer import json_dumps
+
 
 class ControlType(Enum):
     """Типы контролов"""
@@ -15,7 +17,7 @@ class ControlType(Enum):
     VALUE = 'value'
 
 
-@dataclass
+@dataclass(slots=True)
 class LocalizedString:
     """Локализованные строки для заголовков"""
 
@@ -26,21 +28,41 @@ class LocalizedString:
         return {'en': self.en, 'ru': self.ru}
 
 
-@dataclass
+@dataclass(slots=True)
 class EnumTitle:
     """Заголовки для enum значений"""
 
     value: Union[int, LocalizedString]
 
 
-@dataclass
+@dataclass(slots=True)
 class BaseMeta:
-    """Базовый класс для метаданных всех контролов"""
+    """
+    Базовый класс для метаданных всех контролов.
+
+    JSON метаданных кешируется и сбрасывается при присваивании любого поля.
+    Изменение вложенного title (meta.title.en = ...) кеш не сбрасывает,
+    для этого нужно присвоить meta.title заново.
+    """
 
     type: ControlType
     order: Optional[int]
     title: Optional[LocalizedString]
     readonly: bool = False
+    _payload: Optional[bytes] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def __setattr__(self, name: str, value: Any):
+        object.__setattr__(self, name, value)
+        if name != '_payload':
+            object.__setattr__(self, '_payload', None)
+
+    def to_payload(self) -> bytes:
+        """Метаданные в JSON для публикации"""
+        if self._payload is None:
+            self._payload = json_dumps(self.to_dict())
+        return self._payload
 
     def to_dict(self) -> Dict[str, Any]:
         """Конвертирует метаданные в словарь для отправки"""
@@ -1,49 +1,82 @@
-import json
-from typing import List
+import sys
+from typing import List, Optional, Tuple
 
-from wb_mqtt_topic_manager.constance import ErrorType, QosType
+from wb_mqtt_topic_manager.constance import ErrorType, LegacyTopicsPolicy, QosType
 from wb_mqtt_topic_manager.control.base import BaseMeta
 from wb_mqtt_topic_manager.control.control_type import ControlType
 from wb_mqtt_topic_manager.device import Device
+from wb_mqtt_topic_manager.history import ValueHistory
+from wb_mqtt_topic_manager.policy import PolicyPublisher, PublishPolicy
+from wb_mqtt_topic_manager.serializer import json_loads
 
 
 class Control:
+    __slots__ = (
+        'device',
+        'control_id',
+        'control_topic_value',
+        'control_topic_change_value',
+        'control_topic_meta',
+        'control_topic_meta_error',
+    )
+
     def __init__(self, device: Device, control_id: str):
         self.device = device
         self.control_id = control_id
 
-    @property
-    def control_topic_value(self) -> dict:
-        """Топик значения контрола"""
-        return f'/devices/{self.device.id}/{self.control_id}'
-
-    @property
-    def control_topic_change_value(self) -> dict:
-        """Топик смены значения контрола"""
-        return f'/devices/{self.device.id}/{self.control_id}/on'
-
-    @property
-    def control_topic_meta(self) -> dict:
-        """Топик информации о контроле"""
-        return f'/devices/{self.device.id}/{self.control_id}/meta'
-
-    @property
-    def control_topic_meta_error(self) -> dict:
-        """Топик ошибок контрола"""
-        return f'/devices/{self.device.id}/{self.control_id}/meta/error'
+        # Топики вычисляются один раз, строки интернируются
+        topic = sys.intern(f'/devices/{device.id}/{control_id}')
+        # Топик значения контрола
+        self.control_topic_value = topic
+        # Топик смены значения контрола
+        self.control_topic_change_value = sys.intern(f'{topic}/on')
+        # Топик информации о контроле
+        self.control_topic_meta = sys.intern(f'{topic}/meta')
+        # Топик ошибок контрола
+        self.control_topic_meta_error = sys.intern(f'{topic}/meta/error')
 
 
 class DriverControl(Control):
     """Класс контрола для драйвера"""
 
-    def __init__(self, device: Device, control_id: str, initial_value, meta: BaseMeta):
+    __slots__ = (
+        '_value',
+        'meta',
+        'meta_error',
+        'share_group',
+        '_callbacks',
+        '_publisher',
+    )
+
+    def __init__(
+        self,
+        device: Device,
+        control_id: str,
+        initial_value,
+        meta: BaseMeta,
+        share_group: Optional[str] = None,
+        policy: Optional[PublishPolicy] = None,
+    ):
         super().__init__(device=device, control_id=control_id)
         self._value = initial_value
         self.meta = meta
+        # Группа общей подписки на /on, команды распределяются между драйверами
+        self.share_group = share_group
         self.meta_error: str = ''
         self._publish_meta()
         self._subcribe_on_change()
 
+        # Политика публикации значений
+        self._publisher: Optional[PolicyPublisher] = None
+        if policy is not None:
+            self._publisher = PolicyPublisher(
+                policy,
+                self._publish_value,
+                device.client.scheduler,
+                initial_value,
+            )
+            device.client.register_policy(self._publisher)
+
         # Callbacks
         self._callbacks: List[callable] = []
 
@@ -59,7 +92,7 @@ class DriverControl(Control):
         # Метаданные
         self.device.client.publish(
             topic=self.control_topic_meta,
-            payload=self.meta.to_dict(),
+            payload=self.meta.to_payload(),
             qos=QosType.QOS_ONE,
             retain=True,
         )
@@ -72,13 +105,9 @@ class DriverControl(Control):
         )
 
         # Данных для обратной совместимости
-        for meta_value, old_conventions_topic in self.old_conventions_data:
-            self.device.client.publish(
-                topic=old_conventions_topic,
-                payload=meta_value,
-                qos=QosType.QOS_ONE,
-                retain=True,
-            )
+        if self.device.legacy_topics != LegacyTopicsPolicy.JSON_ONLY:
+            for meta_value, old_conventions_topic in self.old_conventions_data:
+                self.device.publish_legacy(old_conventions_topic, meta_value)
 
     @property
     def old_conventions_data(self) -> list:
@@ -95,10 +124,13 @@ class DriverControl(Control):
 
             def on_change(topic, payload):
                 for callback_func in self._callbacks:
-                    callback_func(payload)
+                    self.device.client.run_callback(callback_func, payload)
 
             self.device.client.subscribe(
-                self.control_topic_change_value, on_change, qos=QosType.QOS_ZERO
+                self.control_topic_change_value,
+                on_change,
+                qos=QosType.QOS_ZERO,
+                share_group=self.share_group,
             )
 
     def on_change_on(self, callback):
@@ -111,11 +143,8 @@ class DriverControl(Control):
         if error in ErrorType.ERRORS:
             if error not in self.meta_error:
                 self.meta_error += error
-                self.device.client.publish(
-                    topic=self.control_topic_meta_error,
-                    payload=self.meta_error,
-                    qos=QosType.QOS_ONE,
-                    retain=True,
+                self.device.publish_limited(
+                    self.control_topic_meta_error, self.meta_error
                 )
             return True
 
@@ -126,29 +155,48 @@ class DriverControl(Control):
         if error in ErrorType.ERRORS:
             if error in self.meta_error:
                 self.meta_error = self.meta_error.replace(error, '')
-                self.device.client.publish(
-                    topic=self.control_topic_meta_error,
-                    payload=self.meta_error,
-                    qos=QosType.QOS_ONE,
-                    retain=True,
+                self.device.publish_limited(
+                    self.control_topic_meta_error, self.meta_error
                 )
             return True
 
         return False
 
     def change_value(self, value):
-        """Изменение значения контрола"""
+        """
+        Изменение значения контрола.
+
+        Если задана политика публикации, значение публикуется согласно ей:
+        в зоне нечувствительности не публикуется (False), при ограничении
+        интервала публикуется позже (True).
+        """
         if value != self._value and self._validate_value(value):
             self._value = value
 
-            return self.device.client.publish(
-                topic=self.control_topic_value,
-                payload=value,
-                qos=QosType.QOS_ONE,
-                retain=True,
-            )
+            if self._publisher is not None:
+                return self._publisher.submit(value)
+            return self._publish_value(value)
         return False
 
+    def _publish_value(self, value):
+        """Публикация значения контрола с учетом ограничения частоты"""
+        return self.device.publish_limited(self.control_topic_value, value)
+
+    @property
+    def policy(self) -> Optional[PublishPolicy]:
+        """Политика публикации значений"""
+        return self._publisher.policy if self._publisher is not None else None
+
+    def flush_value(self):
+        """Немедленная публикация отложенного политикой значения"""
+        if self._publisher is not None:
+            self._publisher.flush()
+
+    def close(self):
+        """Отмена отложенных политикой публикаций"""
+        if self._publisher is not None:
+            self._publisher.cancel()
+
     def _validate_value(self, value):
         """Валидация входящего значения"""
         return value in ['0', '1']
@@ -160,6 +208,8 @@ class DriverControl(Control):
 
 
 class RangeDriverControl(DriverControl):
+    __slots__ = ()
+
     @property
     def old_conventions_data(self) -> list:
         """Поля для обратной совместимости, переопределен для min/max"""
@@ -179,42 +229,114 @@ class RangeDriverControl(DriverControl):
 class ObserverControl(Control):
     """Класс контрола для наблюдателя"""
 
-    def __init__(self, device: Device, control_id: str):
+    __slots__ = (
+        '_value',
+        'meta',
+        'meta_error',
+        'share_group',
+        'history',
+        '_change_value_callbacks',
+        '_meta_error_callbacks',
+    )
+
+    def __init__(
+        self,
+        device: Device,
+        control_id: str,
+        share_group: Optional[str] = None,
+        history: Optional[int] = None,
+    ):
         super().__init__(device=device, control_id=control_id)
         self._value = None
+        # Группа общей подписки на значение, meta подписывается без группы
+        self.share_group = share_group
+        # История числовых значений (если включена)
+        self.history: Optional[ValueHistory] = None
+        if history:
+            self.enable_history(history)
         self.meta: dict = {}
         self.meta_error: str = ''
-
-        # Callbacks
-        self._change_value_callbacks: List[callable] = []
-        self._meta_error_callbacks: List[callable] = []
-
-        # Подписка на метаданные
-        self.get_meta()
-        self._subcribe_on_value()
-        self._subcribe_meta_error()
+        self._seed_from_snapshot()
+
+        # Callbacks, кортеж создается с первым callback-ом
+        self._change_value_callbacks: Tuple[callable, ...] = ()
+        self._meta_error_callbacks: Tuple[callable, ...] = ()
+
+        # Подписка на метаданные одним пакетом SUBSCRIBE
+        with self.device.client.batch():
+            self.get_meta()
+            self._subcribe_on_value()
+            self._subcribe_meta_error()
+
+    def _seed_from_snapshot(self):
+        """Заполнение из снимка устройства до прихода retained сообщений"""
+        snapshot = getattr(self.device, 'snapshot', None)
+        if snapshot is None:
+            return
+
+        state = snapshot.control(self.device.id, self.control_id)
+        if state is None:
+            return
+
+        self.meta = state.meta
+        self.meta_error = state.meta_error
+        if state.value is not None:
+            try:  # noqa: SIM105
+                self._value = self._parse_value(state.value)
+            except ValueError:
+                pass
 
     def _subcribe_on_value(self):
         """Подписка на топик значения контрола"""
+        self.device.client.subscribe(
+            self.control_topic_value,
+            self._on_value,
+            qos=QosType.QOS_ONE,
+            raw=True,
+            share_group=self.share_group,
+        )
 
-        def on_change(topic, payload):
-            if self._value != payload:
-                self._value = (
-                    payload
-                    if self.meta.get('type') != ControlType.RANGE.value
-                    else int(payload)
-                )
+    def _on_value(self, topic, payload):
+        value = self._parse_value(payload)
 
-                for callback_func in self._change_value_callbacks:
-                    callback_func(payload)
+        if self.history is not None:
+            try:  # noqa: SIM105
+                self.history.append(float(payload))
+            except ValueError:
+                pass
 
-        self.device.client.subscribe(
-            self.control_topic_value, on_change, qos=QosType.QOS_ONE
-        )
+        if self._value != value:
+            self._value = value
+
+            for callback_func in self._change_value_callbacks:
+                self.device.client.run_callback(callback_func, payload.text)
+
+    def _parse_value(self, payload):
+        """Значение контрола из Payload или строки"""
+        if self.meta.get('type') == ControlType.RANGE.value:
+            # Число разбирается напрямую из bytes, без промежуточной строки
+            return int(payload)
+        return payload if isinstance(payload, str) else payload.text
 
     def on_change_value(self, callback):
         """Декоратор для подписки на изменения значения"""
-        self._change_value_callbacks.append(callback)
+        self._change_value_callbacks += (callback,)
+
+    def enable_history(self, capacity: int = 3600) -> ValueHistory:
+        """
+        Включение истории значений контрола.
+
+        Записываются все полученные числовые значения, нечисловые пропускаются.
+
+        Args:
+            capacity: Максимальное количество хранимых значений
+
+        Returns:
+            ValueHistory: История значений
+        """
+        if self.history is None or self.history.capacity != capacity:
+            self.history = ValueHistory(capacity)
+        return self.history
 
     def on(self, value):
         """Отправка сигнала на изменение значения контрола"""
@@ -242,33 +364,31 @@ class ObserverControl(Control):
 
     def get_meta(self) -> dict:
         """Получение meta контрола"""
-
-        def on_meta(topic, payload):
-            self.meta = json.loads(payload) if payload else {}
-
         self.device.client.subscribe(
-            self.control_topic_meta, on_meta, qos=QosType.QOS_ONE
+            self.control_topic_meta, self._on_meta, qos=QosType.QOS_ONE
         )
 
         return self.meta
 
+    def _on_meta(self, topic, payload):
+        self.meta = json_loads(payload) if payload else {}
+
     def _subcribe_meta_error(self):
         """Подписка на meta/error контрола"""
-
-        def on_meta_error(topic, payload):
-            if self.meta_error != payload:
-                for callback_func in self._meta_error_callbacks:
-                    callback_func(payload)
-
-            self.meta_error = payload
-
         self.device.client.subscribe(
-            self.control_topic_meta_error, on_meta_error, qos=QosType.QOS_ONE
+            self.control_topic_meta_error, self._on_meta_error, qos=QosType.QOS_ONE
         )
 
+    def _on_meta_error(self, topic, payload):
+        if self.meta_error != payload:
+            for callback_func in self._meta_error_callbacks:
+                self.device.client.run_callback(callback_func, payload)
+
+        self.meta_error = payload
+
     def on_change_meta_error(self, callback):
         """Декоратор для подписки на ошибки контрола"""
-        self._meta_error_callbacks.append(callback)
+        self._meta_error_callbacks += (callback,)
 
     @property
     def value(self):
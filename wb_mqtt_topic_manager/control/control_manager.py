@@ -13,6 +13,7 @@ from wb_mqtt_topic_manager.control.control_type import (
     SwitchMeta,
 )
 from wb_mqtt_topic_manager.device import DriverDevice
+from wb_mqtt_topic_manager.policy import PublishPolicy
 
 
 class ControlManager:
@@ -22,9 +23,24 @@ class ControlManager:
     def connect_control(
         device: ObserverControl,
         control_id: str,
+        share_group: Optional[str] = None,
+        history: Optional[int] = None,
     ) -> ObserverControl:
-        """Подключение к контролу"""
-        return ObserverControl(device=device, control_id=control_id)
+        """
+        Подключение к контролу.
+
+        С share_group значения контрола распределяются между наблюдателями
+        группы (общая подписка MQTT), retained значение при этом не приходит.
+        Если устройство создано со снимком bootstrap, meta и значение
+        контрола доступны сразу. history включает историю последних
+        history числовых значений (control.history).
+        """
+        return ObserverControl(
+            device=device,
+            control_id=control_id,
+            share_group=share_group,
+            history=history,
+        )
 
     @staticmethod
     def create_switch(
@@ -34,12 +50,19 @@ class ControlManager:
         order: Optional[int],
         title: Optional[LocalizedString],
         readonly: bool = False,
+        share_group: Optional[str] = None,
+        policy: Optional[PublishPolicy] = None,
     ) -> DriverControl:
         """Создание switch контрола"""
         meta = SwitchMeta(order=order, readonly=readonly, title=title)
 
         return DriverControl(
-            device=device, control_id=control_id, initial_value=initial_value, meta=meta
+            device=device,
+            control_id=control_id,
+            initial_value=initial_value,
+            meta=meta,
+            share_group=share_group,
+            policy=policy,
         )
 
     @staticmethod
@@ -50,12 +73,19 @@ class ControlManager:
         order: Optional[int],
         title: Optional[LocalizedString],
         readonly: bool = False,
+        share_group: Optional[str] = None,
+        policy: Optional[PublishPolicy] = None,
     ) -> DriverControl:
         """Создание alarm контрола"""
         meta = AlarmMeta(order=order, readonly=readonly, title=title)
 
         return DriverControl(
-            device=device, control_id=control_id, initial_value=initial_value, meta=meta
+            device=device,
+            control_id=control_id,
+            initial_value=initial_value,
+            meta=meta,
+            share_group=share_group,
+            policy=policy,
         )
 
     @staticmethod
@@ -66,12 +96,19 @@ class ControlManager:
         order: Optional[int],
         title: Optional[LocalizedString],
         readonly: bool = False,
+        share_group: Optional[str] = None,
+        policy: Optional[PublishPolicy] = None,
     ) -> DriverControl:
         """Создание pushbutton контрола"""
         meta = PushButtonMeta(order=order, readonly=readonly, title=title)
 
         return DriverControl(
-            device=device, control_id=control_id, initial_value=initial_value, meta=meta
+            device=device,
+            control_id=control_id,
+            initial_value=initial_value,
+            meta=meta,
+            share_group=share_group,
+            policy=policy,
         )
 
     @staticmethod
@@ -84,6 +121,8 @@ class ControlManager:
         min_value: int = 0,
         max_value: int = 255,
         readonly: bool = False,
+        share_group: Optional[str] = None,
+        policy: Optional[PublishPolicy] = None,
     ) -> DriverControl:
         """Создание range контрола"""
         meta = RangeMeta(
@@ -95,5 +134,10 @@ class ControlManager:
         )
 
         return RangeDriverControl(
-            device=device, control_id=control_id, initial_value=initial_value, meta=meta
+            device=device,
+            control_id=control_id,
+            initial_value=initial_value,
+            meta=meta,
+            share_group=share_group,
+            policy=policy,
         )
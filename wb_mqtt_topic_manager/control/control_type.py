@@ -4,31 +4,31 @@ from typing import Any, Dict
 from wb_mqtt_topic_manager.control.base import BaseMeta, ControlType
 
 
-@dataclass
+@dataclass(slots=True)
 class SwitchMeta(BaseMeta):
     """Метаданные для switch контрола"""
 
     type: ControlType = field(default=ControlType.SWITCH, init=False)
 
     def to_dict(self) -> Dict[str, Any]:
-        return super().to_dict()
+        return super(SwitchMeta, self).to_dict()
 
 
-@dataclass
+@dataclass(slots=True)
 class AlarmMeta(BaseMeta):
     """Метаданные для alarm контрола"""
 
     type: ControlType = field(default=ControlType.ALARM, init=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class PushButtonMeta(BaseMeta):
     """Метаданные для pushbutton контрола"""
 
     type: ControlType = field(default=ControlType.PUSHBUTTON, init=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class RangeMeta(BaseMeta):
     """Метаданные для range контрола"""
 
@@ -37,7 +37,7 @@ class RangeMeta(BaseMeta):
     max_value: int = 255
 
     def to_dict(self) -> Dict[str, Any]:
-        result = super().to_dict()
+        result = super(RangeMeta, self).to_dict()
         result['min'] = self.min_value
         result['max'] = self.max_value
         return result
@@ -0,0 +1,102 @@
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from wb_mqtt_topic_manager.scheduler import Scheduler, TimerHandle
+
+
+class DeferredPublisher:
+    """
+    Фоновая отправка низкоприоритетных публикаций.
+
+    Публикации копятся в очереди и отправляются порциями по chunk_size
+    с паузой interval, чтобы не конкурировать с основным трафиком.
+    Без подключения отправка откладывается до его восстановления.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Any, int, bool], bool],
+        ready: Callable[[], bool],
+        scheduler: Scheduler,
+        delay: float = 1.0,
+        chunk_size: int = 50,
+        interval: float = 0.1,
+    ):
+        """
+        Инициализация.
+
+        Args:
+            send: Функция отправки (topic, payload, qos, retain)
+            ready: Функция проверки готовности к отправке (подключения)
+            scheduler: Планировщик клиента
+            delay: Задержка перед отправкой первой порции в секундах
+            chunk_size: Количество публикаций в одной порции
+            interval: Пауза между порциями в секундах
+        """
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.interval = interval
+
+        self._send = send
+        self._ready = ready
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._queue: Deque[tuple] = deque()
+        self._timer: Optional[TimerHandle] = None
+
+        # Счетчики
+        self.sent = 0
+        self.failed = 0
+
+    def add(self, topic: str, payload: Any, qos: int, retain: bool):
+        """Постановка публикации в очередь"""
+        with self._lock:
+            self._queue.append((topic, payload, qos, retain))
+            # Задача отменяется и при остановке планировщика
+            if self._timer is None or self._timer.cancelled:
+                self._timer = self._scheduler.call_later(self.delay, self._drain)
+
+    def _drain(self):
+        """Отправка одной порции"""
+        with self._lock:
+            self._timer = None
+            if not self._ready():
+                chunk = []
+            else:
+                count = min(self.chunk_size, len(self._queue))
+                chunk = [self._queue.popleft() for _ in range(count)]
+
+        for message in chunk:
+            if self._send(*message):
+                self.sent += 1
+            else:
+                self.failed += 1
+
+        with self._lock:
+            if self._queue and self._timer is None:
+                self._timer = self._scheduler.call_later(self.interval, self._drain)
+
+    def flush(self):
+        """Отправка всех накопленных публикаций"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            messages = list(self._queue)
+            self._queue.clear()
+
+        for message in messages:
+            if self._send(*message):
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': len(self._queue),
+                'sent': self.sent,
+                'failed': self.failed,
+            }
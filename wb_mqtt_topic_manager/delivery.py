@@ -0,0 +1,203 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+
+class PublishHandle:
+    """
+    Результат отслеживаемой публикации.
+
+    Завершается по PUBACK/PUBCOMP (для QoS 0 - после записи в сокет)
+    или с ошибкой, если сообщение не принято или клиент отключен.
+    """
+
+    __slots__ = ('topic', 'mid', 'result', '_tracker', '_callbacks')
+
+    def __init__(self, topic: str, tracker: 'DeliveryTracker'):
+        self.topic = topic
+        self.mid: Optional[int] = None
+        # None - ожидает подтверждения, True - доставлено, False - ошибка
+        self.result: Optional[bool] = None
+
+        self._tracker = tracker
+        self._callbacks: Optional[List[Callable]] = None
+
+    @property
+    def done(self) -> bool:
+        """Завершена ли публикация"""
+        return self.result is not None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание завершения публикации.
+
+        Returns:
+            bool: True если сообщение доставлено
+        """
+        return self._tracker.wait((self,), timeout)
+
+    def add_done_callback(self, callback: Callable[['PublishHandle'], None]):
+        """
+        Функция, вызываемая с handle при завершении публикации.
+
+        Вызывается в сетевом потоке или сразу, если публикация уже завершена.
+        """
+        with self._tracker.condition:
+            if self.result is None:
+                if self._callbacks is None:
+                    self._callbacks = []
+                self._callbacks.append(callback)
+                return
+
+        callback(self)
+
+    def __repr__(self) -> str:
+        return (
+            f'PublishHandle(topic={self.topic!r}, mid={self.mid}, result={self.result})'
+        )
+
+
+class DeliveryTracker:
+    """Таблица отслеживаемых публикаций клиента по идентификатору сообщения"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        # mid -> handle-ы публикации
+        self._handles: Dict[int, Sequence[PublishHandle]] = {}
+
+        # Счетчики
+        self.delivered = 0
+        self.failed = 0
+
+    def register(self, handle: PublishHandle, info: Any):
+        """
+        Регистрация переданной в paho публикации.
+
+        Args:
+            handle: Handle публикации
+            info: MQTTMessageInfo или None, если сообщение не передано
+        """
+        self.register_many((handle,), info)
+
+    def register_many(self, handles: Sequence[PublishHandle], info: Any):
+        """Регистрация нескольких handle-ов одной публикации (схлопывание)"""
+        if info is None:
+            for handle in handles:
+                self.complete(handle, False)
+            return
+
+        with self.condition:
+            for handle in handles:
+                handle.mid = info.mid
+            self._handles[info.mid] = handles
+
+        # Подтверждение могло прийти до регистрации
+        if info.is_published():
+            self.on_published(info.mid, True)
+
+    def on_published(self, mid: int, success: bool):
+        """Обработка подтверждения публикации"""
+        if not self._handles:
+            return
+
+        with self.condition:
+            handles = self._handles.pop(mid, ())
+        for handle in handles:
+            self.complete(handle, success)
+
+    def complete(self, handle: PublishHandle, result: bool):
+        """Завершение публикации, повторное завершение игнорируется"""
+        with self.condition:
+            if handle.result is not None:
+                return
+            handle.result = result
+            if result:
+                self.delivered += 1
+            else:
+                self.failed += 1
+            callbacks, handle._callbacks = handle._callbacks, None
+            self.condition.notify_all()
+
+        for callback in callbacks or ():
+            try:  # noqa: SIM105
+                callback(handle)
+            except Exception:
+                pass
+
+    def fail_all(self):
+        """Завершение с ошибкой всех ожидающих публикаций (при отключении)"""
+        with self.condition:
+            pending, self._handles = self._handles, {}
+        for handles in pending.values():
+            for handle in handles:
+                self.complete(handle, False)
+
+    def wait(
+        self,
+        handles: Iterable[PublishHandle],
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """
+        Ожидание завершения публикаций этого клиента.
+
+        Returns:
+            bool: True если все сообщения доставлены
+        """
+        handles = list(handles)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        # Handle-ы завершаются примерно по порядку, поэтому после каждого
+        # пробуждения проверка продолжается с первого незавершенного
+        index = 0
+        with self.condition:
+            while index < len(handles):
+                if handles[index].result is not None:
+                    index += 1
+                    continue
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                self.condition.wait(remaining)
+
+        return all(handle.result for handle in handles)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        with self.condition:
+            return {
+                'pending': len(self._handles),
+                'delivered': self.delivered,
+                'failed': self.failed,
+            }
+
+
+def wait_all(handles: Iterable[PublishHandle], timeout: Optional[float] = None) -> bool:
+    """
+    Ожидание доставки всех публикаций, в том числе разных клиентов и шардов.
+
+    Args:
+        handles: Handle-ы публикаций (publish(..., track=True))
+        timeout: Общее максимальное время ожидания в секундах
+
+    Returns:
+        bool: True если все сообщения доставлены
+    """
+    by_tracker: Dict[int, tuple] = {}
+    for handle in handles:
+        tracker = handle._tracker
+        by_tracker.setdefault(id(tracker), (tracker, []))[1].append(handle)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    delivered = True
+    for tracker, tracker_handles in by_tracker.values():
+        remaining = None
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+        if not tracker.wait(tracker_handles, remaining):
+            delivered = False
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+
+    return delivered
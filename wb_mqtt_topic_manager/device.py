@@ -1,16 +1,35 @@
-import json
-from typing import Callable, List
+import sys
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 
 from wb_mqtt_topic_manager.client import MQTTClient
-from wb_mqtt_topic_manager.constance import ErrorType, QosType
+from wb_mqtt_topic_manager.constance import ErrorType, LegacyTopicsPolicy, QosType
+from wb_mqtt_topic_manager.events import DEFAULT_KINDS, EventStream
+from wb_mqtt_topic_manager.serializer import json_loads
+
+if TYPE_CHECKING:
+    from wb_mqtt_topic_manager.snapshot import DevicesSnapshot
 
 
 class Device:
     """Представление устройства"""
 
+    __slots__ = (
+        'client',
+        'id',
+        'controls',
+        'meta',
+        'meta_error',
+        'device_topic_meta',
+        'device_topic_meta_error',
+        '_on_meta_error_change',
+    )
+
     def __init__(self, client: MQTTClient, device_id: str):
         self.client = client
         self.id = device_id
+        # Топики вычисляются один раз, строки интернируются
+        self.device_topic_meta = sys.intern(f'/devices/{device_id}/meta')
+        self.device_topic_meta_error = sys.intern(f'/devices/{device_id}/meta/error')
         self.controls: dict = {}
         self.meta: dict = {}
         self.meta_error: str = ''
@@ -20,23 +39,13 @@ class Device:
 
         self._subcribe_meta_error()
 
-    @property
-    def device_topic_meta(self) -> dict:
-        """Топик информации о устройстве"""
-        return f'/devices/{self.id}/meta'
-
-    @property
-    def device_topic_meta_error(self) -> dict:
-        """Топик ошибок устройства"""
-        return f'/devices/{self.id}/meta/error'
-
     def _subcribe_meta_error(self):
         """Подпись на топик meta/error устройства"""
 
         def on_meta_error(topic, payload):
             if self.meta_error != payload:
                 for callback_func in self._on_meta_error_change:
-                    callback_func(payload)
+                    self.client.run_callback(callback_func, payload)
 
             self.meta_error = payload
 
@@ -52,11 +61,56 @@ class Device:
 class DriverDevice(Device):
     """Устройства драйвера"""
 
-    def __init__(self, client: MQTTClient, device_id: str, meta: dict):
+    __slots__ = ('_legacy_topics',)
+
+    def __init__(
+        self,
+        client: MQTTClient,
+        device_id: str,
+        meta: dict,
+        legacy_topics: Optional[str] = None,
+    ):
+        if (
+            legacy_topics is not None
+            and legacy_topics not in LegacyTopicsPolicy.POLICIES
+        ):
+            raise ValueError(f'Unknown legacy topics policy: {legacy_topics}')
+        self._legacy_topics = legacy_topics
+
         super().__init__(client, device_id)
         self.meta: dict = meta
         self._publish_meta()
 
+    @property
+    def legacy_topics(self) -> str:
+        """Политика топиков устаревшей конвенции устройства или клиента"""
+        return self._legacy_topics or self.client.legacy_topics
+
+    def publish_legacy(self, topic: str, payload):
+        """Публикация топика устаревшей конвенции согласно политике"""
+        policy = self.legacy_topics
+        if policy == LegacyTopicsPolicy.JSON_ONLY:
+            return
+
+        if policy == LegacyTopicsPolicy.LAZY:
+            self.client.publish_deferred(
+                topic, payload, qos=QosType.QOS_ONE, retain=True
+            )
+            return
+
+        self.client.publish(
+            topic=topic,
+            payload=payload,
+            qos=QosType.QOS_ONE,
+            retain=True,
+        )
+
+    def publish_limited(self, topic: str, payload):
+        """Публикация значения или ошибки с учетом ограничения частоты"""
+        return self.client.publish_limited(
+            self.id, topic, payload, qos=QosType.QOS_ONE, retain=True
+        )
+
     def _publish_meta(self):
         """Публикация метаданных устройства"""
         self.client.publish(
@@ -73,12 +127,8 @@ class DriverDevice(Device):
         )
 
         # Публикация имени для обратной совместимости
-        old_conventions_topic = f'{self.device_topic_meta}/name'
-        self.client.publish(
-            topic=old_conventions_topic,
-            payload=self.meta['title'].get('en'),
-            qos=QosType.QOS_ONE,
-            retain=True,
+        self.publish_legacy(
+            f'{self.device_topic_meta}/name', self.meta['title'].get('en')
         )
 
     @classmethod
@@ -88,27 +138,41 @@ class DriverDevice(Device):
         device_id: str,
         driver_name: str,
         title: dict,
+        legacy_topics: Optional[str] = None,
+        rate_limit: Optional[float] = None,
+        rate_burst: Optional[float] = None,
     ) -> 'DriverDevice':
-        """Создание экземпляра устройства"""
+        """
+        Создание экземпляра устройства.
+
+        Args:
+            client: MQTT клиент
+            device_id: Идентификатор устройства
+            driver_name: Имя драйвера
+            title: Название устройства
+            legacy_topics: Публикация топиков устаревшей конвенции устройством
+                и его контролами (если None, используется политика клиента)
+            rate_limit: Публикаций значений и ошибок устройства в секунду
+                (если None, используется ограничение клиента)
+            rate_burst: Допустимая пачка публикаций устройства
+        """
 
         meta = {
             'driver': driver_name,
             'title': title,
         }
 
-        return cls(client, device_id, meta)
+        if rate_limit is not None:
+            client.set_rate_limit(device_id, rate_limit, rate_burst)
+
+        return cls(client, device_id, meta, legacy_topics)
 
     def publish_error(self, error: ErrorType):
         """Публикация ошибки в топик meta/error"""
         if error in ErrorType.ERRORS:
             if error not in self.meta_error:
                 self.meta_error += error
-                self.client.publish(
-                    topic=self.device_topic_meta_error,
-                    payload=self.meta_error,
-                    qos=QosType.QOS_ONE,
-                    retain=True,
-                )
+                self.publish_limited(self.device_topic_meta_error, self.meta_error)
             return True
 
         return False
@@ -118,12 +182,7 @@ class DriverDevice(Device):
         if error in ErrorType.ERRORS:
             if error in self.meta_error:
                 self.meta_error = self.meta_error.replace(error, '')
-                self.client.publish(
-                    topic=self.device_topic_meta_error,
-                    payload=self.meta_error,
-                    qos=QosType.QOS_ONE,
-                    retain=True,
-                )
+                self.publish_limited(self.device_topic_meta_error, self.meta_error)
             return True
 
         return False
@@ -132,26 +191,67 @@ class DriverDevice(Device):
 class ObserverDevice(Device):
     """Устройства для наблюдателя"""
 
-    def __init__(self, client: MQTTClient, device_id: str):
-        super().__init__(client, device_id)
+    __slots__ = ('snapshot',)
+
+    def __init__(
+        self,
+        client: MQTTClient,
+        device_id: str,
+        snapshot: Optional['DevicesSnapshot'] = None,
+    ):
+        # Снимок заполняет устройство и его контролы до прихода retained сообщений
+        self.snapshot = snapshot
+        state = snapshot.device(device_id) if snapshot is not None else None
+
+        # SUBSCRIBE отправляется после заполнения из снимка
+        with client.batch():
+            super().__init__(client, device_id)
+
+            if state is not None:
+                self.meta = state.meta
+                self.meta_error = state.meta_error
 
     @classmethod
     def create(
         cls,
         client: MQTTClient,
         device_id: str,
+        snapshot: Optional['DevicesSnapshot'] = None,
     ) -> 'ObserverDevice':
-        """Создание экземпляра устройства для наблюдателя"""
-        device = cls(client, device_id)
-        device.get_meta()
+        """
+        Создание экземпляра устройства для наблюдателя.
+
+        Args:
+            client: MQTT клиент
+            device_id: Идентификатор устройства
+            snapshot: Снимок из bootstrap, meta устройства и его контролов
+                доступны сразу после создания
+        """
+        with client.batch():
+            device = cls(client, device_id, snapshot)
+            device.get_meta()
 
         return device
 
+    def events(
+        self,
+        kinds: Tuple[str, ...] = DEFAULT_KINDS,
+        maxsize: int = 10000,
+    ) -> EventStream:
+        """
+        Поток изменений устройства и его контролов.
+
+        Args:
+            kinds: Классы топиков событий (TopicKind)
+            maxsize: Размер кольцевого буфера событий
+        """
+        return self.client.events(device_id=self.id, kinds=kinds, maxsize=maxsize)
+
     def get_meta(self) -> dict:
         """Получение meta"""
 
         def on_meta(topic, payload):
-            self.meta = json.loads(payload) if payload else {}
+            self.meta = json_loads(payload) if payload else {}
 
         self.client.subscribe(self.device_topic_meta, on_meta, qos=QosType.QOS_ONE)
 
@@ -0,0 +1,179 @@
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from wb_mqtt_topic_manager.constance import OverflowPolicy
+
+
+class CallbackDispatcher:
+    """
+    Пул потоков для выполнения callback-ов вне сетевого потока paho.
+
+    Каждый топик закрепляется за одним потоком по хешу, поэтому сообщения
+    одного топика обрабатываются строго по порядку, а разные топики -
+    параллельно. У каждого потока своя ограниченная очередь.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[List[tuple], str, Any], None],
+        workers: int = 4,
+        queue_size: int = 1000,
+        overflow_policy: str = OverflowPolicy.BLOCK,
+        block_timeout: Optional[float] = None,
+    ):
+        """
+        Инициализация пула.
+
+        Args:
+            deliver: Функция вызова callback-ов сообщения (callbacks, topic, payload)
+            workers: Количество потоков
+            queue_size: Максимальный размер очереди одного потока
+            overflow_policy: Поведение при переполнении очереди (OverflowPolicy)
+            block_timeout: Максимальное ожидание места в очереди для BLOCK
+                (если None, ожидание не ограничено)
+        """
+        if workers < 1:
+            raise ValueError('workers must be positive')
+        if overflow_policy not in OverflowPolicy.POLICIES:
+            raise ValueError(f'Unknown overflow policy: {overflow_policy}')
+
+        self.workers = workers
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._deliver = deliver
+        self._queues: List[queue.Queue] = []
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+        # Счетчики
+        self.dispatched = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.blocked = 0
+        self.max_queue_depth = 0
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._threads)
+
+    def start(self):
+        """Запуск потоков пула"""
+        with self._lock:
+            if self._threads:
+                return
+
+            self._queues = [queue.Queue(self.queue_size) for _ in range(self.workers)]
+            for index, worker_queue in enumerate(self._queues):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(worker_queue,),
+                    name=f'mqtt-dispatch-{index}',
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Остановка потоков пула после обработки уже поставленных сообщений.
+
+        Args:
+            timeout: Максимальное ожидание завершения каждого потока
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+            queues, self._queues = self._queues, []
+
+        for worker_queue in queues:
+            worker_queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, callbacks: List[tuple], topic: str, payload: Any) -> bool:
+        """
+        Постановка сообщения в очередь потока, закрепленного за топиком.
+
+        Args:
+            callbacks: Callback-и, которые нужно вызвать
+            topic: Топик сообщения
+            payload: Данные сообщения
+
+        Returns:
+            bool: True если сообщение поставлено в очередь
+        """
+        queues = self._queues
+        if not queues:
+            return False
+
+        worker_queue = queues[hash(topic) % len(queues)]
+        item = (callbacks, topic, payload)
+
+        try:
+            worker_queue.put_nowait(item)
+        except queue.Full:
+            if not self._put_overflow(worker_queue, item):
+                return False
+
+        self.dispatched += 1
+        depth = worker_queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+        return True
+
+    def _put_overflow(self, worker_queue: queue.Queue, item: tuple) -> bool:
+        """Обработка переполненной очереди согласно политике"""
+        if self.overflow_policy == OverflowPolicy.REJECT:
+            self.rejected += 1
+            return False
+
+        if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+            # Сетевой поток - единственный производитель, поэтому после
+            # извлечения самого старого сообщения место гарантированно есть
+            try:
+                worker_queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            worker_queue.put_nowait(item)
+            return True
+
+        self.blocked += 1
+        try:
+            worker_queue.put(item, timeout=self.block_timeout)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        return True
+
+    def _worker(self, worker_queue: queue.Queue):
+        """Цикл потока пула"""
+        while True:
+            item = worker_queue.get()
+            if item is None:
+                break
+
+            callbacks, topic, payload = item
+            self._deliver(callbacks, topic, payload)
+
+    @property
+    def queue_depth(self) -> int:
+        """Текущее количество сообщений во всех очередях"""
+        return sum(worker_queue.qsize() for worker_queue in self._queues)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Счетчики пула"""
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'dispatched': self.dispatched,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'blocked': self.blocked,
+        }
@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+from wb_mqtt_topic_manager.constance import QosType, TopicKind
+from wb_mqtt_topic_manager.topics import parse_topic
+
+DEFAULT_KINDS = (TopicKind.VALUE, TopicKind.META, TopicKind.META_ERROR)
+
+
+@dataclass(frozen=True, slots=True)
+class ChangeEvent:
+    """Изменение устройства или контрола"""
+
+    device_id: str
+    # None для топиков устройства
+    control_id: Optional[str]
+    # Класс топика (TopicKind)
+    kind: str
+    value: str
+    timestamp: float
+
+
+class EventStream:
+    """
+    Поток изменений устройств в ограниченном кольцевом буфере.
+
+    Сообщения из сетевого потока только добавляются в буфер, а потребитель
+    забирает их пачками синхронно (get_batch, итерация) или асинхронно
+    (get_batch_async, async for). При переполнении отбрасываются старые
+    события.
+
+    Пример:
+        with client.events() as events:
+            while True:
+                for event in events.get_batch(timeout=1):
+                    ...
+    """
+
+    def __init__(
+        self,
+        client,
+        device_id: Optional[str] = None,
+        kinds: Tuple[str, ...] = DEFAULT_KINDS,
+        maxsize: int = 10000,
+        qos: int = QosType.QOS_ONE,
+    ):
+        """
+        Инициализация потока.
+
+        Args:
+            client: MQTT клиент
+            device_id: Только события устройства (если None, всех устройств)
+            kinds: Классы топиков событий (TopicKind)
+            maxsize: Размер буфера событий
+            qos: Качество обслуживания подписки
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize must be positive')
+
+        self.client = client
+        self.kinds = kinds
+        self.topic = f'/devices/{device_id}/#' if device_id else '/devices/#'
+
+        self._buffer: deque = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self._closed = False
+
+        # Ожидание в событийном цикле
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_event: Optional[asyncio.Event] = None
+        self._async_waiting = False
+
+        # Счетчики
+        self.received = 0
+        self.dropped = 0
+
+        client.subscribe(self.topic, self._on_message, qos=qos, raw=True)
+
+    def _on_message(self, topic, payload):
+        parsed = parse_topic(topic)
+        if parsed is None or parsed[2] not in self.kinds:
+            return
+
+        try:
+            value = payload.text
+        except UnicodeDecodeError:
+            return
+
+        device_id, control_id, kind = parsed
+        event = ChangeEvent(device_id, control_id, kind, value, time.time())
+
+        with self._condition:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append(event)
+            self.received += 1
+            self._condition.notify()
+            wake_loop = self._loop if self._async_waiting else None
+
+        if wake_loop is not None:
+            wake_loop.call_soon_threadsafe(self._async_event.set)
+
+    def _take(self, max_items: Optional[int]) -> List[ChangeEvent]:
+        """Извлечение событий из буфера (под блокировкой)"""
+        buffer = self._buffer
+        if max_items is None or max_items >= len(buffer):
+            batch = list(buffer)
+            buffer.clear()
+            return batch
+        return [buffer.popleft() for _ in range(max_items)]
+
+    def get_batch(
+        self,
+        max_items: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[ChangeEvent]:
+        """
+        Пачка накопленных событий, ожидание первого события при пустом буфере.
+
+        Args:
+            max_items: Максимальное количество событий в пачке
+            timeout: Максимальное время ожидания в секундах
+
+        Returns:
+            list: События (пустой список по таймауту или после закрытия)
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._buffer or self._closed,
+                timeout,
+            )
+            return self._take(max_items)
+
+    async def get_batch_async(
+        self,
+        max_items: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> List[ChangeEvent]:
+        """Вариант get_batch, не блокирующий событийный цикл"""
+        loop = asyncio.get_running_loop()
+
+        with self._condition:
+            if self._buffer or self._closed:
+                return self._take(max_items)
+
+            if self._loop is not loop:
+                self._loop = loop
+                self._async_event = asyncio.Event()
+            self._async_event.clear()
+            self._async_waiting = True
+
+        try:
+            await asyncio.wait_for(self._async_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._async_waiting = False
+
+        with self._condition:
+            return self._take(max_items)
+
+    def close(self):
+        """Отписка и завершение итерации"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            wake_loop = self._loop if self._async_waiting else None
+
+        self.client.unsubscribe(self.topic, self._on_message)
+        if wake_loop is not None:
+            wake_loop.call_soon_threadsafe(self._async_event.set)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def __iter__(self) -> Iterator[ChangeEvent]:
+        """События по одному, итерация завершается после close"""
+        while True:
+            batch = self.get_batch()
+            if not batch and self._closed:
+                return
+            yield from batch
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        while True:
+            batch = await self.get_batch_async(max_items=1)
+            if batch:
+                return batch[0]
+            if self._closed:
+                raise StopAsyncIteration
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
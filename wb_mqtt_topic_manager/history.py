@@ -0,0 +1,174 @@
+import threading
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+from wb_mqtt_topic_manager.constance import HistoryAggregate
+
+# Размер одной записи истории в байтах: метка времени и значение (double)
+RECORD_SIZE = 2 * array('d').itemsize
+
+_AGGREGATES = {
+    HistoryAggregate.MEAN: lambda values: sum(values) / len(values),
+    HistoryAggregate.MIN: min,
+    HistoryAggregate.MAX: max,
+    HistoryAggregate.LAST: lambda values: values[-1],
+}
+
+
+class ValueHistory:
+    """
+    История числовых значений контрола в кольцевом буфере фиксированного размера.
+
+    Метки времени и значения хранятся в двух массивах array('d'), выделенных
+    при создании, поэтому история занимает capacity * RECORD_SIZE байт
+    независимо от количества записанных значений, а при заполнении новые
+    значения перезаписывают самые старые.
+    """
+
+    __slots__ = ('capacity', '_times', '_values', '_start', '_count', '_lock')
+
+    def __init__(self, capacity: int = 3600):
+        """
+        Инициализация.
+
+        Args:
+            capacity: Максимальное количество хранимых значений
+        """
+        if capacity < 1:
+            raise ValueError('capacity must be positive')
+
+        self.capacity = capacity
+        self._times = array('d', bytes(8 * capacity))
+        self._values = array('d', bytes(8 * capacity))
+        # Индекс самой старой записи и количество записей
+        self._start = 0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def append(self, value: float, timestamp: Optional[float] = None):
+        """
+        Запись значения.
+
+        Args:
+            value: Значение
+            timestamp: Время значения (по умолчанию текущее, time.time())
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            if self._count < self.capacity:
+                index = (self._start + self._count) % self.capacity
+                self._count += 1
+            else:
+                index = self._start
+                self._start = (self._start + 1) % self.capacity
+            self._times[index] = timestamp
+            self._values[index] = value
+
+    def _bisect(self, timestamp: float) -> int:
+        """Номер первой записи не раньше timestamp (под блокировкой)"""
+        times, start, capacity = self._times, self._start, self.capacity
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if times[(start + middle) % capacity] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def range(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Tuple[array, array]:
+        """
+        Значения за интервал времени [start, end).
+
+        Args:
+            start: Начало интервала (если None, с самого старого значения)
+            end: Конец интервала (если None, до последнего значения)
+
+        Returns:
+            tuple: Массивы array('d') меток времени и значений по возрастанию
+                времени
+        """
+        with self._lock:
+            first = 0 if start is None else self._bisect(start)
+            last = self._count if end is None else self._bisect(end)
+            if first >= last:
+                return array('d'), array('d')
+
+            # Записи занимают в буфере один или два непрерывных участка
+            begin = (self._start + first) % self.capacity
+            stop = begin + last - first
+            if stop <= self.capacity:
+                return self._times[begin:stop], self._values[begin:stop]
+
+            stop -= self.capacity
+            return (
+                self._times[begin:] + self._times[:stop],
+                self._values[begin:] + self._values[:stop],
+            )
+
+    def last(self, seconds: float) -> Tuple[array, array]:
+        """Значения за последние seconds секунд"""
+        return self.range(start=time.time() - seconds)
+
+    def downsample(
+        self,
+        interval: float,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        aggregate: str = HistoryAggregate.MEAN,
+    ) -> List[Tuple[float, float]]:
+        """
+        Прореживание значений по интервалам времени.
+
+        Args:
+            interval: Длительность интервала в секундах
+            start: Начало диапазона (если None, с самого старого значения)
+            end: Конец диапазона (если None, до последнего значения)
+            aggregate: Агрегирование значений интервала (HistoryAggregate)
+
+        Returns:
+            list: (начало интервала, значение) для интервалов со значениями
+        """
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        if aggregate not in _AGGREGATES:
+            raise ValueError(f'Unknown aggregate: {aggregate}')
+
+        times, values = self.range(start, end)
+        if not times:
+            return []
+
+        origin = times[0] if start is None else start
+
+        # Номер интервала и индекс первой записи каждого непустого интервала
+        buckets = []
+        for position, timestamp in enumerate(times):
+            index = int((timestamp - origin) // interval)
+            if not buckets or buckets[-1][0] != index:
+                buckets.append((index, position))
+        buckets.append((None, len(times)))
+
+        function = _AGGREGATES[aggregate]
+        return [
+            (origin + index * interval, function(values[first:stop]))
+            for (index, first), (_, stop) in zip(buckets, buckets[1:], strict=False)
+        ]
+
+    def clear(self):
+        """Удаление всех значений"""
+        with self._lock:
+            self._start = 0
+            self._count = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Память, занимаемая значениями истории"""
+        return self.capacity * RECORD_SIZE
+
+    def __len__(self) -> int:
+        return self._count
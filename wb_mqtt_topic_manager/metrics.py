@@ -0,0 +1,200 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Добавление значения"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict:
+        """Накопленные значения корзин (как в Prometheus)"""
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(
+            (*self.buckets, float('inf')), self.counts, strict=True
+        ):
+            cumulative += count
+            buckets[bound] = cumulative
+
+        return {'buckets': buckets, 'sum': self.sum, 'count': self.count}
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик клиента.
+
+    Счетчики и гистограммы имеют единственную метку kind - класс топика
+    (TopicKind). Gauge-и вычисляются при снятии снимка, значения нескольких
+    функций с одним именем складываются (например, для шардов одного клиента).
+    """
+
+    def __init__(self, prefix: str = 'wb_mqtt'):
+        """
+        Инициализация реестра.
+
+        Args:
+            prefix: Префикс имен метрик в формате Prometheus
+        """
+        self.prefix = prefix
+
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._histograms: Dict[str, Dict[str, Histogram]] = {}
+        self._gauges: Dict[str, List[Callable[[], float]]] = {}
+
+    def inc(self, name: str, kind: str = '', value: int = 1):
+        """
+        Увеличение счетчика.
+
+        Args:
+            name: Имя счетчика
+            kind: Класс топика
+            value: Приращение
+        """
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = {}
+            counter[kind] = counter.get(kind, 0) + value
+
+    def observe(self, name: str, value: float, kind: str = ''):
+        """
+        Добавление значения в гистограмму.
+
+        Args:
+            name: Имя гистограммы
+            value: Значение (для времени - в секундах)
+            kind: Класс топика
+        """
+        with self._lock:
+            histograms = self._histograms.get(name)
+            if histograms is None:
+                histograms = self._histograms[name] = {}
+            histogram = histograms.get(kind)
+            if histogram is None:
+                histogram = histograms[kind] = Histogram()
+            histogram.observe(value)
+
+    def gauge(self, name: str, func: Callable[[], float]):
+        """
+        Регистрация gauge, значение вычисляется при снятии снимка.
+
+        Args:
+            name: Имя gauge
+            func: Функция без аргументов, возвращающая значение
+        """
+        with self._lock:
+            self._gauges.setdefault(name, []).append(func)
+
+    def counter(self, name: str, kind: Optional[str] = None) -> int:
+        """Значение счетчика (по всем классам топиков, если kind не указан)"""
+        with self._lock:
+            counter = self._counters.get(name, {})
+            if kind is None:
+                return sum(counter.values())
+            return counter.get(kind, 0)
+
+    def _gauge_values(self) -> Dict[str, float]:
+        with self._lock:
+            gauges = {name: list(funcs) for name, funcs in self._gauges.items()}
+
+        values = {}
+        for name, funcs in gauges.items():
+            total = 0
+            for func in funcs:
+                try:  # noqa: SIM105
+                    total += func()
+                except Exception:
+                    pass
+            values[name] = total
+
+        return values
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Снимок всех метрик.
+
+        Returns:
+            dict: {'counters': {имя: {kind: значение}},
+                'histograms': {имя: {kind: {'buckets', 'sum', 'count'}}},
+                'gauges': {имя: значение}}
+        """
+        with self._lock:
+            counters = {name: dict(values) for name, values in self._counters.items()}
+            histograms = {
+                name: {kind: histogram.snapshot() for kind, histogram in values.items()}
+                for name, values in self._histograms.items()
+            }
+
+        return {
+            'counters': counters,
+            'histograms': histograms,
+            'gauges': self._gauge_values(),
+        }
+
+    @staticmethod
+    def _labels(kind: str, **extra: str) -> str:
+        labels = {'kind': kind, **extra} if kind else extra
+        if not labels:
+            return ''
+        return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+    def to_prometheus(self) -> str:
+        """Метрики в текстовом формате Prometheus"""
+        snapshot = self.snapshot()
+        lines = []
+
+        for name, values in sorted(snapshot['counters'].items()):
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric} counter')
+            for kind, value in sorted(values.items()):
+                lines.append(f'{metric}{self._labels(kind)} {value}')
+
+        for name, values in sorted(snapshot['histograms'].items()):
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric} histogram')
+            for kind, histogram in sorted(values.items()):
+                for bound, count in histogram['buckets'].items():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric}_bucket{self._labels(kind, le=le)} {count}')
+                lines.append(f'{metric}_sum{self._labels(kind)} {histogram["sum"]}')
+                lines.append(f'{metric}_count{self._labels(kind)} {histogram["count"]}')
+
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric} {value}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,282 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+from wb_mqtt_topic_manager.constance import OverflowPolicy
+
+
+class OutboundMessage:
+    """Сообщение в исходящей очереди"""
+
+    __slots__ = ('topic', 'payload', 'qos', 'retain', 'on_sent', 'enqueued_at')
+
+    def __init__(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int,
+        retain: bool,
+        on_sent: Optional[Callable] = None,
+    ):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.on_sent = on_sent
+        self.enqueued_at = time.monotonic()
+
+
+class OutboundQueue:
+    """
+    Ограниченная исходящая очередь с контролем сообщений в полете.
+
+    Сообщения передаются в paho отдельным потоком, пока количество
+    неподтвержденных QoS 1/2 сообщений меньше max_inflight. Порядок
+    сообщений сохраняется. При переполнении очереди поведение задается
+    политикой OverflowPolicy.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, Any, int, bool], Any],
+        ready: Callable[[], bool],
+        max_size: int = 1000,
+        max_inflight: int = 20,
+        overflow_policy: str = OverflowPolicy.BLOCK,
+        block_timeout: Optional[float] = None,
+    ):
+        """
+        Инициализация очереди.
+
+        Args:
+            send: Функция передачи в paho (topic, payload, qos, retain),
+                возвращает MQTTMessageInfo или None
+            ready: Функция проверки готовности к отправке (подключение)
+            max_size: Максимальное количество сообщений в очереди
+            max_inflight: Максимальное количество неподтвержденных QoS 1/2 сообщений
+            overflow_policy: Поведение при переполнении (OverflowPolicy)
+            block_timeout: Максимальное ожидание места для BLOCK
+                (если None, ожидание не ограничено)
+        """
+        if overflow_policy not in OverflowPolicy.POLICIES:
+            raise ValueError(f'Unknown overflow policy: {overflow_policy}')
+
+        self.max_size = max_size
+        self.max_inflight = max_inflight
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+
+        self._send = send
+        self._ready = ready
+        self._queue: Deque[OutboundMessage] = deque()
+        self._inflight: Set[int] = set()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+        # Счетчики
+        self.enqueued = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.blocked = 0
+        self.overflowed = 0
+        self.max_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def start(self):
+        """Запуск потока отправки"""
+        with self._condition:
+            if self._thread is not None:
+                return
+
+            self._stopped = False
+            self._thread = threading.Thread(
+                target=self._run, name='mqtt-outbound', daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """
+        Остановка потока отправки.
+
+        Неотправленные сообщения отбрасываются, их on_sent вызывается с None,
+        поэтому отслеживаемые публикации завершаются с ошибкой.
+        """
+        with self._condition:
+            self._stopped = True
+            thread, self._thread = self._thread, None
+            leftover = list(self._queue)
+            self._queue.clear()
+            self.dropped += len(leftover)
+            self._condition.notify_all()
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+        for message in leftover:
+            self._notify_sent(message, None)
+
+    def put(self, message: OutboundMessage, can_block: bool = True) -> bool:
+        """
+        Постановка сообщения в очередь.
+
+        Args:
+            message: Сообщение
+            can_block: Можно ли блокировать вызывающий поток. Из сетевого потока
+                paho блокировать нельзя, иначе подтверждения не будут обработаны,
+                поэтому для BLOCK сообщение ставится сверх лимита
+
+        Returns:
+            bool: True если сообщение поставлено в очередь
+        """
+        dropped = None
+
+        with self._condition:
+            if len(self._queue) >= self.max_size:
+                if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    dropped = self._queue.popleft()
+                    self.dropped += 1
+                elif not self._make_room(can_block):
+                    return False
+
+            self._queue.append(message)
+            self.enqueued += 1
+            if len(self._queue) > self.max_depth:
+                self.max_depth = len(self._queue)
+            self._condition.notify_all()
+
+        # Вытесненное сообщение не будет отправлено
+        if dropped is not None:
+            self._notify_sent(dropped, None)
+
+        return True
+
+    def _make_room(self, can_block: bool) -> bool:
+        """Обработка переполнения согласно политике (вызывается под блокировкой)"""
+        if self.overflow_policy == OverflowPolicy.REJECT:
+            self.rejected += 1
+            return False
+
+        if not can_block:
+            self.overflowed += 1
+            return True
+
+        self.blocked += 1
+        has_room = self._condition.wait_for(
+            lambda: len(self._queue) < self.max_size or self._stopped,
+            self.block_timeout,
+        )
+        if not has_room or len(self._queue) >= self.max_size:
+            self.rejected += 1
+            return False
+
+        return True
+
+    def wakeup(self):
+        """Пробуждение потока отправки (после подключения)"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def on_published(self, mid: int):
+        """Обработка подтверждения публикации"""
+        with self._condition:
+            if mid in self._inflight:
+                self._inflight.discard(mid)
+                self._condition.notify_all()
+
+    def reset_inflight(self):
+        """Сброс сообщений в полете (после переподключения)"""
+        with self._condition:
+            self._inflight.clear()
+            self._condition.notify_all()
+
+    def wait_empty(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание отправки всех сообщений из очереди.
+
+        Returns:
+            bool: True если очередь пуста
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue, timeout)
+
+    def _can_send(self) -> bool:
+        """Можно ли отправить первое сообщение (вызывается под блокировкой)"""
+        if not self._queue or not self._ready():
+            return False
+
+        return self._queue[0].qos == 0 or len(self._inflight) < self.max_inflight
+
+    def _run(self):
+        """Цикл потока отправки"""
+        while True:
+            with self._condition:
+                while not self._stopped and not self._can_send():
+                    # Таймаут страхует от пропущенного изменения состояния подключения
+                    self._condition.wait(1)
+
+                if self._stopped:
+                    return
+
+                message = self._queue.popleft()
+                # Освободилось место для заблокированных производителей
+                self._condition.notify_all()
+
+            wait = time.monotonic() - message.enqueued_at
+            self.total_wait += wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+
+            info = self._send(
+                message.topic, message.payload, message.qos, message.retain
+            )
+
+            if info is None:
+                self.failed += 1
+            else:
+                self.sent += 1
+                if message.qos > 0:
+                    with self._condition:
+                        self._inflight.add(info.mid)
+                    # Подтверждение могло прийти до регистрации
+                    if info.is_published():
+                        self.on_published(info.mid)
+
+            self._notify_sent(message, info)
+
+    @staticmethod
+    def _notify_sent(message: OutboundMessage, info: Any):
+        """Вызов on_sent сообщения с MQTTMessageInfo или None"""
+        if message.on_sent is not None:
+            try:  # noqa: SIM105
+                message.on_sent(info)
+            except Exception:
+                pass
+
+    @property
+    def depth(self) -> int:
+        """Текущее количество сообщений в очереди"""
+        return len(self._queue)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики очереди"""
+        processed = self.sent + self.failed
+        return {
+            'depth': len(self._queue),
+            'max_depth': self.max_depth,
+            'inflight': len(self._inflight),
+            'enqueued': self.enqueued,
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'rejected': self.rejected,
+            'blocked': self.blocked,
+            'overflowed': self.overflowed,
+            'avg_wait': self.total_wait / processed if processed else 0.0,
+            'max_wait': self.max_wait,
+        }
@@ -0,0 +1,72 @@
+from typing import Any, Optional
+
+from wb_mqtt_topic_manager.serializer import json_loads
+
+
+class Payload:
+    """
+    Данные входящего сообщения без копирования и декодирования.
+
+    Хранит bytes, полученные от paho. Строка декодируется при первом
+    обращении к text и кешируется, числа разбираются напрямую из bytes.
+    """
+
+    __slots__ = ('_data', '_text')
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._text: Optional[str] = None
+
+    @property
+    def raw(self) -> bytes:
+        """Исходные данные"""
+        return self._data
+
+    @property
+    def view(self) -> memoryview:
+        """Представление данных без копирования"""
+        return memoryview(self._data)
+
+    @property
+    def text(self) -> str:
+        """Данные в виде строки UTF-8"""
+        if self._text is None:
+            self._text = self._data.decode('utf-8')
+        return self._text
+
+    def json(self) -> Any:
+        """Разбор данных как JSON"""
+        return json_loads(self._data)
+
+    def __int__(self) -> int:
+        return int(self._data)
+
+    def __float__(self) -> float:
+        return float(self._data)
+
+    def __bytes__(self) -> bytes:
+        return self._data
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __bool__(self) -> bool:
+        return bool(self._data)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, Payload):
+            return self._data == other._data
+        if isinstance(other, bytes):
+            return self._data == other
+        if isinstance(other, str):
+            return self.text == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._data)
+
+    def __repr__(self) -> str:
+        return f'Payload({self._data!r})'
@@ -0,0 +1,264 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from wb_mqtt_topic_manager.scheduler import Scheduler, TimerHandle
+
+# Нет значения, ожидающего публикации
+_NOTHING = object()
+
+
+@dataclass(frozen=True, slots=True)
+class PublishPolicy:
+    """
+    Политика публикации значений контрола драйвера.
+
+    Attributes:
+        deadband: Абсолютная зона нечувствительности, значение публикуется,
+            если отличается от последнего опубликованного больше, чем на deadband
+        relative_deadband: Относительная зона нечувствительности (доля от модуля
+            последнего опубликованного значения)
+        min_interval: Минимальный интервал между публикациями в секундах,
+            последнее значение за интервал публикуется по его окончании
+        debounce: Значение публикуется, только если не менялось debounce секунд
+        max_interval: Максимальный интервал между публикациями в секундах,
+            по его истечении текущее значение публикуется повторно
+    """
+
+    deadband: Optional[float] = None
+    relative_deadband: Optional[float] = None
+    min_interval: Optional[float] = None
+    debounce: Optional[float] = None
+    max_interval: Optional[float] = None
+
+    def __post_init__(self):
+        for name in (
+            'deadband',
+            'relative_deadband',
+            'min_interval',
+            'debounce',
+            'max_interval',
+        ):
+            value = getattr(self, name)
+            if value is not None and value < 0:
+                raise ValueError(f'{name} must not be negative')
+
+        if self.max_interval is not None and not self.max_interval:
+            raise ValueError('max_interval must be positive')
+
+
+class PolicyPublisher:
+    """
+    Применение PublishPolicy к значениям одного контрола.
+
+    Отложенные публикации выполняются общим планировщиком клиента. У контрола
+    не больше одной задачи каждого вида: задача проверяет время последней
+    публикации и при необходимости переносится, поэтому частые изменения
+    значения не создают новых таймеров.
+
+    При отключении клиента таймеры останавливаются (suspend) и запускаются
+    снова после подключения (resume).
+    """
+
+    __slots__ = (
+        'policy',
+        '_publish',
+        '_scheduler',
+        '_lock',
+        '_current',
+        '_published',
+        '_published_at',
+        '_changed_at',
+        '_pending',
+        '_timer',
+        '_heartbeat',
+        '_closed',
+        '__weakref__',
+    )
+
+    def __init__(
+        self,
+        policy: PublishPolicy,
+        publish: Callable[[Any], Any],
+        scheduler: Scheduler,
+        initial_value: Any,
+    ):
+        """
+        Инициализация.
+
+        Args:
+            policy: Политика публикации
+            publish: Функция публикации значения
+            scheduler: Планировщик клиента
+            initial_value: Уже опубликованное начальное значение
+        """
+        self.policy = policy
+        self._publish = publish
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+
+        now = time.monotonic()
+        self._current = initial_value
+        self._published = initial_value
+        self._published_at = now
+        self._changed_at = now
+        self._pending = _NOTHING
+        self._timer: Optional[TimerHandle] = None
+        self._heartbeat: Optional[TimerHandle] = None
+        self._closed = False
+
+        self.resume()
+
+    def submit(self, value: Any) -> Any:
+        """
+        Новое значение контрола.
+
+        Returns:
+            Результат публикации, True если публикация отложена,
+            False если значение в зоне нечувствительности
+        """
+        policy = self.policy
+
+        with self._lock:
+            now = time.monotonic()
+            self._current = value
+            self._changed_at = now
+
+            if not self._is_significant(value):
+                # Значение вернулось к опубликованному, отложенное не нужно
+                self._pending = _NOTHING
+                return False
+
+            if policy.debounce:
+                self._pending = value
+                self._schedule(now + policy.debounce)
+                return True
+
+            if policy.min_interval and now - self._published_at < policy.min_interval:
+                self._pending = value
+                self._schedule(self._published_at + policy.min_interval)
+                return True
+
+            self._mark_published(value, now)
+
+        return self._publish(value)
+
+    def _is_significant(self, value: Any) -> bool:
+        """Выходит ли значение за зону нечувствительности (под блокировкой)"""
+        policy = self.policy
+        if policy.deadband is None and policy.relative_deadband is None:
+            return value != self._published
+
+        try:
+            delta = abs(value - self._published)
+            if policy.deadband is not None and delta <= policy.deadband:
+                return False
+            if policy.relative_deadband is not None:
+                return delta > policy.relative_deadband * abs(self._published)
+        except TypeError:
+            # Нечисловые значения сравниваются на равенство
+            return value != self._published
+
+        return True
+
+    def _schedule(self, when: float):
+        """Планирование отложенной публикации (под блокировкой)"""
+        if self._timer is None:
+            self._timer = self._scheduler.call_at(when, self._on_timer)
+
+    def _mark_published(self, value: Any, now: float):
+        """Учет публикации (под блокировкой)"""
+        self._published = value
+        self._published_at = now
+        self._pending = _NOTHING
+
+    def _on_timer(self):
+        """Публикация отложенного значения по окончании интервала"""
+        policy = self.policy
+
+        with self._lock:
+            self._timer = None
+            value = self._pending
+            if value is _NOTHING:
+                return
+
+            now = time.monotonic()
+            when = now
+            if policy.debounce:
+                when = max(when, self._changed_at + policy.debounce)
+            if policy.min_interval:
+                when = max(when, self._published_at + policy.min_interval)
+            if when > now:
+                self._schedule(when)
+                return
+
+            self._mark_published(value, now)
+
+        self._publish(value)
+
+    def _on_heartbeat(self):
+        """Повторная публикация текущего значения по истечении max_interval"""
+        max_interval = self.policy.max_interval
+
+        with self._lock:
+            if self._heartbeat is None:
+                # Отменено во время выполнения
+                return
+
+            now = time.monotonic()
+            due = self._published_at + max_interval
+            publish = now >= due
+            if publish:
+                value = self._current
+                self._mark_published(value, now)
+                due = now + max_interval
+            self._heartbeat = self._scheduler.call_at(due, self._on_heartbeat)
+
+        if publish:
+            self._publish(value)
+
+    def resume(self):
+        """Запуск периодической публикации (при создании и после подключения)"""
+        max_interval = self.policy.max_interval
+
+        with self._lock:
+            if self._closed:
+                return
+            # Значение, отложенное во время отключения
+            if self._pending is not _NOTHING:
+                self._schedule(time.monotonic())
+            if max_interval is not None and self._heartbeat is None:
+                self._heartbeat = self._scheduler.call_at(
+                    self._published_at + max_interval, self._on_heartbeat
+                )
+
+    def suspend(self):
+        """Публикация отложенного значения и остановка таймеров (при отключении)"""
+        self.flush()
+        with self._lock:
+            self._cancel_timers()
+
+    def cancel(self):
+        """Отмена отложенных публикаций"""
+        with self._lock:
+            self._closed = True
+            self._cancel_timers()
+            self._pending = _NOTHING
+
+    def _cancel_timers(self):
+        """Отмена таймеров (под блокировкой)"""
+        for timer in (self._timer, self._heartbeat):
+            if timer is not None:
+                timer.cancel()
+        self._timer = self._heartbeat = None
+
+    def flush(self):
+        """Немедленная публикация отложенного значения"""
+        with self._lock:
+            value = self._pending
+            if value is _NOTHING:
+                return
+            self._mark_published(value, time.monotonic())
+
+        self._publish(value)
@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CallbackSample:
+    """Замер одного вызова callback-а"""
+
+    name: str
+    topic: Optional[str]
+    elapsed: float
+    timestamp: float
+
+
+def callback_name(callback: Callable) -> str:
+    """Полное имя callable (модуль и qualname)"""
+    func = getattr(callback, 'func', callback)  # functools.partial
+    module = getattr(func, '__module__', None)
+    name = getattr(func, '__qualname__', None) or repr(func)
+    return f'{module}.{name}' if module else name
+
+
+class CallbackProfiler:
+    """
+    Профилировщик пользовательских callback-ов.
+
+    Хранит N самых медленных вызовов и сообщает о вызовах дольше порога
+    через logging и on_slow. Замер вложенных вызовов (callback контрола
+    внутри обработчика подписки) приписывается самому внутреннему callback-у.
+    """
+
+    def __init__(
+        self,
+        top_n: int = 10,
+        threshold: Optional[float] = None,
+        on_slow: Optional[Callable[[CallbackSample], None]] = None,
+    ):
+        """
+        Инициализация профилировщика.
+
+        Args:
+            top_n: Количество хранимых самых медленных вызовов
+            threshold: Порог медленного вызова в секундах
+                (если None, о медленных вызовах не сообщается)
+            on_slow: Функция, вызываемая с CallbackSample медленного вызова
+        """
+        if top_n < 1:
+            raise ValueError('top_n must be positive')
+
+        self.top_n = top_n
+        self.threshold = threshold
+        self.on_slow = on_slow
+
+        self._lock = threading.Lock()
+        self._slowest: List[tuple] = []
+        self._counter = itertools.count()
+
+        # Счетчики
+        self.calls = 0
+        self.slow = 0
+        self.total_time = 0.0
+
+    def record(self, callback: Callable, topic: Optional[str], elapsed: float):
+        """
+        Учет вызова callback-а.
+
+        Args:
+            callback: Вызванная функция
+            topic: Топик сообщения (None, если вызов не связан с сообщением)
+            elapsed: Время выполнения в секундах
+        """
+        is_slow = self.threshold is not None and elapsed >= self.threshold
+
+        with self._lock:
+            self.calls += 1
+            self.total_time += elapsed
+            if is_slow:
+                self.slow += 1
+
+            # Имя вычисляется только для попадающих в топ вызовов
+            is_top = len(self._slowest) < self.top_n or elapsed > self._slowest[0][0]
+            if not is_top and not is_slow:
+                return
+
+        sample = CallbackSample(
+            name=callback_name(callback),
+            topic=topic,
+            elapsed=elapsed,
+            timestamp=time.time(),
+        )
+
+        if is_top:
+            entry = (elapsed, next(self._counter), sample)
+            with self._lock:
+                if len(self._slowest) < self.top_n:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+
+        if is_slow:
+            logger.warning(
+                'Slow callback %s on %s: %.1f ms',
+                sample.name,
+                sample.topic,
+                elapsed * 1000,
+            )
+            if self.on_slow is not None:
+                try:  # noqa: SIM105
+                    self.on_slow(sample)
+                except Exception:
+                    pass
+
+    def slowest(self) -> List[CallbackSample]:
+        """Самые медленные вызовы, от медленного к быстрому"""
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [sample for _, _, sample in entries]
+
+    def reset(self):
+        """Сброс замеров"""
+        with self._lock:
+            self._slowest.clear()
+            self.calls = 0
+            self.slow = 0
+            self.total_time = 0.0
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'slow': self.slow,
+                'avg_time': self.total_time / self.calls if self.calls else 0.0,
+                'max_time': max(self._slowest)[0] if self._slowest else 0.0,
+            }
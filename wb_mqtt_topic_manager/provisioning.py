@@ -0,0 +1,361 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Union
+
+from wb_mqtt_topic_manager.constance import LegacyTopicsPolicy
+from wb_mqtt_topic_manager.control.base import ControlType, LocalizedString
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import DriverDevice
+from wb_mqtt_topic_manager.policy import PublishPolicy
+from wb_mqtt_topic_manager.serializer import json_loads
+
+try:
+    import yaml
+except ImportError:  # pragma: no cover - PyYAML необязательная зависимость
+    yaml = None
+
+# Функции создания контролов по типу
+CONTROL_FACTORIES = {
+    ControlType.SWITCH.value: ControlManager.create_switch,
+    ControlType.ALARM.value: ControlManager.create_alarm,
+    ControlType.PUSHBUTTON.value: ControlManager.create_button,
+    ControlType.RANGE.value: ControlManager.create_range,
+}
+
+DEVICE_FIELDS = ('id', 'driver', 'title', 'legacy_topics', 'controls')
+CONTROL_FIELDS = (
+    'id',
+    'type',
+    'value',
+    'order',
+    'title',
+    'readonly',
+    'min',
+    'max',
+    'share_group',
+    'policy',
+)
+RANGE_FIELDS = ('min', 'max')
+
+# Символы, недопустимые в идентификаторах (разделитель уровней и wildcard-ы)
+FORBIDDEN_CHARS = ('/', '+', '#')
+
+
+class SchemaError(ValueError):
+    """Ошибки схемы, содержит все найденные ошибки"""
+
+    def __init__(self, errors: List[str]):
+        self.errors = errors
+        super().__init__('Invalid provisioning schema:\n' + '\n'.join(errors))
+
+
+@dataclass
+class ProvisionReport:
+    """Результат создания устройств по схеме"""
+
+    devices: Dict[str, DriverDevice] = field(default_factory=dict)
+    controls: int = 0
+    # Время создания устройств и контролов (публикации и подписки)
+    publish_time: float = 0.0
+    # Время ожидания подтверждения публикаций
+    ack_time: float = 0.0
+    # Все публикации подтверждены брокером
+    acknowledged: bool = False
+
+    @property
+    def total_time(self) -> float:
+        """Общее время создания в секундах"""
+        return self.publish_time + self.ack_time
+
+
+def load_schema(source: Union[dict, str, os.PathLike]) -> dict:
+    """
+    Загрузка схемы.
+
+    Args:
+        source: Словарь, путь к файлу .json/.yaml/.yml или текст JSON/YAML
+
+    Returns:
+        dict: Схема
+    """
+    if isinstance(source, dict):
+        return source
+
+    if isinstance(source, os.PathLike) or (
+        isinstance(source, str) and os.path.isfile(source)
+    ):
+        path = os.fspath(source)
+        with open(path, encoding='utf-8') as file:
+            text = file.read()
+        if path.endswith(('.yaml', '.yml')):
+            return _load_yaml(text)
+        return _load_json(text)
+
+    try:
+        return json_loads(source)
+    except ValueError:
+        if yaml is None:
+            raise SchemaError(['schema is not a valid JSON']) from None
+
+    return _load_yaml(source)
+
+
+def _load_json(text: str) -> Any:
+    try:
+        return json_loads(text)
+    except ValueError as error:
+        raise SchemaError([f'schema is not a valid JSON: {error}']) from None
+
+
+def _load_yaml(text: str) -> Any:
+    if yaml is None:
+        raise SchemaError(['YAML schema requires PyYAML'])
+    try:
+        return yaml.safe_load(text)
+    except yaml.YAMLError as error:
+        raise SchemaError([f'schema is not a valid YAML: {error}']) from None
+
+
+def validate_schema(schema: Any):
+    """
+    Проверка схемы до создания устройств.
+
+    Схема:
+        devices:
+          - id: boiler
+            driver: my-driver
+            title: {en: Boiler, ru: Котел}
+            legacy_topics: json_only  # необязательно
+            controls:
+              - {id: power, type: switch, value: 0, order: 1,
+                 title: {en: Power, ru: Питание}}
+              - {id: level, type: range, value: 10, min: 0, max: 100,
+                 policy: {deadband: 1, min_interval: 0.5}}
+
+    Raises:
+        SchemaError: Все найденные ошибки схемы
+    """
+    errors: List[str] = []
+
+    if not isinstance(schema, dict):
+        raise SchemaError(['schema: expected a mapping'])
+    devices = schema.get('devices')
+    if not isinstance(devices, list):
+        raise SchemaError(['devices: expected a list'])
+
+    device_ids = set()
+    for index, device in enumerate(devices):
+        path = f'devices[{index}]'
+        if not isinstance(device, dict):
+            errors.append(f'{path}: expected a mapping')
+            continue
+
+        _check_fields(errors, path, device, DEVICE_FIELDS)
+        device_id = _check_id(errors, path, device, device_ids)
+        if device_id is not None:
+            path = f'devices[{device_id}]'
+
+        if not isinstance(device.get('driver'), str) or not device['driver']:
+            errors.append(f'{path}.driver: expected a non-empty string')
+        if not _is_title(device.get('title'), ('en',)):
+            errors.append(f'{path}.title: expected a mapping with "en" string')
+        legacy_topics = device.get('legacy_topics')
+        policies = LegacyTopicsPolicy.POLICIES
+        if legacy_topics is not None and legacy_topics not in policies:
+            errors.append(f'{path}.legacy_topics: unknown policy {legacy_topics!r}')
+
+        controls = device.get('controls', [])
+        if not isinstance(controls, list):
+            errors.append(f'{path}.controls: expected a list')
+            continue
+
+        control_ids = set()
+        for control_index, control in enumerate(controls):
+            control_path = f'{path}.controls[{control_index}]'
+            if not isinstance(control, dict):
+                errors.append(f'{control_path}: expected a mapping')
+                continue
+            _check_control(errors, control_path, control, control_ids)
+
+    if errors:
+        raise SchemaError(errors)
+
+
+def _check_control(errors: List[str], path: str, control: dict, control_ids: set):
+    """Проверка описания контрола"""
+    _check_fields(errors, path, control, CONTROL_FIELDS)
+    control_id = _check_id(errors, path, control, control_ids)
+    if control_id is not None:
+        path = f'{path.rsplit("[", 1)[0]}[{control_id}]'
+
+    control_type = control.get('type')
+    if control_type not in CONTROL_FACTORIES:
+        errors.append(f'{path}.type: unknown control type {control_type!r}')
+    if 'value' not in control:
+        errors.append(f'{path}.value: required')
+
+    order = control.get('order')
+    if order is not None and (not isinstance(order, int) or isinstance(order, bool)):
+        errors.append(f'{path}.order: expected an integer')
+    title = control.get('title')
+    if title is not None and not _is_title(title, ('en', 'ru')):
+        errors.append(f'{path}.title: expected a mapping with "en" and "ru" strings')
+    if not isinstance(control.get('readonly', False), bool):
+        errors.append(f'{path}.readonly: expected a boolean')
+    share_group = control.get('share_group')
+    if share_group is not None and not isinstance(share_group, str):
+        errors.append(f'{path}.share_group: expected a string')
+    policy = control.get('policy')
+    if policy is not None:
+        try:
+            PublishPolicy(**policy)
+        except (TypeError, ValueError) as error:
+            errors.append(f'{path}.policy: {error}')
+
+    if control_type != ControlType.RANGE.value:
+        for name in RANGE_FIELDS:
+            if name in control:
+                errors.append(f'{path}.{name}: allowed only for range controls')
+        return
+
+    bounds = [control.get('min', 0), control.get('max', 255)]
+    for name, value in zip(RANGE_FIELDS, bounds, strict=True):
+        if not isinstance(value, int) or isinstance(value, bool):
+            errors.append(f'{path}.{name}: expected an integer')
+            return
+    if bounds[0] > bounds[1]:
+        errors.append(f'{path}: min is greater than max')
+
+
+def _check_fields(errors: List[str], path: str, item: dict, fields: tuple):
+    """Поиск неизвестных полей (опечаток)"""
+    for name in item:
+        if name not in fields:
+            errors.append(f'{path}.{name}: unknown field')
+
+
+def _check_id(errors: List[str], path: str, item: dict, seen: set) -> Optional[str]:
+    """Проверка идентификатора, возвращает его, если он корректен"""
+    item_id = item.get('id')
+    if not isinstance(item_id, str) or not item_id:
+        errors.append(f'{path}.id: expected a non-empty string')
+        return None
+    if any(char in item_id for char in FORBIDDEN_CHARS):
+        errors.append(f'{path}.id: must not contain "/", "+" or "#"')
+        return None
+    if item_id in seen:
+        errors.append(f'{path}.id: duplicate id {item_id!r}')
+        return None
+
+    seen.add(item_id)
+    return item_id
+
+
+def _is_title(title: Any, languages: tuple) -> bool:
+    return isinstance(title, dict) and all(
+        isinstance(title.get(language), str) for language in languages
+    )
+
+
+def _create(client, schema: dict, report: ProvisionReport):
+    """Создание устройств и контролов с пакетной подпиской"""
+    with client.batch():
+        for device_spec in schema['devices']:
+            device = DriverDevice.create(
+                client,
+                device_spec['id'],
+                device_spec['driver'],
+                device_spec['title'],
+                legacy_topics=device_spec.get('legacy_topics'),
+            )
+            report.devices[device.id] = device
+
+            for control_spec in device_spec.get('controls', []):
+                control = _create_control(device, control_spec)
+                device.controls[control.control_id] = control
+                report.controls += 1
+
+
+def _create_control(device: DriverDevice, spec: dict):
+    title = spec.get('title')
+    kwargs = {
+        'initial_value': spec['value'],
+        'order': spec.get('order'),
+        'title': LocalizedString(en=title['en'], ru=title['ru']) if title else None,
+        'readonly': spec.get('readonly', False),
+        'share_group': spec.get('share_group'),
+    }
+    if spec.get('policy'):
+        kwargs['policy'] = PublishPolicy(**spec['policy'])
+    if spec['type'] == ControlType.RANGE.value:
+        kwargs['min_value'] = spec.get('min', 0)
+        kwargs['max_value'] = spec.get('max', 255)
+
+    return CONTROL_FACTORIES[spec['type']](device, spec['id'], **kwargs)
+
+
+def provision(
+    client,
+    schema: Union[dict, str, os.PathLike],
+    timeout: Optional[float] = 30,
+    wait: bool = True,
+) -> ProvisionReport:
+    """
+    Создание устройств и контролов драйвера по схеме.
+
+    Схема проверяется целиком до первой публикации. Публикации meta
+    и начальных значений не ожидают подтверждения по одной: подписки
+    на /on отправляются пакетами (batch), а подтверждения QoS 1
+    ожидаются один раз для всех публикаций.
+
+    Args:
+        client: MQTT клиент
+        schema: Словарь, путь к файлу .json/.yaml/.yml или текст JSON/YAML
+            (формат описан в validate_schema)
+        timeout: Максимальное время ожидания подтверждений в секундах
+        wait: Ожидать подтверждения публикаций
+
+    Returns:
+        ProvisionReport: Созданные устройства и время создания
+
+    Raises:
+        SchemaError: Схема некорректна, устройства не создаются
+    """
+    schema = load_schema(schema)
+    validate_schema(schema)
+
+    report = ProvisionReport()
+    started = time.perf_counter()
+    _create(client, schema, report)
+    report.publish_time = time.perf_counter() - started
+
+    if wait:
+        started = time.perf_counter()
+        report.acknowledged = client.flush(timeout)
+        report.ack_time = time.perf_counter() - started
+
+    return report
+
+
+async def provision_async(
+    client,
+    schema: Union[dict, str, os.PathLike],
+    timeout: Optional[float] = 30,
+    wait: bool = True,
+) -> ProvisionReport:
+    """Вариант provision для AsyncMQTTClient, не блокирующий событийный цикл"""
+    schema = load_schema(schema)
+    validate_schema(schema)
+
+    report = ProvisionReport()
+    started = time.perf_counter()
+    _create(client, schema, report)
+    report.publish_time = time.perf_counter() - started
+
+    if wait:
+        started = time.perf_counter()
+        report.acknowledged = await client.flush(timeout)
+        report.ack_time = time.perf_counter() - started
+
+    return report
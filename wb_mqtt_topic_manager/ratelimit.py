@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+from wb_mqtt_topic_manager.constance import ThrottlePolicy
+from wb_mqtt_topic_manager.scheduler import Scheduler, TimerHandle
+
+
+class TokenBucket:
+    """Token bucket: rate токенов в секунду, не больше burst накопленных"""
+
+    __slots__ = ('rate', 'burst', '_tokens', '_updated')
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+
+        self.rate = rate
+        self.burst = max(burst if burst is not None else rate, 1)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def delay(self, now: float) -> float:
+        """Время до появления токена в секундах (0, если токен есть)"""
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self):
+        """Списание токена (после проверки delay)"""
+        self._tokens -= 1
+
+
+class _DeviceLimit:
+    """Ограничение и отложенные публикации одного устройства"""
+
+    __slots__ = ('bucket', 'backlog', 'published', 'throttled', 'coalesced')
+
+    def __init__(self, bucket: Optional[TokenBucket], coalesce: bool):
+        self.bucket = bucket
+        # Отложенные публикации: топик -> сообщение при схлопывании, иначе очередь
+        self.backlog = {} if coalesce else deque()
+
+        # Счетчики
+        self.published = 0
+        self.throttled = 0
+        self.coalesced = 0
+
+
+class RateLimiter:
+    """
+    Ограничение частоты публикаций устройств драйвера.
+
+    У каждого устройства свой token bucket, общий bucket ограничивает все
+    устройства подключения. Публикации сверх ограничения откладываются
+    (DELAY) или схлопываются до последнего значения топика (COALESCE).
+    Отложенные публикации отправляет общий планировщик клиента, устройства
+    обслуживаются по очереди, поэтому одно устройство не вытесняет остальные
+    при исчерпании общего ограничения.
+    """
+
+    def __init__(
+        self,
+        publish: Callable[[str, Any, int, bool], Any],
+        scheduler: Scheduler,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        global_rate: Optional[float] = None,
+        global_burst: Optional[float] = None,
+        overflow: str = ThrottlePolicy.DELAY,
+    ):
+        """
+        Инициализация.
+
+        Args:
+            publish: Функция публикации (topic, payload, qos, retain)
+            scheduler: Планировщик клиента
+            rate: Публикаций в секунду для каждого устройства
+                (если None, устройства ограничены только общим ограничением)
+            burst: Допустимая пачка публикаций устройства (по умолчанию rate)
+            global_rate: Публикаций в секунду для всех устройств вместе
+            global_burst: Допустимая пачка публикаций всех устройств
+            overflow: Поведение при превышении ограничения (ThrottlePolicy)
+        """
+        if overflow not in ThrottlePolicy.POLICIES:
+            raise ValueError(f'Unknown throttle policy: {overflow}')
+
+        self.rate = rate
+        self.burst = burst
+        self.overflow = overflow
+
+        self._publish = publish
+        self._scheduler = scheduler
+        self._lock = threading.Lock()
+        self._global = TokenBucket(global_rate, global_burst) if global_rate else None
+        self._devices: Dict[str, _DeviceLimit] = {}
+        # Устройства с отложенными публикациями в порядке обслуживания
+        self._waiting: Dict[str, None] = {}
+        self._timer: Optional[TimerHandle] = None
+
+    def set_limit(
+        self, device_id: str, rate: Optional[float], burst: Optional[float] = None
+    ):
+        """
+        Ограничение частоты публикаций устройства.
+
+        Args:
+            device_id: Идентификатор устройства
+            rate: Публикаций в секунду (если None, только общее ограничение)
+            burst: Допустимая пачка публикаций (по умолчанию rate)
+        """
+        bucket = TokenBucket(rate, burst) if rate else None
+        with self._lock:
+            self._device(device_id).bucket = bucket
+
+    def _device(self, device_id: str) -> _DeviceLimit:
+        """Состояние устройства, создается при отсутствии (под блокировкой)"""
+        limit = self._devices.get(device_id)
+        if limit is None:
+            bucket = TokenBucket(self.rate, self.burst) if self.rate else None
+            coalesce = self.overflow == ThrottlePolicy.COALESCE
+            limit = self._devices[device_id] = _DeviceLimit(bucket, coalesce)
+        return limit
+
+    def _delay(self, limit: _DeviceLimit, now: float) -> float:
+        """Время до возможной публикации устройства (под блокировкой)"""
+        delay = limit.bucket.delay(now) if limit.bucket is not None else 0.0
+        if self._global is not None:
+            delay = max(delay, self._global.delay(now))
+        return delay
+
+    def _take(self, limit: _DeviceLimit):
+        """Списание токенов публикации (под блокировкой)"""
+        if limit.bucket is not None:
+            limit.bucket.take()
+        if self._global is not None:
+            self._global.take()
+        limit.published += 1
+
+    def submit(
+        self, device_id: str, topic: str, payload: Any, qos: int, retain: bool
+    ) -> Any:
+        """
+        Публикация с учетом ограничений.
+
+        Returns:
+            Результат публикации или True, если публикация отложена
+        """
+        with self._lock:
+            limit = self._device(device_id)
+            now = time.monotonic()
+
+            # Отложенные публикации устройства отправляются раньше новых
+            if not limit.backlog and not self._delay(limit, now):
+                self._take(limit)
+            else:
+                limit.throttled += 1
+                message = (topic, payload, qos, retain)
+                if self.overflow == ThrottlePolicy.COALESCE:
+                    if topic in limit.backlog:
+                        limit.coalesced += 1
+                    limit.backlog[topic] = message
+                else:
+                    limit.backlog.append(message)
+                self._waiting[device_id] = None
+                self._schedule(now)
+                return True
+
+        return self._publish(topic, payload, qos, retain)
+
+    def _schedule(self, now: float):
+        """Планирование отправки отложенных публикаций (под блокировкой)"""
+        # Задача отменяется и при остановке планировщика
+        timer = self._timer
+        if (timer is not None and not timer.cancelled) or not self._waiting:
+            return
+
+        delay = min(
+            self._delay(self._devices[device_id], now) for device_id in self._waiting
+        )
+        self._timer = self._scheduler.call_later(delay, self._drain)
+
+    def _drain(self):
+        """Отправка отложенных публикаций, по одной от устройства за круг"""
+        ready = []
+
+        with self._lock:
+            self._timer = None
+            now = time.monotonic()
+
+            progress = True
+            while progress and self._waiting:
+                progress = False
+                for device_id in list(self._waiting):
+                    limit = self._devices[device_id]
+                    if self._delay(limit, now):
+                        continue
+
+                    self._take(limit)
+                    progress = True
+                    if isinstance(limit.backlog, deque):
+                        ready.append(limit.backlog.popleft())
+                    else:
+                        topic = next(iter(limit.backlog))
+                        ready.append(limit.backlog.pop(topic))
+                    # Обслуженное устройство переходит в конец очереди
+                    del self._waiting[device_id]
+                    if limit.backlog:
+                        self._waiting[device_id] = None
+
+            self._schedule(now)
+
+        for message in ready:
+            self._publish(*message)
+
+    def flush(self):
+        """Отправка всех отложенных публикаций без учета ограничений"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            ready = []
+            for device_id in self._waiting:
+                backlog = self._devices[device_id].backlog
+                ready.extend(
+                    backlog if isinstance(backlog, deque) else backlog.values()
+                )
+                backlog.clear()
+            self._waiting.clear()
+
+        for message in ready:
+            self._publish(*message)
+
+    def device_stats(self, device_id: str) -> Dict[str, int]:
+        """Счетчики устройства"""
+        with self._lock:
+            limit = self._devices.get(device_id)
+            if limit is None:
+                return {}
+            return {
+                'published': limit.published,
+                'throttled': limit.throttled,
+                'coalesced': limit.coalesced,
+                'pending': len(limit.backlog),
+            }
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Счетчики всех устройств: {device_id: счетчики}"""
+        with self._lock:
+            device_ids = list(self._devices)
+        return {device_id: self.device_stats(device_id) for device_id in device_ids}
@@ -0,0 +1,290 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from wb_mqtt_topic_manager.constance import QosType, TopicKind
+from wb_mqtt_topic_manager.control.control import ObserverControl
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import ObserverDevice
+from wb_mqtt_topic_manager.serializer import json_loads
+from wb_mqtt_topic_manager.snapshot import DevicesSnapshot
+from wb_mqtt_topic_manager.topics import parse_topic
+
+DEVICE_META_FILTER = '/devices/+/meta'
+CONTROL_META_FILTER = '/devices/+/+/meta'
+
+
+class DeviceRegistry:
+    """
+    Реестр устройств и контролов брокера.
+
+    Состав устройств и контролов определяется по retained meta топикам
+    и обновляется по мере прихода сообщений. ObserverDevice и ObserverControl
+    создаются только при обращении к ним и заполняются meta из реестра.
+
+    Устройство появляется с первым meta топиком (своим или контрола)
+    и исчезает, когда очищены meta устройства и всех его контролов.
+    Контрол появляется и исчезает вместе со своим meta.
+
+    Пример:
+        registry = DeviceRegistry(client)
+
+        @registry.on_control_appear
+        def on_control(device_id, control_id):
+            control = registry.control(device_id, control_id)
+
+        registry.start()
+    """
+
+    def __init__(self, client, snapshot: Optional[DevicesSnapshot] = None):
+        """
+        Инициализация реестра.
+
+        Args:
+            client: MQTT клиент
+            snapshot: Снимок из bootstrap для начального заполнения
+        """
+        self.client = client
+
+        self._lock = threading.RLock()
+        # meta устройств и контролов, по нему же заполняются ObserverDevice
+        self._state = DevicesSnapshot()
+        self._present: Dict[str, Dict[str, None]] = {}
+        self._by_driver: Dict[str, Dict[str, None]] = {}
+        self._drivers: Dict[str, str] = {}
+        self._objects: Dict[str, ObserverDevice] = {}
+        self._started = False
+
+        # Callbacks
+        self._device_appear_callbacks: List[Callable] = []
+        self._device_disappear_callbacks: List[Callable] = []
+        self._control_appear_callbacks: List[Callable] = []
+        self._control_disappear_callbacks: List[Callable] = []
+
+        if snapshot is not None:
+            for device_id in snapshot:
+                device = snapshot.device(device_id)
+                self._update(device_id, None, device.meta, emit=False)
+                for control_id, control in list(device.controls.items()):
+                    self._update(device_id, control_id, control.meta, emit=False)
+
+    def start(self):
+        """Подписка на meta топики всех устройств и контролов"""
+        if self._started:
+            return
+        self._started = True
+
+        with self.client.batch():
+            self.client.subscribe(
+                DEVICE_META_FILTER, self._on_meta, qos=QosType.QOS_ONE, raw=True
+            )
+            self.client.subscribe(
+                CONTROL_META_FILTER, self._on_meta, qos=QosType.QOS_ONE, raw=True
+            )
+
+    def stop(self):
+        """Отписка от meta топиков, созданные устройства продолжают работать"""
+        if not self._started:
+            return
+        self._started = False
+
+        with self.client.batch():
+            self.client.unsubscribe(DEVICE_META_FILTER, self._on_meta)
+            self.client.unsubscribe(CONTROL_META_FILTER, self._on_meta)
+
+    def _on_meta(self, topic, payload):
+        parsed = parse_topic(topic)
+        if parsed is None or parsed[2] != TopicKind.META:
+            return
+
+        device_id, control_id, _ = parsed
+        try:
+            meta = json_loads(payload.text) if payload else {}
+        except Exception:
+            return
+
+        self._update(device_id, control_id, meta)
+
+    def _update(
+        self,
+        device_id: str,
+        control_id: Optional[str],
+        meta: dict,
+        emit: bool = True,
+    ):
+        """Обновление состава по meta устройства или контрола"""
+        events = []
+
+        with self._lock:
+            controls = self._present.get(device_id)
+            if controls is None:
+                if not meta:
+                    return
+                controls = self._present[device_id] = {}
+                events.append((self._device_appear_callbacks, (device_id,)))
+
+            if meta or control_id is None:
+                self._state.set_meta(device_id, control_id, meta)
+
+            if control_id is not None:
+                if meta and control_id not in controls:
+                    controls[control_id] = None
+                    events.append(
+                        (self._control_appear_callbacks, (device_id, control_id))
+                    )
+                elif not meta and control_id in controls:
+                    del controls[control_id]
+                    self._state.remove(device_id, control_id)
+                    events.append(
+                        (self._control_disappear_callbacks, (device_id, control_id))
+                    )
+
+            device_meta = self._state.device(device_id).meta
+            if controls or device_meta:
+                self._index_driver(device_id, device_meta.get('driver'))
+            else:
+                del self._present[device_id]
+                self._state.remove(device_id)
+                self._index_driver(device_id, None)
+                events.append((self._device_disappear_callbacks, (device_id,)))
+
+        if emit:
+            for callbacks, args in events:
+                for callback_func in callbacks:
+                    try:  # noqa: SIM105
+                        self.client.run_callback(callback_func, *args)
+                    except Exception:
+                        pass
+
+    def _index_driver(self, device_id: str, driver: Optional[str]):
+        """Обновление индекса устройств по драйверу"""
+        previous = self._drivers.get(device_id)
+        if previous == driver:
+            return
+
+        if previous is not None:
+            devices = self._by_driver[previous]
+            devices.pop(device_id, None)
+            if not devices:
+                del self._by_driver[previous]
+            del self._drivers[device_id]
+
+        if driver is not None:
+            self._drivers[device_id] = driver
+            self._by_driver.setdefault(driver, {})[device_id] = None
+
+    def on_device_appear(self, callback):
+        """Декоратор для подписки на появление устройства (device_id)"""
+        self._device_appear_callbacks.append(callback)
+        return callback
+
+    def on_device_disappear(self, callback):
+        """Декоратор для подписки на исчезновение устройства (device_id)"""
+        self._device_disappear_callbacks.append(callback)
+        return callback
+
+    def on_control_appear(self, callback):
+        """Декоратор для подписки на появление контрола (device_id, control_id)"""
+        self._control_appear_callbacks.append(callback)
+        return callback
+
+    def on_control_disappear(self, callback):
+        """Декоратор для подписки на исчезновение контрола (device_id, control_id)"""
+        self._control_disappear_callbacks.append(callback)
+        return callback
+
+    def devices(self, driver: Optional[str] = None) -> List[str]:
+        """
+        Идентификаторы устройств.
+
+        Args:
+            driver: Только устройства указанного драйвера
+        """
+        with self._lock:
+            if driver is not None:
+                return list(self._by_driver.get(driver, ()))
+            return list(self._present)
+
+    def controls(
+        self,
+        device_id: Optional[str] = None,
+        control_type: Optional[str] = None,
+    ) -> List[Tuple[str, str]]:
+        """
+        Контролы устройств.
+
+        Args:
+            device_id: Только контролы указанного устройства
+            control_type: Только контролы указанного типа (ControlType.value)
+
+        Returns:
+            list: Пары (device_id, control_id)
+        """
+        with self._lock:
+            device_ids = [device_id] if device_id is not None else list(self._present)
+            result = []
+            for current_id in device_ids:
+                for control_id in self._present.get(current_id, ()):
+                    if control_type is not None:
+                        state = self._state.control(current_id, control_id)
+                        if state.meta.get('type') != control_type:
+                            continue
+                    result.append((current_id, control_id))
+            return result
+
+    def meta(self, device_id: str, control_id: Optional[str] = None) -> dict:
+        """meta устройства или контрола (пустой словарь, если неизвестны)"""
+        with self._lock:
+            if control_id is None:
+                state = self._state.device(device_id)
+            else:
+                state = self._state.control(device_id, control_id)
+            return dict(state.meta) if state is not None else {}
+
+    def device(self, device_id: str) -> ObserverDevice:
+        """
+        Устройство наблюдателя, создается при первом обращении.
+
+        Raises:
+            KeyError: Устройство неизвестно
+        """
+        with self._lock:
+            device = self._objects.get(device_id)
+            if device is not None:
+                return device
+            if device_id not in self._present:
+                raise KeyError(device_id)
+
+            device = ObserverDevice.create(self.client, device_id, snapshot=self._state)
+            self._objects[device_id] = device
+            return device
+
+    def control(self, device_id: str, control_id: str) -> ObserverControl:
+        """
+        Контрол наблюдателя, создается при первом обращении.
+
+        Raises:
+            KeyError: Устройство или контрол неизвестны
+        """
+        with self._lock:
+            device = self.device(device_id)
+            control = device.controls.get(control_id)
+            if control is not None:
+                return control
+            if control_id not in self._present.get(device_id, ()):
+                raise KeyError(control_id)
+
+            control = ControlManager.connect_control(device, control_id)
+            device.controls[control_id] = control
+            return control
+
+    def __getitem__(self, device_id: str) -> ObserverDevice:
+        return self.device(device_id)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._present
+
+    def __iter__(self):
+        return iter(self.devices())
+
+    def __len__(self) -> int:
+        return len(self._present)
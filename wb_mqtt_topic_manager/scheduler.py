@@ -0,0 +1,131 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class TimerHandle:
+    """Отложенная задача планировщика"""
+
+    __slots__ = ('when', 'func', 'args', 'cancelled')
+
+    def __init__(self, when: float, func: Callable, args: tuple):
+        self.when = when
+        self.func = func
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Отмена задачи"""
+        self.cancelled = True
+
+
+class Scheduler:
+    """
+    Общий таймер клиента.
+
+    Все отложенные задачи выполняются в одном потоке по очереди из кучи,
+    поэтому количество таймеров не влияет на количество потоков. Задачи
+    должны быть короткими и не блокировать поток.
+    """
+
+    def __init__(self, name: str = 'mqtt-scheduler'):
+        self.name = name
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        # Текущий поток, поток с другим значением завершается
+        self._thread: Optional[threading.Thread] = None
+
+    def call_later(self, delay: float, func: Callable, *args) -> TimerHandle:
+        """
+        Выполнение функции через заданное время.
+
+        Args:
+            delay: Задержка в секундах
+            func: Функция
+            *args: Аргументы функции
+
+        Returns:
+            TimerHandle: Задача, которую можно отменить
+        """
+        return self.call_at(time.monotonic() + delay, func, *args)
+
+    def call_at(self, when: float, func: Callable, *args) -> TimerHandle:
+        """
+        Выполнение функции в заданный момент времени (по time.monotonic).
+
+        Args:
+            when: Момент выполнения
+            func: Функция
+            *args: Аргументы функции
+
+        Returns:
+            TimerHandle: Задача, которую можно отменить
+        """
+        handle = TimerHandle(when, func, args)
+
+        with self._condition:
+            heapq.heappush(self._heap, (when, next(self._counter), handle))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+            elif self._heap[0][2] is handle:
+                # Новая задача раньше текущей ближайшей
+                self._condition.notify_all()
+
+        return handle
+
+    def stop(self):
+        """
+        Остановка потока, невыполненные задачи отменяются.
+
+        Поток запускается снова при планировании новой задачи.
+        """
+        with self._condition:
+            for _, _, handle in self._heap:
+                handle.cancel()
+            self._heap.clear()
+            thread, self._thread = self._thread, None
+            # Задача, запланированная во время остановки, запускает новый
+            # поток, старый завершается независимо от него
+            self._condition.notify_all()
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _run(self):
+        """Цикл потока планировщика"""
+        current = threading.current_thread()
+        while True:
+            with self._condition:
+                while True:
+                    if self._thread is not current:
+                        return
+
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+
+                    when, _, handle = self._heap[0]
+                    delay = when - time.monotonic()
+                    if delay > 0:
+                        self._condition.wait(delay)
+                        continue
+
+                    heapq.heappop(self._heap)
+                    break
+
+            if handle.cancelled:
+                continue
+
+            try:  # noqa: SIM105
+                handle.func(*handle.args)
+            except Exception:
+                pass
@@ -0,0 +1,28 @@
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязательная зависимость
+    orjson = None
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Сериализация в JSON.
+
+    Использует orjson, если он установлен, иначе стандартный json
+    в компактном формате.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Разбор JSON через orjson, если он установлен, иначе через json"""
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
@@ -0,0 +1,348 @@
+import time
+import weakref
+import zlib
+from contextlib import ExitStack, contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import QosType
+from wb_mqtt_topic_manager.delivery import PublishHandle
+from wb_mqtt_topic_manager.events import DEFAULT_KINDS, EventStream
+from wb_mqtt_topic_manager.metrics import MetricsRegistry
+from wb_mqtt_topic_manager.scheduler import Scheduler
+from wb_mqtt_topic_manager.topics import split_shared_filter
+
+WILDCARDS = ('+', '#')
+
+
+class ShardedMQTTClient:
+    """
+    Клиент из нескольких MQTT подключений.
+
+    Устройства распределяются по подключениям (шардам) по хешу device_id,
+    все топики одного устройства всегда идут через один шард, поэтому порядок
+    сообщений устройства сохраняется. Поверхность publish/subscribe совпадает
+    с MQTTClient, поэтому клиент можно передавать в DriverDevice и ObserverDevice.
+    """
+
+    def __init__(
+        self,
+        broker_host: str,
+        broker_port: str,
+        shards: int = 4,
+        client_id: Optional[str] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        **client_kwargs,
+    ):
+        """
+        Инициализация клиента.
+
+        Args:
+            broker_host: Хост брокера
+            broker_port: Порт брокера
+            shards: Количество подключений
+            client_id: Префикс идентификаторов клиентов, к нему добавляется
+                номер шарда (если None, генерируется автоматически)
+            metrics: Общий реестр метрик шардов (если None, создается собственный)
+            **client_kwargs: Параметры MQTTClient для каждого подключения
+                (профилировщик profiler общий для всех подключений)
+        """
+        if shards < 1:
+            raise ValueError('shards must be positive')
+
+        self.broker_host = broker_host
+        self.broker_port = broker_port
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.shards: List[MQTTClient] = [
+            MQTTClient(
+                broker_host=broker_host,
+                broker_port=broker_port,
+                client_id=f'{client_id}-{index}' if client_id else None,
+                metrics=self.metrics,
+                **client_kwargs,
+            )
+            for index in range(shards)
+        ]
+
+        self.profiler = client_kwargs.get('profiler')
+        self.legacy_topics = self.shards[0].legacy_topics
+
+        # Общий таймер для отложенных задач устройств
+        self.scheduler = Scheduler()
+        # Политики публикации контролов, таймеры которых останавливаются
+        # при отключении
+        self._policy_publishers = weakref.WeakSet()
+
+    @staticmethod
+    def device_id_from_topic(topic: str) -> Optional[str]:
+        """Идентификатор устройства из топика /devices/<device_id>/..."""
+        levels = topic.split('/', 3)
+        if len(levels) < 3 or levels[0] or levels[1] != 'devices':
+            return None
+        return levels[2]
+
+    def shard_for(self, device_id: str) -> MQTTClient:
+        """Подключение, за которым закреплено устройство"""
+        index = zlib.crc32(device_id.encode('utf-8')) % len(self.shards)
+        return self.shards[index]
+
+    def _shard_for_topic(self, topic: str) -> MQTTClient:
+        """
+        Подключение для топика.
+
+        Топики вне /devices/ и фильтры с wildcard-ом на уровне устройства
+        обслуживает первый шард, чтобы сообщение не пришло несколько раз.
+        """
+        _, topic = split_shared_filter(topic)
+        device_id = self.device_id_from_topic(topic)
+        if device_id is None or device_id in WILDCARDS:
+            return self.shards[0]
+        return self.shard_for(device_id)
+
+    @property
+    def is_connected(self) -> bool:
+        """Подключены ли все шарды"""
+        return all(shard.is_connected for shard in self.shards)
+
+    def connect(self) -> bool:
+        """
+        Подключение всех шардов к MQTT брокеру.
+
+        Returns:
+            bool: True если подключены все шарды
+        """
+        results = [shard.connect() for shard in self.shards]
+        self.resume_policies()
+        return all(results)
+
+    def disconnect(self):
+        """Отключение всех шардов от MQTT брокера"""
+        self.suspend_policies()
+        for shard in self.shards:
+            shard.disconnect()
+        self.scheduler.stop()
+
+    def reconnect(self, timeout: Optional[float] = None) -> bool:
+        """
+        Переподключение всех шардов к брокеру.
+
+        Returns:
+            bool: True если подключение восстановлено у всех шардов
+        """
+        results = [shard.reconnect(timeout) for shard in self.shards]
+        self.resume_policies()
+        return all(results)
+
+    def register_policy(self, publisher):
+        """Регистрация PolicyPublisher контрола (см. MQTTClient.register_policy)"""
+        self._policy_publishers.add(publisher)
+
+    def suspend_policies(self):
+        """Публикация отложенных политиками значений и остановка их таймеров"""
+        for publisher in list(self._policy_publishers):
+            publisher.suspend()
+
+    def resume_policies(self):
+        """Запуск таймеров политик публикации"""
+        for publisher in list(self._policy_publishers):
+            publisher.resume()
+
+    def __enter__(self):
+        """Поддержка открытия контекстного менеджера"""
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Поддержка закрытия контекстного менеджера"""
+        self.disconnect()
+
+    @staticmethod
+    def _merge_stats(stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Сложение счетчиков шардов, для max_* берется максимум, для avg_* среднее"""
+        result: Dict[str, Any] = {}
+        for shard_stats in stats:
+            for key, value in shard_stats.items():
+                if key.startswith('max_'):
+                    result[key] = max(result.get(key, value), value)
+                else:
+                    result[key] = result.get(key, 0) + value
+
+        for key in result:
+            if key.startswith('avg_'):
+                result[key] /= len(stats)
+
+        return result
+
+    @property
+    def dispatch_stats(self) -> Dict[str, int]:
+        """Суммарные счетчики пулов обработки callback-ов"""
+        return self._merge_stats([shard.dispatch_stats for shard in self.shards])
+
+    @property
+    def deferred_stats(self) -> Dict[str, int]:
+        """Суммарные счетчики фоновых публикаций всех шардов"""
+        return self._merge_stats([shard.deferred_stats for shard in self.shards])
+
+    @property
+    def delivery_stats(self) -> Dict[str, int]:
+        """Суммарные счетчики отслеживаемых публикаций"""
+        return self._merge_stats([shard.delivery_stats for shard in self.shards])
+
+    @property
+    def throttle_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Счетчики ограничения частоты по устройствам всех шардов.
+
+        Общее ограничение (global_rate_limit) действует в каждом шарде отдельно.
+        """
+        result = {}
+        for shard in self.shards:
+            result.update(shard.throttle_stats)
+        return result
+
+    @property
+    def coalesce_stats(self) -> Dict[str, int]:
+        """Суммарные счетчики схлопывания публикаций"""
+        return self._merge_stats([shard.coalesce_stats for shard in self.shards])
+
+    @property
+    def outbound_stats(self) -> Dict[str, Any]:
+        """Суммарные счетчики исходящих очередей"""
+        return self._merge_stats([shard.outbound_stats for shard in self.shards])
+
+    @property
+    def alias_stats(self) -> Dict[str, int]:
+        """Суммарные счетчики topic alias-ов всех шардов"""
+        return self._merge_stats([shard.alias_stats for shard in self.shards])
+
+    @property
+    def connection_info(self) -> Dict[str, Any]:
+        """Информация о подключении"""
+        return {
+            'broker_host': self.broker_host,
+            'broker_port': self.broker_port,
+            'connected': self.is_connected,
+            'shards': [shard.connection_info for shard in self.shards],
+        }
+
+    def publish(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int = QosType.QOS_ZERO,
+        retain: bool = False,
+        track: bool = False,
+    ) -> Union[bool, PublishHandle]:
+        """
+        Публикация сообщения через шард устройства.
+
+        Returns:
+            bool: True если публикация инициирована успешно
+            PublishHandle: Handle публикации, если track=True
+        """
+        return self._shard_for_topic(topic).publish(
+            topic, payload, qos=qos, retain=retain, track=track
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ожидание подтверждения всех публикаций во всех шардах.
+
+        Returns:
+            bool: True если все публикации подтверждены
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for shard in self.shards:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            if not shard.flush(remaining):
+                return False
+        return True
+
+    def publish_limited(
+        self,
+        device_id: str,
+        topic: str,
+        payload: Any,
+        qos: int = QosType.QOS_ZERO,
+        retain: bool = False,
+    ) -> Any:
+        """Публикация устройства с учетом ограничения частоты его шарда"""
+        return self.shard_for(device_id).publish_limited(
+            device_id, topic, payload, qos=qos, retain=retain
+        )
+
+    def set_rate_limit(
+        self, device_id: str, rate: Optional[float], burst: Optional[float] = None
+    ):
+        """Ограничение частоты публикаций устройства в его шарде"""
+        self.shard_for(device_id).set_rate_limit(device_id, rate, burst)
+
+    def publish_deferred(
+        self,
+        topic: str,
+        payload: Any,
+        qos: int = QosType.QOS_ZERO,
+        retain: bool = False,
+    ):
+        """Фоновая публикация через шард устройства"""
+        self._shard_for_topic(topic).publish_deferred(
+            topic, payload, qos=qos, retain=retain
+        )
+
+    def subscribe(
+        self,
+        topic: str,
+        callback: Callable[[str, Any], None] = None,
+        qos: int = QosType.QOS_ZERO,
+        raw: bool = False,
+        share_group: Optional[str] = None,
+    ):
+        """Подписка на топик через шард устройства"""
+        self._shard_for_topic(topic).subscribe(
+            topic, callback, qos=qos, raw=raw, share_group=share_group
+        )
+
+    def unsubscribe(
+        self,
+        topic: str,
+        callback: Callable = None,
+        share_group: Optional[str] = None,
+    ):
+        """Отписка от топика через шард устройства"""
+        self._shard_for_topic(topic).unsubscribe(topic, callback, share_group)
+
+    def is_subscribed(self, topic: str, share_group: Optional[str] = None) -> bool:
+        """Подтверждена ли подписка шардом топика"""
+        return self._shard_for_topic(topic).is_subscribed(topic, share_group)
+
+    def wait_subscribed(
+        self,
+        topic: str,
+        timeout: Optional[float] = None,
+        share_group: Optional[str] = None,
+    ) -> bool:
+        """Ожидание SUBACK подписки в шарде топика"""
+        return self._shard_for_topic(topic).wait_subscribed(topic, timeout, share_group)
+
+    def events(
+        self,
+        device_id: Optional[str] = None,
+        kinds: Tuple[str, ...] = DEFAULT_KINDS,
+        maxsize: int = 10000,
+    ) -> EventStream:
+        """Поток изменений устройств через шард устройства или первый шард"""
+        return EventStream(self, device_id=device_id, kinds=kinds, maxsize=maxsize)
+
+    @contextmanager
+    def batch(self) -> Iterator['ShardedMQTTClient']:
+        """Пакетная подписка и отписка во всех шардах"""
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.batch())
+            yield self
+
+    def run_callback(self, callback: Callable, *args) -> Any:
+        """Вызов пользовательского callback-а устройства или контрола"""
+        return self.shards[0].run_callback(callback, *args)
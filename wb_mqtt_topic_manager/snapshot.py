@@ -0,0 +1,275 @@
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+from wb_mqtt_topic_manager.constance import QosType, TopicKind
+from wb_mqtt_topic_manager.payload import Payload
+from wb_mqtt_topic_manager.serializer import json_loads
+from wb_mqtt_topic_manager.topics import parse_topic
+
+logger = logging.getLogger(__name__)
+
+DEVICES_FILTER = '/devices/#'
+
+_NO_SUBACK = (
+    f'Subscription to {DEVICES_FILTER} was not acknowledged '
+    '(client is not connected or bootstrap is called inside client.batch())'
+)
+
+
+@dataclass
+class ControlSnapshot:
+    """Состояние контрола из retained сообщений"""
+
+    meta: dict = field(default_factory=dict)
+    meta_error: str = ''
+    value: Optional[str] = None
+
+
+@dataclass
+class DeviceSnapshot:
+    """Состояние устройства из retained сообщений"""
+
+    meta: dict = field(default_factory=dict)
+    meta_error: str = ''
+    controls: Dict[str, ControlSnapshot] = field(default_factory=dict)
+
+
+class DevicesSnapshot:
+    """Снимок дерева /devices/ брокера"""
+
+    def __init__(self):
+        self.devices: Dict[str, DeviceSnapshot] = {}
+        self._lock = threading.Lock()
+
+        # Счетчики
+        self.messages = 0
+        self.last_update = 0.0
+
+    def apply(self, topic: str, payload: Any):
+        """
+        Учет сообщения дерева /devices/.
+
+        Args:
+            topic: MQTT топик
+            payload: Payload, строка или bytes
+        """
+        parsed = parse_topic(topic)
+        if parsed is None:
+            return
+
+        device_id, control_id, kind = parsed
+        if kind == TopicKind.ON:
+            return
+
+        try:
+            text = payload.text if isinstance(payload, Payload) else payload
+            if isinstance(text, bytes):
+                text = text.decode('utf-8')
+            meta = json_loads(text) if kind == TopicKind.META and text else {}
+        except Exception:
+            return
+
+        with self._lock:
+            self.messages += 1
+            self.last_update = time.monotonic()
+
+            target = self._target(device_id, control_id)
+            if kind == TopicKind.META:
+                target.meta = meta
+            elif kind == TopicKind.META_ERROR:
+                target.meta_error = text
+            else:
+                target.value = text
+
+    def _target(self, device_id: str, control_id: Optional[str]):
+        """Состояние устройства или контрола, создается при отсутствии"""
+        device = self.devices.get(device_id)
+        if device is None:
+            device = self.devices[device_id] = DeviceSnapshot()
+        if control_id is None:
+            return device
+
+        control = device.controls.get(control_id)
+        if control is None:
+            control = device.controls[control_id] = ControlSnapshot()
+        return control
+
+    def set_meta(self, device_id: str, control_id: Optional[str], meta: dict):
+        """Установка meta устройства или контрола"""
+        with self._lock:
+            self._target(device_id, control_id).meta = meta
+
+    def remove(self, device_id: str, control_id: Optional[str] = None):
+        """Удаление устройства или контрола из снимка"""
+        with self._lock:
+            if control_id is None:
+                self.devices.pop(device_id, None)
+                return
+
+            device = self.devices.get(device_id)
+            if device is not None:
+                device.controls.pop(control_id, None)
+
+    def discard(self, topic: str):
+        """Сброс состояния топика, retained сообщение которого удалено"""
+        parsed = parse_topic(topic)
+        if parsed is None:
+            return
+
+        device_id, control_id, kind = parsed
+        if kind == TopicKind.META:
+            self.remove(device_id, control_id)
+            return
+
+        with self._lock:
+            device = self.devices.get(device_id)
+            if device is None:
+                return
+            target = device if control_id is None else device.controls.get(control_id)
+            if target is None:
+                return
+            if kind == TopicKind.META_ERROR:
+                target.meta_error = ''
+            elif kind == TopicKind.VALUE:
+                target.value = None
+
+    def device(self, device_id: str) -> Optional[DeviceSnapshot]:
+        """Состояние устройства или None"""
+        return self.devices.get(device_id)
+
+    def control(self, device_id: str, control_id: str) -> Optional[ControlSnapshot]:
+        """Состояние контрола или None"""
+        device = self.devices.get(device_id)
+        if device is None:
+            return None
+        return device.controls.get(control_id)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self.devices
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.devices))
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+
+def _check_received(snapshot: DevicesSnapshot):
+    """Предупреждение о пустом снимке после подтвержденной подписки"""
+    if not snapshot.messages:
+        logger.warning('No retained messages received for %s', DEVICES_FILTER)
+
+
+def _subscribe(client, snapshot: DevicesSnapshot, changed: threading.Event):
+    def on_message(topic, payload):
+        snapshot.apply(topic, payload)
+        changed.set()
+
+    client.subscribe(DEVICES_FILTER, on_message, qos=QosType.QOS_ONE, raw=True)
+    return on_message
+
+
+def wait_settled(changed: threading.Event, settle_time: float, timeout: float):
+    """
+    Ожидание паузы в потоке сообщений.
+
+    Args:
+        changed: Событие, устанавливаемое при каждом сообщении
+        settle_time: Пауза без сообщений в секундах
+        timeout: Максимальное время ожидания в секундах
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        changed.clear()
+        if not changed.wait(min(settle_time, remaining)):
+            return
+
+
+async def wait_settled_async(
+    changed: threading.Event, settle_time: float, timeout: float
+):
+    """Вариант wait_settled, не блокирующий событийный цикл"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        changed.clear()
+        await asyncio.sleep(min(settle_time, deadline - loop.time()))
+        if not changed.is_set():
+            return
+
+
+def bootstrap(
+    client,
+    settle_time: float = 0.5,
+    timeout: float = 10,
+) -> DevicesSnapshot:
+    """
+    Получение снимка всех устройств одной подпиской /devices/#.
+
+    Сначала ожидается подтверждение подписки брокером (SUBACK), при
+    необходимости вместе с подключением клиента. Затем ожидание завершается,
+    когда retained сообщения перестают приходить в течение settle_time,
+    но общее время не превышает timeout. Снимок передается
+    в ObserverDevice.create, и устройства и контролы создаются уже
+    заполненными.
+
+    Args:
+        client: MQTT клиент
+        settle_time: Пауза без сообщений, после которой поток retained
+            сообщений считается завершенным, в секундах
+        timeout: Максимальное время ожидания в секундах
+
+    Returns:
+        DevicesSnapshot: Снимок устройств
+
+    Raises:
+        TimeoutError: Подписка не подтверждена за timeout (клиент не
+            подключен или bootstrap вызван внутри client.batch())
+    """
+    deadline = time.monotonic() + timeout
+    snapshot = DevicesSnapshot()
+    changed = threading.Event()
+    callback = _subscribe(client, snapshot, changed)
+
+    try:
+        # Окно settle_time начинается после SUBACK или первого сообщения
+        subscribed = client.wait_subscribed(DEVICES_FILTER, timeout)
+        if not subscribed and not changed.is_set():
+            raise TimeoutError(_NO_SUBACK)
+        wait_settled(changed, settle_time, deadline - time.monotonic())
+    finally:
+        client.unsubscribe(DEVICES_FILTER, callback)
+
+    _check_received(snapshot)
+    return snapshot
+
+
+async def bootstrap_async(
+    client,
+    settle_time: float = 0.5,
+    timeout: float = 10,
+) -> DevicesSnapshot:
+    """Вариант bootstrap для AsyncMQTTClient, не блокирующий событийный цикл"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    snapshot = DevicesSnapshot()
+    changed = threading.Event()
+    callback = _subscribe(client, snapshot, changed)
+
+    try:
+        subscribed = await client.wait_subscribed(DEVICES_FILTER, timeout)
+        if not subscribed and not changed.is_set():
+            raise TimeoutError(_NO_SUBACK)
+        await wait_settled_async(changed, settle_time, deadline - loop.time())
+    finally:
+        client.unsubscribe(DEVICES_FILTER, callback)
+
+    _check_received(snapshot)
+    return snapshot
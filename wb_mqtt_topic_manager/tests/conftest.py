@@ -1,7 +1,46 @@
+from types import SimpleNamespace
+
 import pytest
 
 from wb_mqtt_topic_manager.client import MQTTClient
 from wb_mqtt_topic_manager.device import DriverDevice, ObserverDevice
+from wb_mqtt_topic_manager.scheduler import TimerHandle
+
+
+class FakeScheduler:
+    """Планировщик, задачи которого выполняются вручную"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.tasks = []
+
+    def call_later(self, delay, func, *args):
+        return self.call_at(self.clock[0] + delay, func, *args)
+
+    def call_at(self, when, func, *args):
+        handle = TimerHandle(when, func, args)
+        self.tasks.append(handle)
+        return handle
+
+    def run_until(self, now):
+        """Выполнение задач по порядку с переводом часов до now"""
+        while any(task.when <= now for task in self.tasks):
+            task = min(self.tasks, key=lambda task: task.when)
+            self.tasks.remove(task)
+            self.clock[0] = task.when
+            if not task.cancelled:
+                task.func(*task.args)
+        self.clock[0] = now
+
+
+class FakeMessageInfo:
+    """Заглушка MQTTMessageInfo"""
+
+    def __init__(self, mid):
+        self.mid = mid
+
+    def is_published(self):
+        return False
 
 
 @pytest.fixture
@@ -35,3 +74,28 @@ def test_observer_device(test_client):
         client=test_client, device_id='driver_device'
     )
     yield observer_device
+
+
+@pytest.fixture
+def fake_scheduler(clock):
+    """Планировщик с ручным выполнением задач, clock задается в модуле теста"""
+    return FakeScheduler(clock)
+
+
+@pytest.fixture
+def message_info():
+    """Фабрика заглушек MQTTMessageInfo"""
+    return FakeMessageInfo
+
+
+@pytest.fixture
+def inject_message():
+    """Функция передачи клиенту входящего сообщения, как из сетевого потока paho"""
+
+    def inject(client, topic, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        message = SimpleNamespace(topic=topic, payload=payload)
+        client._on_message(client.client, None, message)
+
+    return inject
@@ -0,0 +1,28 @@
+from wb_mqtt_topic_manager.aliases import TopicAliases
+
+
+def test_topic_aliases():
+    aliases = TopicAliases(min_uses=2)
+    topic = '/devices/dev/ctl'
+
+    # До CONNACK alias-ы не назначаются
+    assert aliases.resolve(topic) == (topic, None)
+
+    aliases.reset(maximum=1)
+    assert aliases.resolve(topic) == (topic, None)
+    # Топик передается с alias-ом до подтверждения первой публикации
+    assert aliases.resolve(topic) == (topic, 1)
+    aliases.on_sent(10, topic)
+    assert aliases.resolve(topic) == (topic, 1)
+    aliases.on_published(10)
+    assert aliases.resolve(topic) == ('', 1)
+
+    # Alias-ы исчерпаны, meta топики alias-ов не получают
+    other = '/devices/dev/other'
+    assert aliases.resolve(other) == (other, None)
+    assert aliases.resolve(other) == (other, None)
+    assert aliases.resolve('/devices/dev/ctl/meta') == ('/devices/dev/ctl/meta', None)
+
+    aliases.on_sent(11, topic)
+    assert aliases.reset(maximum=5) == {11: topic}
+    assert aliases.resolve(topic) == (topic, None)
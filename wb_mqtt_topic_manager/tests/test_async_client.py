@@ -0,0 +1,199 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from wb_mqtt_topic_manager.async_client import AsyncMQTTClient
+
+
+@pytest.fixture
+async def offline_async_client():
+    """Асинхронный клиент без подключения к брокеру"""
+    client = AsyncMQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, client_id='test_client'
+    )
+    client._loop = asyncio.get_running_loop()
+    client._loop_thread_id = threading.get_ident()
+    yield client
+
+
+async def test_publish_without_connection(offline_async_client):
+    assert not await offline_async_client.publish('/devices/test/value', '1')
+
+
+async def test_coroutine_callbacks(offline_async_client):
+    received = []
+
+    async def callback(topic, payload):
+        await asyncio.sleep(0)
+        received.append((topic, payload))
+
+    offline_async_client._invoke(callback, '/devices/test/value', '1')
+    await asyncio.sleep(0.01)
+
+    assert received == [('/devices/test/value', '1')]
+
+
+async def test_message_stream(offline_async_client):
+    stream = offline_async_client.messages('/devices/+/+', maxsize=2)
+
+    for value in range(3):
+        stream._on_message('/devices/test/value', str(value))
+    stream.close()
+
+    assert [payload async for _, payload in stream] == ['1', '2']
+    assert stream.dropped == 1
+
+
+async def test_reconnect_without_attempts_limit(monkeypatch):
+    client = AsyncMQTTClient(broker_host='localhost', broker_port=1883)
+    client.reconnect_delay = 0.001
+    assert client.max_reconnect_attempts is None
+
+    attempts = []
+
+    async def connect():
+        attempts.append(1)
+        client.is_connected = len(attempts) == 3
+        return client.is_connected
+
+    monkeypatch.setattr(client, 'connect', connect)
+    assert await client.reconnect(timeout=5)
+    assert len(attempts) == 3
+
+    # Потеря соединения запускает фоновое переподключение
+    attempts.clear()
+    client._on_disconnect(client.client, None, None, None, None)
+    await asyncio.wait_for(client._reconnect_task, 5)
+    assert client.is_connected and len(attempts) == 3
+
+    # Отключение по запросу пользователя не переподключает
+    client.is_connected = False
+    await client.disconnect()
+    client._on_disconnect(client.client, None, None, None, None)
+    assert client._reconnect_task is None
+
+
+async def test_tracked_publish_survives_connection_loss(monkeypatch):
+    client = AsyncMQTTClient(broker_host='localhost', broker_port=1883)
+    client._bind_loop()
+    client.is_connected = True
+    monkeypatch.setattr(client, '_start_reconnect', lambda: None)
+
+    info = SimpleNamespace(mid=1, rc=0, is_published=lambda: False)
+    monkeypatch.setattr(client.client, 'publish', lambda *args, **kwargs: info)
+    future = client.publish('/devices/dev/temp', '1', qos=1)
+
+    # Сообщение остается в очереди paho и будет повторено после переподключения
+    client._on_disconnect(client.client, None, None, None, None)
+    await asyncio.sleep(0.01)
+    assert not future.done()
+
+    client._on_publish(client.client, None, 1, SimpleNamespace(is_failure=False), None)
+    assert await asyncio.wait_for(future, 1)
+
+    # Отключение во время переподключения завершает неподтвержденные публикации
+    client.is_connected = True
+    future = client.publish('/devices/dev/temp', '2', qos=1)
+    client._on_disconnect(client.client, None, None, None, None)
+    await client.disconnect()
+    assert await asyncio.wait_for(future, 1) is False
+
+
+async def test_connection_loss_resets_suback(monkeypatch):
+    client = AsyncMQTTClient(broker_host='localhost', broker_port=1883)
+    client._bind_loop()
+    client.is_connected = True
+    monkeypatch.setattr(client, '_start_reconnect', lambda: None)
+    monkeypatch.setattr(client.client, 'subscribe', lambda topic, qos=0: (0, 1))
+
+    client.subscribe('/devices/#')
+    ok = SimpleNamespace(is_failure=False)
+    client._on_subscribe(client.client, None, 1, [ok], None)
+    assert await client.wait_subscribed('/devices/#', timeout=0)
+
+    client._on_disconnect(client.client, None, None, None, None)
+    assert client._disconnect_event.is_set()
+    assert not client.is_subscribed('/devices/#')
+    assert not await client.wait_subscribed('/devices/#', timeout=0.02)
+
+
+async def test_publish_outside_event_loop(monkeypatch):
+    client = AsyncMQTTClient(broker_host='localhost', broker_port=1883)
+    client.is_connected = True
+    sent = []
+
+    def publish(topic, payload, qos=0, retain=False):
+        sent.append(payload)
+        return SimpleNamespace(mid=len(sent), rc=0, is_published=lambda: True)
+
+    monkeypatch.setattr(client.client, 'publish', publish)
+
+    # До привязки к циклу и из потока планировщика публикация идет как в MQTTClient
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(client.publish('/devices/dev/temp', '1'))
+    )
+    thread.start()
+    thread.join()
+    assert results == [True] and sent == ['1']
+
+    client._bind_loop()
+    results.clear()
+    thread = threading.Thread(
+        target=lambda: results.append(client.publish('/devices/dev/temp', '2'))
+    )
+    thread.start()
+    thread.join()
+    assert results == [True]
+    assert await client.publish('/devices/dev/temp', '3')
+
+
+async def test_reconnect_attempts_exhausted(monkeypatch):
+    client = AsyncMQTTClient(broker_host='localhost', broker_port=1883)
+    client.reconnect_delay = 0.001
+    client.max_reconnect_attempts = 2
+
+    async def connect():
+        return False
+
+    monkeypatch.setattr(client, 'connect', connect)
+    assert not await client.reconnect(timeout=5)
+
+
+async def test_publish_uses_coalescer_and_outbound_queue(monkeypatch):
+    client = AsyncMQTTClient(
+        broker_host='localhost',
+        broker_port=1883,
+        coalesce_interval=0.01,
+        outbound_queue_size=10,
+    )
+    client._bind_loop()
+    client.is_connected = True
+    client._outbound.start()
+
+    sent = []
+
+    def publish(topic, payload, qos=0, retain=False):
+        sent.append(payload)
+        return SimpleNamespace(mid=len(sent), rc=0, is_published=lambda: False)
+
+    monkeypatch.setattr(client.client, 'publish', publish)
+
+    # Значения retained топика схлопываются, future-ы завершаются вместе
+    futures = [
+        client.publish('/devices/dev/ctl', str(value), qos=1, retain=True)
+        for value in range(3)
+    ]
+    for _ in range(100):
+        if sent:
+            break
+        await asyncio.sleep(0.01)
+    assert sent == ['2']
+    assert client.outbound_stats['sent'] == 1
+
+    client._on_publish(client.client, None, 1, SimpleNamespace(is_failure=False), None)
+    assert await asyncio.wait_for(asyncio.gather(*futures), 1) == [True] * 3
+    assert await client.flush(timeout=0)
+    client._outbound.stop()
@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from wb_mqtt_topic_manager.cache import WarmStartCache
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import ObserverDevice
+
+
+def test_cache_warm_start(tmp_path, inject_message):
+    path = tmp_path / 'devices.cache'
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+
+    cache = WarmStartCache(path)
+    assert not len(cache)
+    cache.attach(client)
+    inject_message(client, '/devices/dev/meta', b'{"driver": "test"}')
+    inject_message(client, '/devices/dev/level/meta', b'{"type": "range"}')
+    inject_message(client, '/devices/dev/level', b'41')
+    inject_message(client, '/devices/dev/level', b'42')
+    inject_message(client, '/devices/dev/level/on', b'10')
+    inject_message(client, '/devices/dev/level/meta/error', b'r')
+    inject_message(client, '/devices/dev/level/meta/error', b'')
+    cache.close()
+
+    # Оборванная запись после аварийного завершения пропускается
+    with open(path, 'ab') as file:
+        file.write(b'["/devices/dev/level", "4')
+
+    cache = WarmStartCache(path)
+    assert len(cache) == 3
+
+    # Наблюдатель заполнен до прихода retained сообщений
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    device = ObserverDevice.create(client, 'dev', snapshot=cache.snapshot)
+    control = ControlManager.connect_control(device, 'level')
+    assert device.meta == {'driver': 'test'}
+    assert control.value == 42 and control.meta_error == ''
+
+
+def test_cache_reconcile(tmp_path, inject_message):
+    path = tmp_path / 'devices.cache'
+    with open(path, 'wb') as file:
+        for device_id in ('alive', 'removed'):
+            file.write(b'["/devices/%s/meta", "{}"]\n' % device_id.encode())
+            file.write(b'["/devices/%s/temp", "20"]\n' % device_id.encode())
+
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    cache = WarmStartCache(path)
+    cache.attach(client)
+
+    # Без подтверждения подписки кеш не сбрасывается
+    inject_message(client, '/devices/alive/meta', b'{}')
+    assert cache.reconcile(settle_time=0.01, timeout=0.05) == []
+    assert len(cache) == 4
+
+    client.is_connected = True
+    client.client.subscribe = lambda topics, qos=0: (0, 1)
+    client._resubscribe()
+    ok = SimpleNamespace(is_failure=False)
+    client._on_subscribe(client.client, None, 1, [ok], None)
+
+    inject_message(client, '/devices/alive/temp', b'21')
+    stale = cache.reconcile(settle_time=0.01, timeout=1)
+
+    assert sorted(stale) == ['/devices/removed/meta', '/devices/removed/temp']
+    assert set(cache.snapshot) == {'alive'}
+    assert cache.snapshot.control('alive', 'temp').value == '21'
+    cache.close()
+
+    assert len(WarmStartCache(path)) == 2
+
+
+def test_cache_compaction(tmp_path, inject_message):
+    path = tmp_path / 'devices.cache'
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    cache = WarmStartCache(path, compact_ratio=2)
+    cache.attach(client)
+
+    for value in range(200):
+        inject_message(client, '/devices/dev/temp', str(value).encode())
+        # Совпадающее значение не записывается
+        inject_message(client, '/devices/dev/temp', str(value).encode())
+    cache.flush()
+
+    with open(path, 'rb') as file:
+        assert file.read() == b'["/devices/dev/temp","199"]\n'
+
+
+def test_cache_io_outside_lock(tmp_path, monkeypatch, inject_message):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    cache = WarmStartCache(tmp_path / 'devices.cache')
+    cache.attach(client)
+    inject_message(client, '/devices/dev/temp', b'20')
+
+    writing = threading.Event()
+    release = threading.Event()
+
+    def fsync(fd):
+        writing.set()
+        release.wait(5)
+
+    monkeypatch.setattr(os, 'fsync', fsync)
+    thread = threading.Thread(target=cache.compact)
+    thread.start()
+    assert writing.wait(5)
+
+    # Сетевой поток не ждет записи файла
+    started = time.monotonic()
+    inject_message(client, '/devices/dev/temp', b'21')
+    assert time.monotonic() - started < 1
+    release.set()
+    thread.join()
+
+    cache.close()
+    assert (
+        WarmStartCache(tmp_path / 'devices.cache').snapshot.control('dev', 'temp').value
+        == '21'
+    )
@@ -1,6 +1,11 @@
+from types import SimpleNamespace
+
 import pytest
+from paho.mqtt.client import MQTTv5
 
-from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.client import MQTTClient, TopicTrie
+from wb_mqtt_topic_manager.outbound import OutboundMessage
+from wb_mqtt_topic_manager.payload import Payload
 
 
 @pytest.mark.skip
@@ -46,3 +51,318 @@ def test_client_from_fixture(test_client: MQTTClient):
         'connected': True,
         'client_id': 'test_client',
     }
+
+
+def _callbacks(trie, topic):
+    return [callback for callback, _ in trie.match(topic)]
+
+
+def test_topic_trie_match():
+    trie = TopicTrie()
+
+    def exact(topic, payload):
+        pass
+
+    def single(topic, payload):
+        pass
+
+    def multi(topic, payload):
+        pass
+
+    trie.add('/devices/driver_device/test_control', exact)
+    trie.add('/devices/+/+', single)
+    trie.add('/devices/driver_device/#', multi)
+
+    assert set(_callbacks(trie, '/devices/driver_device/test_control')) == {
+        exact,
+        single,
+        multi,
+    }
+    assert _callbacks(trie, '/devices/other_device/test_control') == [single]
+    assert _callbacks(trie, '/devices/driver_device') == [multi]
+    assert _callbacks(trie, '/devices/driver_device/test_control/meta') == [multi]
+    assert _callbacks(trie, '/other/driver_device/test_control') == []
+
+
+def test_topic_trie_system_topics():
+    trie = TopicTrie()
+
+    def callback(topic, payload):
+        pass
+
+    trie.add('#', callback)
+    trie.add('+/broker/uptime', callback)
+
+    assert _callbacks(trie, '$SYS/broker/uptime') == []
+    assert _callbacks(trie, '/devices/driver_device') == [callback]
+
+
+def test_topic_trie_remove():
+    trie = TopicTrie()
+
+    def first(topic, payload):
+        pass
+
+    def second(topic, payload):
+        pass
+
+    trie.add('/devices/+/meta', first)
+    trie.add('/devices/+/meta', second)
+
+    assert not trie.remove('/devices/+/meta', first)
+    assert _callbacks(trie, '/devices/driver_device/meta') == [second]
+    assert not trie.remove('/devices/+/meta', first)
+
+    assert trie.remove('/devices/+/meta', second)
+    assert '/devices/+/meta' not in trie
+    assert _callbacks(trie, '/devices/driver_device/meta') == []
+    assert not trie._root.children
+
+    # Записи с разными ключами на одном фильтре удаляются независимо
+    trie.add('/devices/+/meta', first)
+    trie.add('/devices/+/meta', second, key='$share/group//devices/+/meta')
+    assert trie.remove('/devices/+/meta')
+    assert _callbacks(trie, '/devices/driver_device/meta') == [second]
+    assert trie.remove('$share/group//devices/+/meta', second)
+    assert not trie._root.children
+
+
+def _subscribe_recorder(packets):
+    """Заглушка paho subscribe, возвращает (rc, mid) как paho"""
+
+    def subscribe(topic, qos=0):
+        packets.append(topic)
+        return 0, len(packets)
+
+    return subscribe
+
+
+def test_resubscribe_in_bulk(monkeypatch):
+    client = MQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, client_id='test_client'
+    )
+    client.subscribe_batch_size = 2
+
+    packets = []
+    monkeypatch.setattr(client.client, 'subscribe', _subscribe_recorder(packets))
+
+    # Подписки без подключения сохраняются и отправляются при подключении
+    client.subscribe('/devices/+/meta', qos=1)
+    client.subscribe('/devices/+/+')
+    client.subscribe('/devices/+/+/meta/error', qos=1)
+    assert not packets
+
+    client._resubscribe()
+
+    assert packets == [
+        [('/devices/+/meta', 1), ('/devices/+/+', 0)],
+        [('/devices/+/+/meta/error', 1)],
+    ]
+
+
+def test_reconnect_backoff():
+    client = MQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, client_id='test_client'
+    )
+    client.reconnect_delay = 1
+    client.reconnect_max_delay = 8
+
+    for attempt, limit in enumerate([1, 2, 4, 8, 8]):
+        delay = client._reconnect_backoff(attempt)
+        assert limit / 2 <= delay <= limit
+
+
+def test_raw_payload_delivery():
+    client = MQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, client_id='test_client'
+    )
+
+    received = []
+    client.subscribe('/devices/+/+', lambda topic, payload: received.append(payload))
+    client.subscribe(
+        '/devices/test/range',
+        lambda topic, payload: received.append(payload),
+        raw=True,
+    )
+
+    client._on_message(
+        client.client, None, SimpleNamespace(topic='/devices/test/range', payload=b'42')
+    )
+
+    text, raw = sorted(received, key=lambda value: isinstance(value, Payload))
+    assert text == '42'
+    assert isinstance(raw, Payload)
+    assert int(raw) == 42 and raw == '42' and raw.view.tobytes() == b'42'
+
+    # Сообщения без подписчиков не декодируются
+    client._on_message(
+        client.client, None, SimpleNamespace(topic='/other/topic', payload=b'\xff')
+    )
+    assert len(received) == 2
+
+
+def test_batch_subscribe(monkeypatch):
+    client = MQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, client_id='test_client'
+    )
+    client.is_connected = True
+
+    subscribe_packets = []
+    unsubscribe_packets = []
+    monkeypatch.setattr(
+        client.client, 'subscribe', _subscribe_recorder(subscribe_packets)
+    )
+    monkeypatch.setattr(client.client, 'unsubscribe', unsubscribe_packets.append)
+
+    def callback(topic, payload):
+        pass
+
+    client.subscribe('/devices/old/meta', callback)
+
+    with client.batch():
+        client.subscribe('/devices/test/meta', callback, qos=1)
+        with client.batch():
+            client.subscribe('/devices/test/meta/error', callback, qos=1)
+            client.subscribe('/devices/test/temporary', callback)
+        client.unsubscribe('/devices/test/temporary')
+        client.unsubscribe('/devices/old/meta')
+
+        assert subscribe_packets == ['/devices/old/meta']
+        assert '/devices/test/meta' in client._message_callbacks
+
+    assert unsubscribe_packets == [['/devices/old/meta']]
+    assert subscribe_packets[1:] == [
+        [('/devices/test/meta', 1), ('/devices/test/meta/error', 1)]
+    ]
+
+
+def test_shared_subscription(monkeypatch):
+    client = MQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, client_id='test_client'
+    )
+    client.is_connected = True
+
+    subscribe_packets = []
+    unsubscribe_packets = []
+    monkeypatch.setattr(
+        client.client, 'subscribe', _subscribe_recorder(subscribe_packets)
+    )
+    monkeypatch.setattr(client.client, 'unsubscribe', unsubscribe_packets.append)
+
+    received = []
+    client.subscribe(
+        '/devices/+/ctl/on',
+        lambda topic, payload: received.append(topic),
+        share_group='drivers',
+    )
+    client._on_message(
+        client.client,
+        None,
+        SimpleNamespace(topic='/devices/dev/ctl/on', payload=b'1'),
+    )
+
+    assert subscribe_packets == ['$share/drivers//devices/+/ctl/on']
+    assert received == ['/devices/dev/ctl/on']
+
+    client.unsubscribe('$share/drivers//devices/+/ctl/on')
+    assert unsubscribe_packets == ['$share/drivers//devices/+/ctl/on']
+    assert not client._subscriptions
+
+    with pytest.raises(ValueError):
+        client.subscribe('/devices/+/ctl/on', share_group='a/b')
+
+
+def test_shared_and_plain_subscription(monkeypatch):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    client.is_connected = True
+
+    subscribe_packets = []
+    unsubscribe_packets = []
+    monkeypatch.setattr(
+        client.client, 'subscribe', _subscribe_recorder(subscribe_packets)
+    )
+    monkeypatch.setattr(client.client, 'unsubscribe', unsubscribe_packets.append)
+
+    plain = []
+    shared = []
+    topic = '/devices/+/ctl/on'
+    client.subscribe(topic, lambda topic, payload: plain.append(payload))
+    client.subscribe(
+        topic, lambda topic, payload: shared.append(payload), share_group='drivers'
+    )
+    assert subscribe_packets == [topic, '$share/drivers//devices/+/ctl/on']
+
+    # Отписка от общей подписки не затрагивает обычную
+    client.unsubscribe(topic, share_group='drivers')
+    assert unsubscribe_packets == ['$share/drivers//devices/+/ctl/on']
+    assert list(client._subscriptions) == [topic]
+
+    message = SimpleNamespace(topic='/devices/dev/ctl/on', payload=b'1')
+    client._on_message(client.client, None, message)
+    assert plain == ['1'] and shared == []
+
+    client.unsubscribe(topic)
+    assert unsubscribe_packets[-1] == topic
+    assert not client._subscriptions and not len(client._message_callbacks)
+
+
+def test_flush_waits_for_acks():
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    assert client.flush(timeout=0)
+
+    client.is_connected = True
+    client._publish_started[1] = (0.0, 'value')
+    client._publish_started[2] = (0.0, 'value')
+    assert not client.flush(timeout=0.05)
+
+    # Без подключения ожидание без таймаута не зависает
+    client.is_connected = False
+    assert not client.flush()
+    client.is_connected = True
+
+    reason_code = SimpleNamespace(is_failure=False)
+    client._on_publish(client.client, None, 1, reason_code, None)
+    client._on_publish(client.client, None, 2, reason_code, None)
+    assert client.flush(timeout=0)
+
+
+def test_flush_waits_for_outbound_queue():
+    client = MQTTClient(
+        broker_host='localhost', broker_port=1883, outbound_queue_size=10
+    )
+    client.is_connected = True
+    client._outbound.put(OutboundMessage('/devices/dev/ctl', '1', 1, True))
+
+    assert not client.flush(timeout=0.05)
+    assert client.metrics.snapshot()['gauges']['outbound_queue_depth'] == 1
+
+
+def test_aliases_reset_queued():
+    client = MQTTClient(broker_host='localhost', broker_port=1883, protocol=MQTTv5)
+    client._aliases.reset(maximum=5)
+    topic = '/devices/dev/temp'
+
+    # Без подключения paho оставляет QoS 1 сообщения в своей очереди
+    client._send(topic, b'1', 1, False)
+    original = client.client.publish
+    mids = []
+
+    def publish(*args, **kwargs):
+        info = original(*args, **kwargs)
+        mids.append(info.mid)
+        return info
+
+    client.client.publish = publish
+    client._send(topic, b'2', 1, False)
+    client._aliases.on_published(mids[-1])
+    client._send(topic, b'3', 1, False)
+
+    messages, _ = client._paho_out_queue()
+    assert messages[mids[-1]].topic == ''
+
+    # Новое подключение без alias-ов: paho повторит сообщения с полным топиком
+    properties = SimpleNamespace(TopicAliasMaximum=0)
+    flags = SimpleNamespace(session_present=True)
+    client._on_connect(client.client, None, flags, 0, properties)
+    assert messages[mids[-1]].topic == topic
+    assert messages[mids[-1]].properties is None
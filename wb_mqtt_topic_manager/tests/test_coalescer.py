@@ -0,0 +1,86 @@
+import threading
+
+from wb_mqtt_topic_manager.coalescer import PublishCoalescer
+from wb_mqtt_topic_manager.scheduler import Scheduler
+
+
+def test_scheduler_order():
+    scheduler = Scheduler()
+    done = threading.Event()
+    calls = []
+
+    scheduler.call_later(0.02, calls.append, 'second')
+    scheduler.call_later(0.01, calls.append, 'first')
+    scheduler.call_later(0.01, calls.append, 'cancelled').cancel()
+    scheduler.call_later(0.03, done.set)
+
+    assert done.wait(1)
+    assert calls == ['first', 'second']
+    scheduler.stop()
+
+
+def test_scheduler_stop_concurrent_call_later():
+    scheduler = Scheduler(name='test-scheduler-stop')
+    running = threading.Event()
+    done = threading.Event()
+
+    def producer():
+        while not done.is_set():
+            scheduler.call_later(60, lambda: None)
+            running.set()
+
+    producers = [threading.Thread(target=producer, daemon=True) for _ in range(4)]
+    for thread in producers:
+        thread.start()
+    assert running.wait(1)
+
+    # Остановка не зависает из-за потока, запущенного новой задачей
+    for _ in range(50):
+        stopper = threading.Thread(target=scheduler.stop)
+        stopper.start()
+        stopper.join(2)
+        assert not stopper.is_alive()
+
+    done.set()
+    for thread in producers:
+        thread.join()
+    scheduler.stop()
+    threads = [item for item in threading.enumerate() if item.name == scheduler.name]
+    for item in threads:
+        item.join(1)
+    assert not any(item.is_alive() for item in threads)
+
+
+def test_coalescer_keeps_latest_value(message_info):
+    sent = []
+
+    def send(topic, payload, qos, retain, on_sent):
+        sent.append((topic, payload))
+        on_sent(message_info(len(sent)))
+        return True
+
+    coalescer = PublishCoalescer(send=send, scheduler=Scheduler(), interval=60)
+
+    for value in range(10):
+        coalescer.add('/devices/test/range', value, 1)
+    coalescer.add('/devices/test/switch', '1', 1)
+    coalescer.flush()
+
+    assert sent == [('/devices/test/range', 9), ('/devices/test/switch', '1')]
+    assert coalescer.stats['coalesced'] == 9
+
+    # Пока значение в полете, новые значения копятся
+    coalescer.add('/devices/test/range', 10, 1)
+    coalescer.add('/devices/test/range', 11, 1)
+    coalescer.flush()
+    assert len(sent) == 2
+
+    coalescer.on_published(1)
+    coalescer.flush()
+    assert sent[-1] == ('/devices/test/range', 11)
+    assert coalescer.stats == {
+        'pending': 0,
+        'inflight': 2,
+        'coalesced': 10,
+        'flushed': 3,
+    }
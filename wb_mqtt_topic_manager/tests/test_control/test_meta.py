@@ -0,0 +1,40 @@
+from wb_mqtt_topic_manager.control.base import LocalizedString
+from wb_mqtt_topic_manager.control.control_type import RangeMeta, SwitchMeta
+from wb_mqtt_topic_manager.serializer import json_loads
+
+
+def test_meta_payload_cache():
+    meta = SwitchMeta(order=0, title=LocalizedString(en='Power', ru='Питание'))
+
+    payload = meta.to_payload()
+    assert meta.to_payload() is payload
+    assert json_loads(payload) == {
+        'type': 'switch',
+        'order': 0,
+        'title': {'en': 'Power', 'ru': 'Питание'},
+        'readonly': False,
+    }
+
+    meta.readonly = True
+    assert meta.to_payload() is not payload
+    assert json_loads(meta.to_payload())['readonly'] is True
+
+
+def test_range_meta_payload_cache():
+    meta = RangeMeta(
+        order=1,
+        title=LocalizedString(en='Range', ru='Диапазон'),
+        min_value=30,
+        max_value=120,
+    )
+
+    assert json_loads(meta.to_payload())['max'] == 120
+
+    meta.max_value = 200
+    assert json_loads(meta.to_payload())['max'] == 200
+    assert meta == RangeMeta(
+        order=1,
+        title=LocalizedString(en='Range', ru='Диапазон'),
+        min_value=30,
+        max_value=200,
+    )
@@ -0,0 +1,87 @@
+import threading
+from types import SimpleNamespace
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import OverflowPolicy
+from wb_mqtt_topic_manager.delivery import wait_all
+
+ACK = SimpleNamespace(is_failure=False)
+NACK = SimpleNamespace(is_failure=True)
+
+
+def _client(monkeypatch, **kwargs):
+    client = MQTTClient(broker_host='localhost', broker_port=1883, **kwargs)
+    client.is_connected = True
+    mids = iter(range(1, 1000))
+
+    def publish(topic, payload, qos=0, retain=False):
+        return SimpleNamespace(
+            mid=next(mids), rc=0, is_published=lambda: False, topic=topic
+        )
+
+    monkeypatch.setattr(client.client, 'publish', publish)
+    return client
+
+
+def test_publish_handles(monkeypatch):
+    client = _client(monkeypatch)
+    handles = [
+        client.publish(f'/devices/dev/ctl{index}', '1', qos=1, track=True)
+        for index in range(3)
+    ]
+    done = []
+    handles[0].add_done_callback(done.append)
+
+    assert [handle.mid for handle in handles] == [1, 2, 3]
+    assert not wait_all(handles, timeout=0.01)
+
+    client._on_publish(client.client, None, 1, ACK, None)
+    client._on_publish(client.client, None, 2, NACK, None)
+    assert done == [handles[0]]
+    assert handles[0].wait(0) and not handles[1].wait(0)
+
+    # Ожидание из другого потока завершается по подтверждению
+    waiter = threading.Thread(target=lambda: done.append(handles[2].wait(5)))
+    waiter.start()
+    client._on_publish(client.client, None, 3, ACK, None)
+    waiter.join()
+
+    assert done[-1] is True
+    assert not wait_all(handles, timeout=0)
+    assert client.delivery_stats == {'pending': 0, 'delivered': 2, 'failed': 1}
+
+
+def test_publish_handle_not_connected():
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    handle = client.publish('/devices/dev/ctl', '1', qos=1, track=True)
+
+    assert handle.done and handle.result is False
+
+
+def test_coalesced_handles_complete_together(monkeypatch):
+    client = _client(monkeypatch, coalesce_interval=60)
+    first = client.publish('/devices/dev/ctl', '1', qos=1, retain=True, track=True)
+    second = client.publish('/devices/dev/ctl', '2', qos=1, retain=True, track=True)
+    client._coalescer.flush()
+
+    assert first.mid == second.mid == 1
+    client._on_publish(client.client, None, 1, ACK, None)
+    assert wait_all([first, second], timeout=0)
+
+
+def test_dropped_outbound_handles_fail(monkeypatch):
+    client = _client(
+        monkeypatch, outbound_queue_size=1, outbound_overflow=OverflowPolicy.DROP_OLDEST
+    )
+    # Поток отправки не запущен, сообщения остаются в очереди
+    first = client.publish('/devices/dev/ctl', '1', qos=1, track=True)
+    second = client.publish('/devices/dev/ctl', '2', qos=1, track=True)
+
+    # Вытесненное сообщение завершается с ошибкой сразу
+    assert first.result is False and second.result is None
+
+    # Неотправленное при остановке очереди тоже
+    client._outbound.stop()
+    assert not wait_all([first, second], timeout=1)
+    assert second.result is False
+    assert client.delivery_stats == {'pending': 0, 'delivered': 0, 'failed': 2}
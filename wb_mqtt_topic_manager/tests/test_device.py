@@ -3,7 +3,8 @@ import time
 import pytest
 
 from wb_mqtt_topic_manager.client import MQTTClient
-from wb_mqtt_topic_manager.constance import ErrorType
+from wb_mqtt_topic_manager.constance import ErrorType, LegacyTopicsPolicy
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
 from wb_mqtt_topic_manager.device import DriverDevice, ObserverDevice
 
 
@@ -129,3 +130,33 @@ def test_on_meta_error_change(test_client: MQTTClient):
     assert call_history[3][1] == 'wp'
     assert call_history[4][1] == 'p'
     assert call_history[5][1] == ''
+
+
+@pytest.mark.parametrize(
+    ('policy', 'published', 'deferred'),
+    [
+        (LegacyTopicsPolicy.FULL, 9, 0),
+        (LegacyTopicsPolicy.JSON_ONLY, 5, 0),
+        (LegacyTopicsPolicy.LAZY, 5, 4),
+    ],
+)
+def test_legacy_topics_policy(monkeypatch, policy, published, deferred):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    topics = []
+    monkeypatch.setattr(client, 'publish', lambda topic, **kwargs: topics.append(topic))
+
+    device = DriverDevice.create(
+        client=client,
+        device_id='driver_device',
+        driver_name='driver_device',
+        title={'ru': 'Русское название', 'en': 'English title'},
+        legacy_topics=policy,
+    )
+    ControlManager.create_switch(
+        device, 'switch', initial_value='0', order=1, title=None
+    )
+
+    # Устройство: meta, meta/error, meta/name; контрол: значение, meta,
+    # meta/error, meta/type, meta/order, meta/readonly
+    assert len(topics) == published
+    assert client.deferred_stats['pending'] == deferred
@@ -0,0 +1,109 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import OverflowPolicy
+from wb_mqtt_topic_manager.dispatcher import CallbackDispatcher
+
+
+def _deliver(callbacks, topic, payload):
+    for callback, _ in callbacks:
+        callback(topic, payload)
+
+
+def test_dispatcher_keeps_topic_order():
+    dispatcher = CallbackDispatcher(deliver=_deliver, workers=4)
+    dispatcher.start()
+
+    received = {}
+
+    def callback(topic, payload):
+        received.setdefault(topic, []).append(payload)
+
+    topics = [f'/devices/device_{index}/value' for index in range(8)]
+    for value in range(100):
+        for topic in topics:
+            assert dispatcher.submit([(callback, False)], topic, value)
+
+    dispatcher.stop()
+
+    assert all(received[topic] == list(range(100)) for topic in topics)
+    assert dispatcher.stats['dispatched'] == 800
+    assert dispatcher.stats['queue_depth'] == 0
+
+
+def test_dispatcher_overflow_policies():
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_callback(topic, payload):
+        started.set()
+        release.wait()
+
+    received = []
+
+    def callback(topic, payload):
+        received.append(payload)
+
+    rejecting = CallbackDispatcher(
+        deliver=_deliver,
+        workers=1,
+        queue_size=1,
+        overflow_policy=OverflowPolicy.REJECT,
+    )
+    rejecting.start()
+    rejecting.submit([(slow_callback, False)], 'topic', 0)
+    started.wait(1)
+    assert rejecting.submit([(callback, False)], 'topic', 1)
+    assert not rejecting.submit([(callback, False)], 'topic', 2)
+    assert rejecting.stats['rejected'] == 1
+    release.set()
+    rejecting.stop()
+    assert received == [1]
+
+    release.clear()
+    started.clear()
+    received.clear()
+
+    dropping = CallbackDispatcher(
+        deliver=_deliver,
+        workers=1,
+        queue_size=1,
+        overflow_policy=OverflowPolicy.DROP_OLDEST,
+    )
+    dropping.start()
+    dropping.submit([(slow_callback, False)], 'topic', 0)
+    started.wait(1)
+    assert dropping.submit([(callback, False)], 'topic', 1)
+    assert dropping.submit([(callback, False)], 'topic', 2)
+    assert dropping.stats['dropped'] == 1
+    release.set()
+    dropping.stop()
+    assert received == [2]
+
+
+def test_client_dispatch_block_timeout():
+    client = MQTTClient(
+        broker_host='localhost',
+        broker_port=1883,
+        dispatch_workers=1,
+        dispatch_queue_size=1,
+        dispatch_block_timeout=0.05,
+    )
+    assert MQTTClient('localhost', 1883, dispatch_workers=1)._dispatcher.block_timeout
+
+    release = threading.Event()
+    client.subscribe('/devices/dev/temp', lambda topic, payload: release.wait(1))
+    client._dispatcher.start()
+
+    # Переполненная очередь не блокирует сетевой поток дольше block_timeout
+    message = SimpleNamespace(topic='/devices/dev/temp', payload=b'1')
+    started = time.monotonic()
+    for _ in range(3):
+        client._on_message(client.client, None, message)
+    assert time.monotonic() - started < 1
+    assert client.dispatch_stats['dropped'] >= 1
+
+    release.set()
+    client._dispatcher.stop()
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import TopicKind
+from wb_mqtt_topic_manager.device import ObserverDevice
+
+
+def test_events_batch_and_filter(inject_message):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    events = client.events(kinds=(TopicKind.VALUE, TopicKind.META_ERROR))
+
+    inject_message(client, '/devices/dev/temp', '21.5')
+    inject_message(client, '/devices/dev/temp/meta', '{}')
+    inject_message(client, '/devices/dev/temp/meta/error', 'r')
+    inject_message(client, '/devices/other/hum', '40')
+
+    batch = events.get_batch(timeout=0)
+    assert [(e.device_id, e.control_id, e.kind, e.value) for e in batch] == [
+        ('dev', 'temp', TopicKind.VALUE, '21.5'),
+        ('dev', 'temp', TopicKind.META_ERROR, 'r'),
+        ('other', 'hum', TopicKind.VALUE, '40'),
+    ]
+    assert events.get_batch(timeout=0) == []
+
+    events.close()
+    inject_message(client, '/devices/dev/temp', '22')
+    assert events.closed and not len(events)
+
+
+def test_events_ring_buffer_drops_oldest(inject_message):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    device = ObserverDevice.create(client, 'dev')
+    events = device.events(maxsize=3)
+
+    for value in range(5):
+        inject_message(client, '/devices/dev/temp', str(value))
+    inject_message(client, '/devices/other/temp', 'x')
+
+    assert events.received == 5 and events.dropped == 2
+    assert [event.value for event in events.get_batch(max_items=2)] == ['2', '3']
+    assert [event.value for event in events.get_batch()] == ['4']
+
+
+def test_events_iteration_ends_on_close(inject_message):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    events = client.events()
+    values = []
+
+    consumer = threading.Thread(
+        target=lambda: values.extend(event.value for event in events)
+    )
+    consumer.start()
+    for value in range(3):
+        inject_message(client, '/devices/dev/temp', str(value))
+    events.close()
+    consumer.join(5)
+
+    assert not consumer.is_alive()
+    assert values == ['0', '1', '2']
+
+
+async def test_events_async(inject_message):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    loop = asyncio.get_running_loop()
+
+    async with client.events(device_id='dev') as events:
+        assert await events.get_batch_async(timeout=0.01) == []
+
+        # Сообщения приходят из сетевого потока
+        loop.run_in_executor(None, inject_message, client, '/devices/dev/temp', '1')
+        batch = await events.get_batch_async(timeout=5)
+        assert [event.value for event in batch] == ['1']
+
+        inject_message(client, '/devices/dev/temp', '2')
+        event = await events.__anext__()
+        assert event.value == '2'
+
+    assert events.closed
+    async for _ in events:
+        raise AssertionError('stream is closed')
@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import HistoryAggregate
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import ObserverDevice
+from wb_mqtt_topic_manager.history import RECORD_SIZE, ValueHistory
+
+
+def test_history_ring_buffer_and_range():
+    history = ValueHistory(capacity=4)
+    for second in range(6):
+        history.append(second * 10, timestamp=100 + second)
+
+    # Два самых старых значения перезаписаны
+    assert len(history) == 4
+    assert history.nbytes == 4 * RECORD_SIZE
+
+    times, values = history.range()
+    assert list(times) == [102, 103, 104, 105]
+    assert list(values) == [20, 30, 40, 50]
+
+    times, values = history.range(start=103, end=105)
+    assert list(times) == [103, 104] and list(values) == [30, 40]
+    assert history.range(start=200) == (history.range(end=0))
+
+    history.clear()
+    assert not len(history) and not history.range()[0]
+
+
+def test_history_downsample():
+    history = ValueHistory(capacity=100)
+    for second in range(10):
+        history.append(second, timestamp=1000 + second)
+
+    assert history.downsample(5) == [(1000, 2.0), (1005, 7.0)]
+    assert history.downsample(4, aggregate=HistoryAggregate.MAX) == [
+        (1000, 3),
+        (1004, 7),
+        (1008, 9),
+    ]
+    assert history.downsample(
+        3, start=1001, end=1008, aggregate=HistoryAggregate.LAST
+    ) == [(1001, 3), (1004, 6), (1007, 7)]
+    assert history.downsample(10, aggregate=HistoryAggregate.MIN) == [(1000, 0)]
+
+    with pytest.raises(ValueError):
+        history.downsample(0)
+    with pytest.raises(ValueError):
+        history.downsample(1, aggregate='median')
+
+
+def test_observer_control_history():
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    device = ObserverDevice.create(client, 'dev')
+    control = ControlManager.connect_control(device, 'temp', history=10)
+    plain = ControlManager.connect_control(device, 'state')
+
+    for payload in (b'21.5', b'22', b'error', b'22'):
+        client._on_message(
+            client.client,
+            None,
+            SimpleNamespace(topic='/devices/dev/temp', payload=payload),
+        )
+
+    # Записываются все числовые значения, в том числе повторные
+    assert list(control.history.range()[1]) == [21.5, 22.0, 22.0]
+    assert plain.history is None
+    assert plain.enable_history(5) is plain.enable_history(5)
@@ -0,0 +1,66 @@
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import TopicKind
+from wb_mqtt_topic_manager.metrics import MetricsRegistry
+from wb_mqtt_topic_manager.payload import Payload
+from wb_mqtt_topic_manager.topics import classify_topic
+
+
+def test_classify_topic():
+    assert classify_topic('/devices/dev/ctl') == TopicKind.VALUE
+    assert classify_topic('/devices/dev/ctl/on') == TopicKind.ON
+    assert classify_topic('/devices/dev/meta') == TopicKind.META
+    assert classify_topic('/devices/dev/meta/name') == TopicKind.META
+    assert classify_topic('/devices/dev/meta/error') == TopicKind.META_ERROR
+    assert classify_topic('/devices/dev/ctl/meta') == TopicKind.META
+    assert classify_topic('/devices/dev/ctl/meta/type') == TopicKind.META
+    assert classify_topic('/devices/dev/ctl/meta/error') == TopicKind.META_ERROR
+    assert classify_topic('/devices/dev') == TopicKind.OTHER
+    assert classify_topic('/other/dev/ctl') == TopicKind.OTHER
+
+
+def test_metrics_registry():
+    metrics = MetricsRegistry()
+    metrics.inc('messages_published_total', TopicKind.VALUE)
+    metrics.inc('messages_published_total', TopicKind.VALUE)
+    metrics.inc('messages_published_total', TopicKind.META)
+    metrics.observe('publish_ack_seconds', 0.003, TopicKind.VALUE)
+    metrics.observe('publish_ack_seconds', 20, TopicKind.VALUE)
+    metrics.gauge('outbound_queue_depth', lambda: 2)
+    metrics.gauge('outbound_queue_depth', lambda: 3)
+
+    assert metrics.counter('messages_published_total') == 3
+    assert metrics.counter('messages_published_total', TopicKind.META) == 1
+
+    snapshot = metrics.snapshot()
+    histogram = snapshot['histograms']['publish_ack_seconds'][TopicKind.VALUE]
+    assert histogram['count'] == 2
+    assert histogram['buckets'][0.0025] == 0
+    assert histogram['buckets'][0.005] == 1
+    assert histogram['buckets'][float('inf')] == 2
+    assert snapshot['gauges']['outbound_queue_depth'] == 5
+
+    text = metrics.to_prometheus()
+    assert 'wb_mqtt_messages_published_total{kind="value"} 2' in text
+    assert 'wb_mqtt_publish_ack_seconds_bucket{kind="value",le="+Inf"} 2' in text
+    assert 'wb_mqtt_outbound_queue_depth 5' in text
+
+
+def test_client_callback_metrics():
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+
+    def failing(topic, payload):
+        raise RuntimeError
+
+    client.subscribe('/devices/+/ctl', failing)
+    client.subscribe('/devices/+/ctl', lambda topic, payload: None)
+
+    message = type('Message', (), {'topic': '/devices/dev/ctl', 'payload': b'1'})
+    client._on_message(client.client, None, message)
+    client._deliver([(failing, False)], '/devices/dev/ctl', Payload(b'\xff'))
+
+    metrics = client.metrics
+    assert metrics.counter('messages_received_total', TopicKind.VALUE) == 1
+    assert metrics.counter('callback_errors_total', TopicKind.VALUE) == 1
+    assert metrics.counter('decode_errors_total', TopicKind.VALUE) == 1
+    histogram = metrics.snapshot()['histograms']['callback_seconds'][TopicKind.VALUE]
+    assert histogram['count'] == 2
@@ -0,0 +1,62 @@
+import threading
+
+from wb_mqtt_topic_manager.constance import OverflowPolicy
+from wb_mqtt_topic_manager.outbound import OutboundMessage, OutboundQueue
+
+
+def test_outbound_max_inflight(message_info):
+    sent = []
+    all_sent = threading.Event()
+
+    def send(topic, payload, qos, retain):
+        sent.append(payload)
+        if len(sent) == 4:
+            all_sent.set()
+        return message_info(len(sent))
+
+    outbound = OutboundQueue(send=send, ready=lambda: True, max_inflight=2)
+    outbound.start()
+
+    for value in range(4):
+        assert outbound.put(OutboundMessage('/devices/test/value', value, 1, True))
+
+    assert not all_sent.wait(0.1)
+    assert sent == [0, 1]
+    assert outbound.stats['inflight'] == 2
+
+    outbound.on_published(1)
+    outbound.on_published(2)
+
+    assert all_sent.wait(1)
+    assert sent == [0, 1, 2, 3]
+    outbound.stop()
+
+
+def test_outbound_overflow_policies(message_info):
+    def send(topic, payload, qos, retain):
+        return message_info(0)
+
+    def fill(policy, **kwargs):
+        # Без подключения сообщения остаются в очереди
+        outbound = OutboundQueue(
+            send=send, ready=lambda: False, max_size=2, overflow_policy=policy, **kwargs
+        )
+        results = [
+            outbound.put(OutboundMessage('/devices/test/value', value, 1, True))
+            for value in range(3)
+        ]
+        return outbound, results
+
+    outbound, results = fill(OverflowPolicy.REJECT)
+    assert results == [True, True, False]
+    assert outbound.stats['rejected'] == 1
+
+    outbound, results = fill(OverflowPolicy.DROP_OLDEST)
+    assert results == [True, True, True]
+    assert [message.payload for message in outbound._queue] == [1, 2]
+    assert outbound.stats['dropped'] == 1
+
+    outbound, results = fill(OverflowPolicy.BLOCK, block_timeout=0.01)
+    assert results == [True, True, False]
+    assert outbound.stats['blocked'] == 1
+    assert outbound.stats['depth'] == 2
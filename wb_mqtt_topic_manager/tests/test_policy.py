@@ -0,0 +1,179 @@
+from types import SimpleNamespace
+
+import pytest
+
+from wb_mqtt_topic_manager import policy as policy_module
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import DriverDevice
+from wb_mqtt_topic_manager.policy import PolicyPublisher, PublishPolicy
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(policy_module.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _publisher(policy, scheduler):
+    published = []
+    publisher = PolicyPublisher(policy, published.append, scheduler, 10)
+    return publisher, scheduler, published
+
+
+def test_deadband(clock, fake_scheduler):
+    publisher, _, published = _publisher(PublishPolicy(deadband=1), fake_scheduler)
+
+    assert publisher.submit(10.5) is False
+    assert publisher.submit(11.5) is None
+    # Сравнение с последним опубликованным, а не с последним значением
+    assert publisher.submit(12) is False
+    assert publisher.submit(12.6) is None
+    assert published == [11.5, 12.6]
+
+    publisher, _, published = _publisher(
+        PublishPolicy(relative_deadband=0.1), fake_scheduler
+    )
+    publisher.submit(10.5)
+    publisher.submit(11.5)
+    assert published == [11.5]
+
+
+def test_min_interval_trailing_edge(clock, fake_scheduler):
+    publisher, scheduler, published = _publisher(
+        PublishPolicy(min_interval=1), fake_scheduler
+    )
+
+    clock[0] += 0.2
+    assert publisher.submit(11) is True
+    publisher.submit(12)
+    publisher.submit(13)
+    assert published == []
+    assert len(scheduler.tasks) == 1
+
+    clock[0] = 101
+    scheduler.run_until(clock[0])
+    assert published == [13]
+
+    clock[0] = 102.5
+    publisher.submit(14)
+    assert published == [13, 14]
+
+
+def test_debounce(clock, fake_scheduler):
+    publisher, scheduler, published = _publisher(
+        PublishPolicy(debounce=1), fake_scheduler
+    )
+
+    publisher.submit(11)
+    clock[0] += 0.8
+    publisher.submit(12)
+
+    # Значение менялось, задача переносится
+    clock[0] = 101
+    scheduler.run_until(clock[0])
+    assert published == []
+
+    clock[0] = 102
+    scheduler.run_until(clock[0])
+    assert published == [12]
+
+
+def test_max_interval_heartbeat(clock, fake_scheduler):
+    publisher, scheduler, published = _publisher(
+        PublishPolicy(deadband=5, max_interval=10), fake_scheduler
+    )
+    publisher.submit(12)
+
+    clock[0] = 110
+    scheduler.run_until(clock[0])
+    assert published == [12]
+    assert len(scheduler.tasks) == 1
+
+    publisher.cancel()
+    clock[0] = 120
+    scheduler.run_until(clock[0])
+    assert published == [12]
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        PublishPolicy(min_interval=-1)
+    with pytest.raises(ValueError):
+        PublishPolicy(max_interval=0)
+
+
+def test_control_policy(monkeypatch):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    values = []
+    monkeypatch.setattr(
+        client,
+        'publish',
+        lambda topic, payload, **kwargs: (
+            values.append(payload) if topic == '/devices/dev/level' else None
+        ),
+    )
+
+    device = DriverDevice.create(client, 'dev', 'test_driver', {'en': 'Device'})
+    control = ControlManager.create_range(
+        device,
+        'level',
+        initial_value=100,
+        order=1,
+        title=None,
+        policy=PublishPolicy(deadband=2),
+    )
+
+    control.change_value(101)
+    control.change_value(103)
+    assert control.value == 103
+    assert values == [100, 103]
+    assert control.policy == PublishPolicy(deadband=2)
+
+
+def test_suspend_resume(clock, fake_scheduler):
+    publisher, scheduler, published = _publisher(
+        PublishPolicy(min_interval=5, max_interval=10), fake_scheduler
+    )
+    clock[0] += 1
+    publisher.submit(11)
+
+    # Отложенное значение публикуется, таймеры отменяются
+    publisher.suspend()
+    assert published == [11]
+    assert all(task.cancelled for task in scheduler.tasks)
+
+    publisher.resume()
+    clock[0] = 111
+    scheduler.run_until(clock[0])
+    assert published == [11, 11]
+
+
+def test_policy_timers_stop_on_disconnect(monkeypatch):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    monkeypatch.setattr(client, 'publish', lambda *args, **kwargs: None)
+    device = DriverDevice.create(client, 'dev', 'test_driver', {'en': 'Device'})
+    ControlManager.create_range(
+        device,
+        'level',
+        initial_value=100,
+        order=1,
+        title=None,
+        policy=PublishPolicy(max_interval=10),
+    )
+    assert len(client.scheduler) == 1
+
+    # disconnect останавливает таймеры политик и поток планировщика
+    client.is_connected = True
+    monkeypatch.setattr(client.client, 'disconnect', lambda: None)
+    client.connect_timeout = 0.01
+    client.disconnect()
+    assert len(client.scheduler) == 0
+    assert client.scheduler._thread is None
+
+    client._on_connect(
+        client.client, None, SimpleNamespace(session_present=True), 0, None
+    )
+    assert len(client.scheduler) == 1
+    client.scheduler.stop()
@@ -0,0 +1,43 @@
+import time
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.profiler import CallbackProfiler
+
+
+def test_profiler_keeps_slowest():
+    slow = []
+    profiler = CallbackProfiler(top_n=2, threshold=0.5, on_slow=slow.append)
+
+    def handler(topic, payload):
+        pass
+
+    for elapsed in (0.1, 0.3, 0.2, 0.7):
+        profiler.record(handler, '/devices/dev/ctl', elapsed)
+
+    assert [sample.elapsed for sample in profiler.slowest()] == [0.7, 0.3]
+    assert profiler.slowest()[0].name.endswith(
+        'test_profiler_keeps_slowest.<locals>.handler'
+    )
+    assert [sample.elapsed for sample in slow] == [0.7]
+    assert profiler.stats['calls'] == 4
+    assert profiler.stats['slow'] == 1
+
+
+def test_profiler_attributes_nested_callback():
+    profiler = CallbackProfiler()
+    client = MQTTClient(broker_host='localhost', broker_port=1883, profiler=profiler)
+
+    def on_change_value(value):
+        time.sleep(0.01)
+
+    def on_message(topic, payload):
+        # Обертка контрола вызывает пользовательский callback через клиент
+        client.run_callback(on_change_value, payload)
+
+    client._invoke(on_message, '/devices/dev/ctl', '1')
+
+    samples = profiler.slowest()
+    assert len(samples) == 1
+    assert samples[0].name.endswith('on_change_value')
+    assert samples[0].topic == '/devices/dev/ctl'
+    assert samples[0].elapsed >= 0.01
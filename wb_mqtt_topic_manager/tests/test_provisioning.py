@@ -0,0 +1,137 @@
+import json
+
+import pytest
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.control.control import RangeDriverControl
+from wb_mqtt_topic_manager.provisioning import (
+    SchemaError,
+    load_schema,
+    provision,
+    validate_schema,
+)
+
+SCHEMA = {
+    'devices': [
+        {
+            'id': 'boiler',
+            'driver': 'test_driver',
+            'title': {'en': 'Boiler', 'ru': 'Котел'},
+            'controls': [
+                {
+                    'id': 'power',
+                    'type': 'switch',
+                    'value': '0',
+                    'order': 1,
+                    'title': {'en': 'Power', 'ru': 'Питание'},
+                },
+                {'id': 'level', 'type': 'range', 'value': 10, 'min': 0, 'max': 100},
+            ],
+        },
+        {
+            'id': 'alarm',
+            'driver': 'test_driver',
+            'title': {'en': 'Alarm'},
+            'legacy_topics': 'json_only',
+            'controls': [{'id': 'fire', 'type': 'alarm', 'value': '0'}],
+        },
+    ]
+}
+
+YAML_SCHEMA = """
+devices:
+  - id: boiler
+    driver: test_driver
+    title: {en: Boiler, ru: Котел}
+    controls:
+      - {id: power, type: switch, value: '0'}
+"""
+
+
+def test_load_schema(tmp_path):
+    assert load_schema(SCHEMA) is SCHEMA
+    assert load_schema(json.dumps(SCHEMA)) == SCHEMA
+
+    path = tmp_path / 'schema.json'
+    path.write_text(json.dumps(SCHEMA), encoding='utf-8')
+    assert load_schema(path) == SCHEMA
+    assert load_schema(str(path)) == SCHEMA
+
+    pytest.importorskip('yaml')
+    schema = load_schema(YAML_SCHEMA)
+    assert schema['devices'][0]['controls'][0]['id'] == 'power'
+
+
+def test_validate_schema_reports_all_errors():
+    schema = {
+        'devices': [
+            {'id': 'dev', 'driver': 'test_driver', 'title': {'en': 'Device'}},
+            {
+                'id': 'dev',
+                'driver': '',
+                'title': {'en': 'Device'},
+                'legacy_topics': 'unknown',
+            },
+            {
+                'id': 'other/dev',
+                'driver': 'test_driver',
+                'title': 'Device',
+                'controls': [
+                    {'id': 'sw', 'type': 'switch', 'value': 0, 'min': 1},
+                    {'id': 'sw', 'type': 'unknown', 'value': 0},
+                    {'id': 'level', 'type': 'range', 'min': 10, 'max': 1},
+                    {'id': 'text', 'type': 'switch', 'value': 0, 'typo': 1},
+                ],
+            },
+        ]
+    }
+
+    with pytest.raises(SchemaError) as error:
+        validate_schema(schema)
+
+    assert error.value.errors == [
+        "devices[1].id: duplicate id 'dev'",
+        'devices[1].driver: expected a non-empty string',
+        "devices[1].legacy_topics: unknown policy 'unknown'",
+        'devices[2].id: must not contain "/", "+" or "#"',
+        'devices[2].title: expected a mapping with "en" string',
+        'devices[2].controls[sw].min: allowed only for range controls',
+        "devices[2].controls[1].id: duplicate id 'sw'",
+        "devices[2].controls[1].type: unknown control type 'unknown'",
+        'devices[2].controls[level].value: required',
+        'devices[2].controls[level]: min is greater than max',
+        'devices[2].controls[3].typo: unknown field',
+    ]
+
+
+def test_provision(monkeypatch):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    topics = []
+    monkeypatch.setattr(client, 'publish', lambda topic, **kwargs: topics.append(topic))
+
+    report = provision(client, SCHEMA)
+
+    assert list(report.devices) == ['boiler', 'alarm']
+    assert report.controls == 3
+    assert report.acknowledged
+    boiler = report.devices['boiler']
+    assert isinstance(boiler.controls['level'], RangeDriverControl)
+    assert boiler.controls['level'].meta.max_value == 100
+    assert report.devices['alarm'].legacy_topics == 'json_only'
+    assert '/devices/alarm/fire/meta/type' not in topics
+    assert '/devices/boiler/power/meta/type' in topics
+
+    # Подписки на /on не отправляются до подключения, но сохранены
+    assert '/devices/boiler/power/on' in client._subscriptions
+
+
+def test_provision_invalid_schema_creates_nothing(monkeypatch):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    topics = []
+    monkeypatch.setattr(client, 'publish', lambda topic, **kwargs: topics.append(topic))
+
+    schema = {'devices': [*SCHEMA['devices'], {'id': 'broken'}]}
+    with pytest.raises(SchemaError):
+        provision(client, schema)
+
+    assert topics == []
@@ -0,0 +1,107 @@
+import pytest
+
+from wb_mqtt_topic_manager import ratelimit
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.constance import ThrottlePolicy
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import DriverDevice
+from wb_mqtt_topic_manager.ratelimit import RateLimiter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def _limiter(scheduler, **kwargs):
+    published = []
+    limiter = RateLimiter(
+        lambda topic, payload, qos, retain: published.append((topic, payload)),
+        scheduler,
+        **kwargs,
+    )
+    return limiter, scheduler, published
+
+
+def test_device_limit_delay(clock, fake_scheduler):
+    limiter, scheduler, published = _limiter(fake_scheduler, rate=2, burst=2)
+
+    for value in range(5):
+        limiter.submit('noisy', '/devices/noisy/ctl', value, 1, True)
+    limiter.submit('quiet', '/devices/quiet/ctl', 0, 1, True)
+
+    # Соседнее устройство не ограничено лимитом шумного
+    assert published == [
+        ('/devices/noisy/ctl', 0),
+        ('/devices/noisy/ctl', 1),
+        ('/devices/quiet/ctl', 0),
+    ]
+
+    scheduler.run_until(101.5)
+    assert [payload for _, payload in published[3:]] == [2, 3, 4]
+    assert limiter.device_stats('noisy') == {
+        'published': 5,
+        'throttled': 3,
+        'coalesced': 0,
+        'pending': 0,
+    }
+
+
+def test_device_limit_coalesce(clock, fake_scheduler):
+    limiter, scheduler, published = _limiter(
+        fake_scheduler, rate=1, overflow=ThrottlePolicy.COALESCE
+    )
+
+    for value in range(5):
+        limiter.submit('dev', '/devices/dev/ctl', value, 1, True)
+    limiter.submit('dev', '/devices/dev/other', 'x', 1, True)
+
+    scheduler.run_until(102)
+    assert published == [
+        ('/devices/dev/ctl', 0),
+        ('/devices/dev/ctl', 4),
+        ('/devices/dev/other', 'x'),
+    ]
+    assert limiter.device_stats('dev')['coalesced'] == 3
+
+
+def test_global_limit_is_fair(clock, fake_scheduler):
+    limiter, scheduler, published = _limiter(
+        fake_scheduler, global_rate=2, global_burst=2
+    )
+
+    for value in range(4):
+        limiter.submit('noisy', '/devices/noisy/ctl', value, 1, True)
+    limiter.submit('quiet', '/devices/quiet/ctl', 0, 1, True)
+
+    # Отложенные публикации устройств отправляются по очереди
+    scheduler.run_until(101)
+    assert published[2:] == [('/devices/noisy/ctl', 2), ('/devices/quiet/ctl', 0)]
+
+    limiter.flush()
+    assert published[-1] == ('/devices/noisy/ctl', 3)
+
+
+def test_device_rate_limit(monkeypatch):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    client.is_connected = True
+    values = []
+    monkeypatch.setattr(
+        client.client,
+        'publish',
+        lambda topic, payload, **kwargs: (
+            values.append(payload) if topic.endswith('/level') else None
+        ),
+    )
+
+    device = DriverDevice.create(
+        client, 'dev', 'test_driver', {'en': 'Device'}, rate_limit=1
+    )
+    control = ControlManager.create_range(device, 'level', 0, order=1, title=None)
+    for value in range(1, 4):
+        control.change_value(value)
+
+    assert values == [b'0', b'1']
+    assert client.throttle_stats['dev']['pending'] == 2
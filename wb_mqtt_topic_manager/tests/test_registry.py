@@ -0,0 +1,38 @@
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.registry import DeviceRegistry
+
+
+def test_registry_discovery(inject_message):
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    registry = DeviceRegistry(client)
+    events = []
+    registry.on_device_appear(lambda device_id: events.append(('+', device_id)))
+    registry.on_device_disappear(lambda device_id: events.append(('-', device_id)))
+    registry.on_control_appear(lambda *ids: events.append(('+', ids)))
+    registry.on_control_disappear(lambda *ids: events.append(('-', ids)))
+    registry.start()
+
+    inject_message(client, '/devices/dev/meta', b'{"driver": "test"}')
+    inject_message(client, '/devices/dev/switch/meta', b'{"type": "switch"}')
+    inject_message(client, '/devices/dev/level/meta', b'{"type": "range"}')
+    inject_message(client, '/devices/dev/meta/error', b'r')
+
+    assert registry.devices() == ['dev']
+    assert registry.devices(driver='test') == ['dev']
+    assert registry.controls(control_type='range') == [('dev', 'level')]
+    assert events == [('+', 'dev'), ('+', ('dev', 'switch')), ('+', ('dev', 'level'))]
+
+    # Объекты создаются при обращении и заполнены meta из реестра
+    control = registry.control('dev', 'switch')
+    assert control.meta == {'type': 'switch'}
+    assert registry.control('dev', 'switch') is control
+    assert registry['dev'].meta == {'driver': 'test'}
+
+    events.clear()
+    inject_message(client, '/devices/dev/switch/meta', b'')
+    inject_message(client, '/devices/dev/level/meta', b'')
+    inject_message(client, '/devices/dev/meta', b'')
+
+    assert events == [('-', ('dev', 'switch')), ('-', ('dev', 'level')), ('-', 'dev')]
+    assert 'dev' not in registry
+    assert registry.devices(driver='test') == []
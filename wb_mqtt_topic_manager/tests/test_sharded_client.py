@@ -0,0 +1,56 @@
+from wb_mqtt_topic_manager.sharded_client import ShardedMQTTClient
+
+
+def test_device_pinned_to_shard():
+    client = ShardedMQTTClient(
+        broker_host='test.mosquitto.org',
+        broker_port=1883,
+        shards=4,
+        client_id='test_client',
+    )
+
+    assert [shard.client._client_id for shard in client.shards] == [
+        b'test_client-0',
+        b'test_client-1',
+        b'test_client-2',
+        b'test_client-3',
+    ]
+
+    for index in range(100):
+        device_id = f'device_{index}'
+        shard = client.shard_for(device_id)
+        assert shard is client.shard_for(device_id)
+        assert client._shard_for_topic(f'/devices/{device_id}/meta') is shard
+        assert client._shard_for_topic(f'/devices/{device_id}/control/on') is shard
+
+    assert len({id(client.shard_for(f'device_{i}')) for i in range(100)}) == 4
+
+
+def test_wildcard_subscriptions_use_single_shard():
+    client = ShardedMQTTClient(
+        broker_host='test.mosquitto.org', broker_port=1883, shards=3
+    )
+
+    def callback(topic, payload):
+        pass
+
+    client.subscribe('/devices/+/+', callback)
+    client.subscribe('/devices/device_1/meta', callback)
+
+    assert '/devices/+/+' in client.shards[0]._message_callbacks
+    assert (
+        sum('/devices/+/+' in shard._message_callbacks for shard in client.shards) == 1
+    )
+    assert '/devices/device_1/meta' in client.shard_for('device_1')._message_callbacks
+
+
+def test_merged_stats():
+    client = ShardedMQTTClient(
+        broker_host='test.mosquitto.org',
+        broker_port=1883,
+        shards=2,
+        dispatch_workers=2,
+    )
+
+    assert client.dispatch_stats['workers'] == 4
+    assert client.dispatch_stats['max_queue_depth'] == 0
@@ -0,0 +1,75 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from wb_mqtt_topic_manager.client import MQTTClient
+from wb_mqtt_topic_manager.control.control_manager import ControlManager
+from wb_mqtt_topic_manager.device import ObserverDevice
+from wb_mqtt_topic_manager.payload import Payload
+from wb_mqtt_topic_manager.snapshot import DevicesSnapshot, bootstrap
+
+
+def test_snapshot_observer_seed():
+    snapshot = DevicesSnapshot()
+    messages = {
+        '/devices/dev/meta': b'{"driver": "test"}',
+        '/devices/dev/meta/error': b'r',
+        '/devices/dev/meta/name': b'legacy',
+        '/devices/dev/level/meta': b'{"type": "range", "readonly": false}',
+        '/devices/dev/level/meta/error': b'',
+        '/devices/dev/level': b'42',
+        '/devices/dev/level/on': b'10',
+        '/devices/other/switch': b'1',
+    }
+    for topic, payload in messages.items():
+        snapshot.apply(topic, Payload(payload))
+
+    assert set(snapshot) == {'dev', 'other'}
+    assert snapshot.control('other', 'switch').value == '1'
+    assert snapshot.control('dev', 'level').value == '42'
+
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+    device = ObserverDevice.create(client, 'dev', snapshot=snapshot)
+    control = ControlManager.connect_control(device, 'level')
+
+    assert device.meta == {'driver': 'test'}
+    assert device.meta_error == 'r'
+    assert control.meta['type'] == 'range'
+    assert control.value == 42
+
+    # Совпадающее retained сообщение не вызывает callback изменения
+    changes = []
+    control.on_change_value(changes.append)
+    client._on_message(
+        client.client,
+        None,
+        type('Message', (), {'topic': '/devices/dev/level', 'payload': b'42'}),
+    )
+    assert changes == []
+
+
+def test_bootstrap_waits_for_suback():
+    client = MQTTClient(broker_host='localhost', broker_port=1883)
+
+    # Без подключения подписка не подтверждается
+    with pytest.raises(TimeoutError):
+        bootstrap(client, settle_time=0.01, timeout=0.05)
+
+    def broker():
+        # Retained сообщения приходят после SUBACK
+        ok = SimpleNamespace(is_failure=False)
+        client._on_subscribe(client.client, None, 1, [ok], None)
+        message = SimpleNamespace(topic='/devices/dev/temp', payload=b'21')
+        client._on_message(client.client, None, message)
+
+    def subscribe(topic, qos=0):
+        threading.Timer(0.1, broker).start()
+        return 0, 1
+
+    client.is_connected = True
+    client.client.subscribe = subscribe
+    client.client.unsubscribe = lambda topic: (0, 2)
+
+    snapshot = bootstrap(client, settle_time=0.05, timeout=2)
+    assert snapshot.control('dev', 'temp').value == '21'
@@ -0,0 +1,118 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from wb_mqtt_topic_manager.constance import TopicKind
+
+SHARE_PREFIX = '$share/'
+
+
+@lru_cache(maxsize=65536)
+def classify_topic(topic: str) -> str:
+    """
+    Класс топика конвенции Wiren Board.
+
+    /devices/<device>/meta, /devices/<device>/<control>/meta и их
+    устаревшие подтопики (meta/name, meta/type, ...) относятся к META,
+    подтопики meta/error - к META_ERROR, /devices/<device>/<control> - к VALUE,
+    /devices/<device>/<control>/on - к ON.
+
+    Args:
+        topic: MQTT топик
+
+    Returns:
+        str: Класс топика (TopicKind)
+    """
+    levels = topic.split('/')
+    if len(levels) < 4 or levels[0] or levels[1] != 'devices':
+        return TopicKind.OTHER
+
+    rest = levels[3:]
+
+    # Топики устройства
+    if rest[0] == 'meta':
+        return TopicKind.META_ERROR if rest[1:] == ['error'] else TopicKind.META
+
+    # Топики контрола
+    if len(rest) == 1:
+        return TopicKind.VALUE
+    if rest[1] == 'on':
+        return TopicKind.ON if len(rest) == 2 else TopicKind.OTHER
+    if rest[1] == 'meta':
+        return TopicKind.META_ERROR if rest[2:] == ['error'] else TopicKind.META
+
+    return TopicKind.OTHER
+
+
+def parse_topic(topic: str) -> Optional[Tuple[str, Optional[str], str]]:
+    """
+    Разбор топика конвенции Wiren Board.
+
+    Разбираются только основные топики: meta и meta/error устройства, значение,
+    /on, meta и meta/error контрола. Устаревшие подтопики meta/* не разбираются.
+
+    Args:
+        topic: MQTT топик
+
+    Returns:
+        tuple: (device_id, control_id или None для топиков устройства,
+            класс топика TopicKind) или None
+    """
+    levels = topic.split('/')
+    if len(levels) < 4 or levels[0] or levels[1] != 'devices':
+        return None
+
+    device_id, rest = levels[2], levels[3:]
+
+    if rest == ['meta']:
+        return device_id, None, TopicKind.META
+    if rest == ['meta', 'error']:
+        return device_id, None, TopicKind.META_ERROR
+
+    control_id, rest = rest[0], rest[1:]
+    if control_id == 'meta':
+        return None
+    if not rest:
+        return device_id, control_id, TopicKind.VALUE
+    if rest == ['on']:
+        return device_id, control_id, TopicKind.ON
+    if rest == ['meta']:
+        return device_id, control_id, TopicKind.META
+    if rest == ['meta', 'error']:
+        return device_id, control_id, TopicKind.META_ERROR
+
+    return None
+
+
+def shared_filter(topic_filter: str, group: str) -> str:
+    """
+    Фильтр общей подписки $share/<group>/<filter>.
+
+    Сообщения общей подписки брокер распределяет между подписчиками группы,
+    каждое сообщение получает только один из них.
+
+    Args:
+        topic_filter: Фильтр топика
+        group: Имя группы (без /, + и #)
+
+    Returns:
+        str: Фильтр для отправки брокеру
+    """
+    if not group or any(char in group for char in '/+#'):
+        raise ValueError(f'Invalid share group: {group!r}')
+    return f'{SHARE_PREFIX}{group}/{topic_filter}'
+
+
+def split_shared_filter(topic_filter: str) -> Tuple[Optional[str], str]:
+    """
+    Разбор фильтра общей подписки.
+
+    Returns:
+        tuple: (группа или None, фильтр без префикса $share/<group>/)
+    """
+    if not topic_filter.startswith(SHARE_PREFIX):
+        return None, topic_filter
+
+    group, _, plain = topic_filter[len(SHARE_PREFIX) :].partition('/')
+    if not group or not plain:
+        raise ValueError(f'Invalid shared subscription: {topic_filter!r}')
+    return group, plain